@@ -0,0 +1,169 @@
+"""
+Fair-share admission in front of the executor.
+
+The concurrency limiters (limits.py) bound how much runs at once, not who
+gets to run it: one client looping on /autofix (up to 3 LLM calls and 4
+sandbox runs each) keeps the autofix queue full and the shared pool busy,
+and everyone else's quick /verify waits behind it. Admission is decided
+first, per request, by two kinds of token bucket:
+
+- one per client (X-Client-ID header, else the peer address): each client
+  gets the same rate and burst however many requests it sends;
+- one shared by the whole server. Low-priority requests may only draw on it
+  while it holds more than `reserve` of its capacity; the rest is kept for
+  high-priority ones, so cheap verifies still get in when autofix loops have
+  used up everything else. It also bounds what a client can gain by
+  rotating ids.
+
+A request costs its endpoint's weight in tokens (about one sandbox run
+each). A rejected request raises Overloaded(429) whose retry_after is the
+time until the bucket that refused it will have enough tokens.
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+
+import metrics
+from limits import Overloaded
+from tracing import log_event
+
+# endpoint -> (tokens, priority); priority 0 may use the server reserve
+DEFAULT_COSTS = {
+    "verify": (1, 0),
+    "stress": (4, 1),
+    "profile": (4, 1),
+    "autofix": (10, 1),  # up to 3 LLM calls + 4 sandbox runs
+}
+
+REASONS = {
+    "client_rate": "client rate limit exceeded",
+    "server_rate": "server rate limit exceeded",
+    "server_reserve": "server busy, remaining capacity is reserved for quick verifies",
+}
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, need: float, now: float) -> float:
+        """Seconds until the bucket holds `need` tokens (0 = it does now)."""
+        self.refill(now)
+        missing = min(need, self.capacity) - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf
+
+
+def parse_costs(raw: str, base: dict = None) -> dict:
+    """ADMISSION_COSTS ("autofix=12,stress=6") applied over `base`; priorities are kept."""
+    costs = dict(base or DEFAULT_COSTS)
+    for item in (raw or "").split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        name = name.strip()
+        if not sep or name not in costs:
+            raise ValueError(f"Invalid admission cost: {item.strip()!r}")
+        costs[name] = (float(value), costs[name][1])
+    return costs
+
+
+class AdmissionScheduler:
+    """
+    `rate`/`burst` are each client's tokens per second and bucket size,
+    `server_rate`/`server_burst` the shared bucket's; `reserve` is the
+    fraction of the shared bucket only priority-0 endpoints may use.
+    `rate` <= 0 turns admission control off.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: float = 60.0, server_rate: float = 10.0,
+                 server_burst: float = 200.0, reserve: float = 0.25, costs: dict = None,
+                 max_clients: int = 4096, clock=time.monotonic):
+        if not 0 <= reserve < 1:
+            raise ValueError("reserve must be in [0, 1)")
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.costs = dict(costs or DEFAULT_COSTS)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._server = TokenBucket(server_burst, server_rate, clock())
+        self._clients = OrderedDict()
+        self._admitted = 0
+        self._rejected = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _client_bucket(self, client: str, now: float) -> TokenBucket:
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.burst, self.rate, now)
+            # Buckets idle long enough to be evicted are full anyway
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return bucket
+
+    def admit(self, client: str, endpoint: str):
+        """Charge `client` for one `endpoint` request, or raise Overloaded(429)."""
+        if not self.enabled:
+            return
+        cost, priority = self.costs[endpoint]
+        now = self._clock()
+        bucket = self._client_bucket(client, now)
+        cost = min(cost, bucket.capacity)
+        # Low priority leaves the reserve for cheap requests
+        floor = self.reserve * self._server.capacity if priority > 0 else 0.0
+        server_need = min(cost + floor, self._server.capacity)
+
+        client_wait = bucket.wait_time(cost, now)
+        server_wait = self._server.wait_time(server_need, now)
+        if client_wait > 0 or server_wait > 0:
+            reason = "client_rate" if client_wait >= server_wait else (
+                "server_reserve" if priority > 0 else "server_rate")
+            self._rejected[reason] = self._rejected.get(reason, 0) + 1
+            metrics.ADMISSION_REJECTED.inc(endpoint=endpoint, reason=reason)
+            wait = max(client_wait, server_wait)
+            retry_after = max(1, math.ceil(wait)) if math.isfinite(wait) else 60
+            log_event("admission.rejected", client=client, endpoint=endpoint, reason=reason,
+                      retry_after=retry_after)
+            raise Overloaded(429, f"{endpoint}: {REASONS[reason]}", retry_after,
+                             info={"reason": reason, "endpoint": endpoint, "cost": cost})
+        bucket.tokens -= cost
+        self._server.tokens -= cost
+        self._admitted += 1
+
+    def stats(self) -> dict:
+        now = self._clock()
+        self._server.refill(now)
+        return {
+            "enabled": self.enabled,
+            "clients": len(self._clients),
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected),
+            "server_tokens": round(self._server.tokens, 3),
+            "server_capacity": self._server.capacity,
+        }
+
+
+def from_env() -> AdmissionScheduler:
+    return AdmissionScheduler(
+        rate=float(os.getenv("ADMISSION_CLIENT_RATE", "2")),
+        burst=float(os.getenv("ADMISSION_CLIENT_BURST", "60")),
+        server_rate=float(os.getenv("ADMISSION_SERVER_RATE", "10")),
+        server_burst=float(os.getenv("ADMISSION_SERVER_BURST", "200")),
+        reserve=float(os.getenv("ADMISSION_RESERVE", "0.25")),
+        costs=parse_costs(os.getenv("ADMISSION_COSTS", "")),
+    )
@@ -1,13 +1,147 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import contextvars
+import json
+import logging
 import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+
+import uvicorn
+from fastapi import Depends, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, model_validator
 
 # Import the logic from server.py
 # This will also run load_dotenv() from server.py
-from server import verify_solution_logic
+import server
+from server import verify_solution_logic, get_executor, get_verification_cache, parse_results, verify_flights
+import admission
+import complexity
+import metrics
+import stress
+import tracing
+from case_history import CaseHistory, CaseHistoryStore
+from executors import build_executor
+from fix_memo import FixMemo, error_signature, fingerprint, memo_key
+from jobs import JobQueue, JobStore, JobNotFound
+from limits import ConcurrencyLimiter, Overloaded
+from llm_client import OllamaClient
+from log_compactor import CHARS_PER_TOKEN, clip, compact_logs, estimate_tokens
+from sandbox_pool import PoolExhausted
+from sessions import SessionManager, SessionNotFound, DEFAULT_PRELUDE
+from tracing import log_event
+from verification_cache import cache_key
 
-app = FastAPI()
+tracing.configure_logging()
+
+# Per-session case outcomes for /verify (see case_history.py)
+case_sessions = CaseHistoryStore(
+    max_sessions=int(os.getenv("VERIFY_HISTORY_SESSIONS", "1024")),
+    ttl_seconds=float(os.getenv("VERIFY_HISTORY_TTL", "3600")),
+)
+
+# Drill sessions pin one warm sandbox each (see sessions.py)
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "900"))
+drill_sessions = SessionManager(
+    # The pool must not reap the session's only sandbox before the session itself expires
+    lambda: build_executor(min_size=1, max_size=1, max_idle_seconds=SESSION_TTL_SECONDS * 4),
+    server._harness_loader,
+    max_sessions=int(os.getenv("SESSION_MAX", "32")),
+    ttl_seconds=SESSION_TTL_SECONDS,
+    prelude=[m.strip() for m in os.getenv("SESSION_PRELUDE", ",".join(DEFAULT_PRELUDE)).split(",") if m.strip()],
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pre-warm SANDBOX_POOL_MIN_SIZE sandboxes so the first /verify skips the cold start
+    try:
+        await get_executor().warm()
+    except Exception as e:
+        log_event("executor.warmup_failed", logging.WARNING, error=str(e))
+    await job_queue.start()
+    reaper = asyncio.create_task(reap_periodically(SANDBOX_REAP_INTERVAL)) if SANDBOX_REAP_INTERVAL > 0 else None
+    yield
+    if reaper is not None:
+        reaper.cancel()
+        await asyncio.gather(reaper, return_exceptions=True)
+    await job_queue.stop()
+    await drill_sessions.close_all()
+    await get_executor().close()
+    await agent.llm.aclose()
+
+app = FastAPI(lifespan=lifespan)
+
+# Idle and expired sandboxes (and drill sessions) are otherwise only evicted when the next request comes in
+SANDBOX_REAP_INTERVAL = float(os.getenv("SANDBOX_REAP_INTERVAL", "30"))
+
+async def reap_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await get_executor().reap()
+            await drill_sessions.reap()
+        except Exception as e:
+            log_event("executor.reap_failed", logging.WARNING, error=str(e))
+
+# Per-endpoint concurrency: overflow is rejected with 429/503 + Retry-After
+verify_limiter = ConcurrencyLimiter(
+    "verify",
+    max_concurrent=int(os.getenv("VERIFY_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("VERIFY_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("VERIFY_QUEUE_TIMEOUT", "10")),
+    retry_after=2,
+)
+autofix_limiter = ConcurrencyLimiter(
+    "autofix",
+    max_concurrent=int(os.getenv("AUTOFIX_MAX_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("AUTOFIX_MAX_QUEUE", "4")),
+    queue_timeout=float(os.getenv("AUTOFIX_QUEUE_TIMEOUT", "30")),
+    retry_after=15,
+)
+
+# Fair-share admission per client, checked before the limits above (see admission.py)
+admission_scheduler = admission.from_env()
+
+def client_id(request: Request) -> str:
+    """X-Client-ID if the caller sends one, else its address."""
+    return (request.headers.get("x-client-id") or "")[:64] or (request.client.host if request.client else "unknown")
+
+def admit(endpoint: str):
+    """Route dependency charging the caller `endpoint`'s cost; 429 with retry_after when over its share."""
+    async def dependency(request: Request):
+        admission_scheduler.admit(client_id(request), endpoint)
+    return Depends(dependency)
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tag everything a request does with its id (client-supplied X-Request-ID or a new one)."""
+    rid = (request.headers.get("x-request-id") or "")[:64] or tracing.new_request_id()
+    with tracing.bind(rid):
+        started = time.perf_counter()
+        response = await call_next(request)
+        log_event("http.request", method=request.method, path=request.url.path, status=response.status_code,
+                  ms=round((time.perf_counter() - started) * 1000, 3))
+    response.headers["X-Request-ID"] = rid
+    return response
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "retry_after": exc.retry_after, **exc.info},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(PoolExhausted)
+async def pool_exhausted_handler(request: Request, exc: PoolExhausted):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "retry_after": 5},
+        headers={"Retry-After": "5"},
+    )
 
 # Enable CORS for Chrome Extension (and localhost)
 app.add_middleware(
@@ -20,41 +154,311 @@ app.add_middleware(
 
 class VerificationRequest(BaseModel):
     code: str
-    test_input: str # Keep singular for backward compat, but we might send JSON string of list
+    test_input: Optional[str] = None # Single input (backward compat)
+    test_inputs: Optional[list[str]] = None # Batch: all cases run in one execution
+    expected: Optional[list[Optional[str]]] = None # Per-case expected output (None = unchecked)
+    fail_fast: Optional[bool] = None # Skip the remaining cases after the first failure (default: only for a session re-run with past failures)
+    max_failures: Optional[int] = None # ...or after this many failures
+    case_timeout: Optional[float] = None # Per-case wall-clock seconds (default VERIFY_CASE_TIMEOUT)
+    case_cpu_timeout: Optional[float] = None # Per-case CPU seconds (default VERIFY_CASE_CPU_TIMEOUT)
+    deadline: Optional[float] = None # Whole-run seconds (default VERIFY_DEADLINE)
+    measure: Optional[bool] = None # Peak memory + call counts per case (default VERIFY_MEASURE)
+    method_name: Optional[str] = None # Method to call (default: first public method of the class)
+    compare: Optional[Literal["exact", "unordered", "unordered_deep"]] = None # How outputs are checked
+    session_id: Optional[str] = None # Remember case outcomes; later runs check past failures first
+    float_tolerance: Optional[float] = None # Relative/absolute tolerance for numbers
+    reference_code: Optional[str] = None # Known-good solution; its outputs are the expected ones
+
+    @model_validator(mode="after")
+    def _check_inputs(self):
+        if self.test_input is None and not self.test_inputs:
+            raise ValueError("Provide test_input or a non-empty test_inputs list")
+        if self.expected is not None and len(self.expected) != len(self.inputs()):
+            raise ValueError("expected must have one entry per test input")
+        return self
+
+    def inputs(self) -> list[str]:
+        return list(self.test_inputs) if self.test_inputs else [self.test_input]
+
+    def harness_options(self) -> dict:
+        return {
+            "fail_fast": self.fail_fast,
+            "max_failures": self.max_failures,
+            "case_timeout": self.case_timeout,
+            "case_cpu_timeout": self.case_cpu_timeout,
+            "deadline": self.deadline,
+            "measure": self.measure,
+            "method_name": self.method_name,
+            "compare": self.compare,
+            "float_tolerance": self.float_tolerance,
+        }
+
+    def oracle(self) -> dict:
+        """What autofix should check candidates against besides 'does not crash'."""
+        oracle = {k: v for k, v in {
+            "reference_code": self.reference_code,
+            "compare": self.compare,
+            "float_tolerance": self.float_tolerance,
+            "method_name": self.method_name,
+        }.items() if v is not None}
+        if self.expected and self.expected[0] is not None:
+            oracle["expected"] = self.expected[0]
+        return oracle
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    return {
+        "status": "ok",
+        "executor": get_executor().stats(),
+        "cache": get_verification_cache().stats(),
+        "coalescing": verify_flights.stats(), # executions avoided = "coalesced"
+        "limits": {"verify": verify_limiter.stats(), "autofix": autofix_limiter.stats()},
+        "admission": admission_scheduler.stats(),
+        "llm": agent.llm.stats(),
+        "fix_memo": agent.memo.stats(),
+        "jobs": job_queue.stats(),
+        "sessions": drill_sessions.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text format: latency histograms, counters, and gauges sampled from stats()."""
+    cache = get_verification_cache().stats()
+    metrics.VERIFY_CACHE.set(cache["hits"], result="hit")
+    metrics.VERIFY_CACHE.set(cache["misses"], result="miss")
+    metrics.VERIFY_CACHE_HIT_RATIO.set(cache["hit_rate"])
+    llm = agent.llm.stats()
+    metrics.LLM_CACHE.set(llm["cache_hits"], result="hit")
+    metrics.LLM_CACHE.set(llm["cache_misses"], result="miss")
+    for limiter in (verify_limiter, autofix_limiter):
+        stats = limiter.stats()
+        metrics.QUEUE_DEPTH.set(stats["waiting"], queue=limiter.name)
+        metrics.IN_FLIGHT.set(stats["active"], queue=limiter.name)
+    jobs = job_queue.stats()
+    metrics.QUEUE_DEPTH.set(jobs["queued"], queue="jobs")
+    metrics.IN_FLIGHT.set(jobs["running"], queue="jobs")
+    executor = get_executor().stats()
+    if "idle" in executor:
+        metrics.SANDBOXES.set(executor["idle"], state="idle")
+        metrics.SANDBOXES.set(executor["leased"], state="leased")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-@app.post("/verify")
-def verify_endpoint(req: VerificationRequest):
+@app.post("/verify", dependencies=[admit("verify")])
+async def verify_endpoint(req: VerificationRequest):
     """
     Endpoint for the Chrome Extension to call.
     """
-    print(f"Received verification request for input: {req.test_input}")
-    # Normalize input: always array
-    inputs = [req.test_input]
-    # verify_solution_logic expects a list of strings
-    result = verify_solution_logic(req.code, inputs)
-    return {"result": result}
+    inputs = req.inputs()
+    log_event("verify.request", cases=len(inputs))
+    # One execution for the whole batch
+    history = case_sessions.get(req.session_id) if req.session_id else None
+    async with verify_limiter.slot():
+        timings = {}
+        result = await verify_in_order(req.code, inputs, req.expected, history, timings=timings,
+                                       reference_code=req.reference_code, **req.harness_options())
+    return _verify_response(inputs, result, timings)
 
-import requests
-import re
-import json
+def _verify_response(inputs: list[str], result: str, timings: dict) -> dict:
+    parse_started = time.perf_counter()
+    results, error = parse_results(result)
+    timings["parse_ms"] = round((time.perf_counter() - parse_started) * 1000, 3)
+    passed = sum(1 for r in results if r.get("status") == "Passed")
+    skipped = sum(1 for r in results if r.get("status") == "Skipped")
+    return {
+        "result": result, # Raw harness output (kept for older extension builds)
+        "results": results,
+        "passed": passed,
+        "failed": len(inputs) - passed - skipped,
+        "skipped": skipped,
+        "error": error,
+        "timings": timings, # build/acquire/execute/parse phases in ms (cache_hit instead on a hit)
+    }
+
+# CaseHistory of the attempt_fix run in progress (None outside one)
+_fix_history = contextvars.ContextVar("fix_history", default=None)
+# Candidate fingerprint -> future (success, logs) of its verification, per attempt_fix run
+_seen_candidates = contextvars.ContextVar("seen_candidates", default=None)
+
+async def verify_in_order(code: str, test_inputs: list[str], expected: list = None,
+                          history: CaseHistory = None, **kwargs) -> str:
+    """
+    verify_solution_logic, with the cases ordered by `history` (previous
+    failures first) when one is given. Results come back in the caller's order
+    and are recorded into the history. Unless the caller decides, a new
+    version of the code re-checking past failures runs fail_fast, so one that
+    still fails stops there.
+    """
+    if history is None:
+        return await verify_solution_logic(code, test_inputs, expected, **kwargs)
+    if kwargs.get("fail_fast") is None and not kwargs.get("max_failures"):
+        kwargs["fail_fast"] = bool(history.failing(test_inputs, expected, code))
+    logs = await verify_solution_logic(code, test_inputs, expected, order=history.order(test_inputs, expected),
+                                       **kwargs)
+    results, error = parse_results(logs)
+    if error is None:
+        history.record(test_inputs, expected, results, code)
+    return logs
+
+class SessionRequest(BaseModel):
+    ttl_seconds: Optional[float] = None # Idle seconds before the session is closed (default SESSION_TTL_SECONDS)
+    prelude: Optional[list[str]] = None # Modules pre-imported into every run (default SESSION_PRELUDE)
+
+@app.exception_handler(SessionNotFound)
+async def session_not_found_handler(request: Request, exc: SessionNotFound):
+    return JSONResponse(status_code=404, content={"detail": f"Unknown or expired session: {exc}"})
+
+@app.post("/sessions", status_code=201)
+async def create_session(req: SessionRequest = None):
+    """
+    Open a drill session: one sandbox pinned to it, the harness and the
+    prelude modules already imported. Runs through /sessions/{id}/verify
+    start from a copy of that namespace and order cases by the session's
+    past failures.
+    """
+    req = req or SessionRequest()
+    try:
+        session = await drill_sessions.create(ttl_seconds=req.ttl_seconds, prelude=req.prelude)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return drill_sessions.describe(session)
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    return drill_sessions.describe(drill_sessions.peek(session_id))
+
+@app.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    await drill_sessions.close(session_id)
+    case_sessions.drop(session_id)
+    return {"session_id": session_id, "closed": True}
+
+@app.post("/sessions/{session_id}/verify", dependencies=[admit("verify")])
+async def verify_in_session(session_id: str, req: VerificationRequest):
+    """/verify on the session's sandbox; same request and response shape."""
+    session = await drill_sessions.get(session_id)
+    inputs = req.inputs()
+    log_event("verify.request", cases=len(inputs), session_id=session_id)
+    history = case_sessions.get(req.session_id or session_id)
+    async with verify_limiter.slot():
+        timings = {}
+        result = await verify_in_order(req.code, inputs, req.expected, history, timings=timings,
+                                       reference_code=req.reference_code, executor=session.executor,
+                                       **req.harness_options(), prelude=session.prelude)
+    return _verify_response(inputs, result, timings)
+
+class StressRequest(BaseModel):
+    code: str
+    test_input: str # Sample input; argument shapes are inferred from it and the signature
+    reference_code: Optional[str] = None # Oracle for differential testing; without it only crashes/timeouts count
+    count: int = 200
+    seed: int = 0
+    max_size: int = 1000
+    method_name: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _check_bounds(self):
+        if not 1 <= self.count <= STRESS_MAX_CASES:
+            raise ValueError(f"count must be between 1 and {STRESS_MAX_CASES}")
+        if not 0 <= self.max_size <= STRESS_MAX_SIZE:
+            raise ValueError(f"max_size must be between 0 and {STRESS_MAX_SIZE}")
+        return self
+
+STRESS_MAX_CASES = 1000
+STRESS_MAX_SIZE = 100000
+
+@app.post("/stress", dependencies=[admit("stress")])
+async def stress_endpoint(req: StressRequest):
+    """
+    Randomized/boundary stress test of `code`, shrinking the first
+    counterexample to a minimal input. No LLM involved.
+    """
+    async with verify_limiter.slot():
+        return await stress.run_stress(req.code, req.test_input, reference_code=req.reference_code,
+                                       count=req.count, seed=req.seed, max_size=req.max_size,
+                                       method_name=req.method_name)
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_MAX_SIZE = 1_000_000
+
+class ProfileRequest(BaseModel):
+    code: str
+    test_input: Optional[str] = None # Sample input; list/string arguments are scaled to each size
+    generator: Optional[str] = None # Or: code defining generate(n) -> argument list (runs in the sandbox)
+    method_name: Optional[str] = None
+    sizes: Optional[list[int]] = None # Default: 16, 32, ..., 32768
+    repeats: int = 3 # Fastest of this many runs per size
+    budget_seconds: float = 5.0 # Whole profiling run; sizes past the first overrun are not run
+    seed: int = 0
+    target_size: Optional[int] = None # The problem's limit on n, to predict the time there
+    time_limit_ms: Optional[float] = None # ...and flag tle_risk against it
+    max_complexity: Optional[Literal["O(1)", "O(log n)", "O(n)", "O(n log n)", "O(n^2)", "O(2^n)"]] = None
+    measure: bool = True # Peak memory + call counts per size, from an extra untimed run
+
+    @model_validator(mode="after")
+    def _check(self):
+        if not self.test_input and not self.generator:
+            raise ValueError("Provide test_input or generator")
+        if self.sizes is not None and not (
+                1 <= len(self.sizes) <= 32 and all(1 <= n <= PROFILE_MAX_SIZE for n in self.sizes)):
+            raise ValueError(f"sizes must be 1..32 values between 1 and {PROFILE_MAX_SIZE}")
+        if not 1 <= self.repeats <= 10:
+            raise ValueError("repeats must be between 1 and 10")
+        if not 0 < self.budget_seconds <= PROFILE_MAX_SECONDS:
+            raise ValueError(f"budget_seconds must be in (0, {PROFILE_MAX_SECONDS:g}]")
+        return self
+
+@app.post("/profile", dependencies=[admit("profile")])
+async def profile_endpoint(req: ProfileRequest):
+    """
+    Empirical time complexity: time `code` over a geometric series of input
+    sizes and fit O(1) .. O(2^n). Catches correct-but-too-slow solutions.
+    """
+    async with verify_limiter.slot():
+        return await complexity.profile(
+            req.code, req.test_input, generator=req.generator, method_name=req.method_name, sizes=req.sizes,
+            repeats=req.repeats, budget_seconds=req.budget_seconds, seed=req.seed, target_size=req.target_size,
+            time_limit_ms=req.time_limit_ms, max_complexity=req.max_complexity, measure=req.measure,
+        )
+
+# Retry prompts never give the failure logs less than this, whatever the code's size
+MIN_LOG_TOKENS = 128
+# Characters of the failing input quoted in a fix prompt (at most a quarter of the budget)
+PROMPT_INPUT_CHARS = 2000
 
 class AgentFixer:
-    def __init__(self):
+    def __init__(self, candidates: int = None):
         # Default to local Ollama
         self.llm_url = "http://localhost:11434/api/generate"
         self.model = "llama3.1" # Or configurable
+        # Speculative mode: >1 generates that many fixes per attempt in parallel.
+        # Ollama only serves them concurrently with OLLAMA_NUM_PARALLEL > 1.
+        self.candidates = candidates if candidates is not None else int(os.getenv("AUTOFIX_CANDIDATES", "1"))
+        self.temperatures = [0.2, 0.5, 0.8]
+        # 0 makes the suite for a given code + error reproducible and lets the LLM client cache it;
+        # anything higher varies the suite between runs, uncached
+        self.tests_temperature = float(os.getenv("AUTOFIX_TESTS_TEMPERATURE", "0"))
+        # One pooled connection to Ollama for every call this fixer makes
+        self.llm = OllamaClient()
+        # Where the test suite comes from: "llm" (generate_tests), "local"
+        # (stress.py generator, no LLM call) or "auto" (local when the LLM gives nothing)
+        self.test_generator = os.getenv("AUTOFIX_TEST_GENERATOR", "llm")
+        self.local_test_count = int(os.getenv("AUTOFIX_LOCAL_TESTS", "50"))
+        # Fix prompts (code + compacted failure logs + input) are kept under this many tokens
+        self.prompt_budget = int(os.getenv("AUTOFIX_PROMPT_BUDGET", "2048"))
+        # Verified fixes by (broken code, error signature), reused across requests (see fix_memo.py)
+        self.memo = FixMemo(
+            server.data_path("AUTOFIX_MEMO_DB", "fix_memo.db"),
+            max_entries=int(os.getenv("AUTOFIX_MEMO_SIZE", "4096")),
+            ttl_seconds=float(os.getenv("AUTOFIX_MEMO_TTL", "604800")),
+        )
 
     def is_simple_fix(self, code: str) -> bool:
         # Heuristic: If code is < 10 lines, it's simple enough to show
         # Or if the diff is small (harder to calculate without original)
         return len(code.split('\n')) < 15
 
-    def generate_fix(self, code: str, error: str, test_input: str) -> str:
-        prompt = f"""
+    def fix_prompt(self, code: str, error: str, test_input: str) -> str:
+        return f"""
         You are an expert Python coding assistant.
         The user has the following buggy code which failed with an error.
         
@@ -65,7 +469,7 @@ class AgentFixer:
         {error}
         
         FAILING INPUT:
-        {test_input}
+        {clip(test_input, min(PROMPT_INPUT_CHARS, self.prompt_budget * CHARS_PER_TOKEN // 4))}
         
         Task: Write a CORRECT, WORKING Python solution that fixes this error.
         CRITICAL: 
@@ -74,24 +478,38 @@ class AgentFixer:
         3. Do NOT explain.
         4. The code must be a full valid replacement for the user's snippet.
         """
-        
+
+    def retry_context(self, code: str, logs: str, test_input: str) -> str:
+        """
+        The ERROR part of a retry prompt: `logs` compacted (log_compactor) to
+        whatever the prompt budget leaves after the code and the input.
+        """
+        header = "PREVIOUS ATTEMPT FAILED. The CODE above is that attempt.\nFailures:\n"
+        footer = "\n\nFix these specific failures."
+        used = estimate_tokens(self.fix_prompt(code, header + footer, test_input))
+        budget = max(self.prompt_budget - used, MIN_LOG_TOKENS)
+        return header + compact_logs(logs, budget) + footer
+
+    async def generate_fix(self, code: str, error: str, test_input: str, temperature: float = None, on_token=None) -> str:
+        prompt = self.fix_prompt(code, error, test_input)
         try:
-            res = requests.post(self.llm_url, json={
+            payload = {
                 "model": self.model,
                 "prompt": prompt,
                 "stream": False
-            })
-            if res.status_code == 200:
-                # Extract code from response
-                raw = res.json().get('response', '').strip()
+            }
+            if temperature is not None:
+                payload["options"] = {"temperature": temperature}
+            # With on_token the call is streamed; either way the full answer is cleaned up
+            raw = await self.llm.generate(self.llm_url, payload, on_token=on_token, call="fix")
+            if raw is not None:
                 # Remove markdown if present
-                clean = re.sub(r'```python|```', '', raw).strip()
-                return clean
+                return re.sub(r'```python|```', '', raw.strip()).strip()
         except Exception as e:
-            print(f"LLM Generation Failed: {e}")
+            log_event("autofix.fix_generation_failed", logging.WARNING, error=str(e))
         return None
 
-    def generate_tests(self, code: str, error: str) -> list[str]:
+    async def generate_tests(self, code: str, error: str) -> list[str]:
         prompt = f"""
         You are a QA Engineer for Python LeetCode problems.
         Analyze the code and error below.
@@ -110,107 +528,273 @@ class AgentFixer:
         3. Do NOT use markdown.
         """
         try:
-            res = requests.post(self.llm_url, json={
+            raw = await self.llm.generate(self.llm_url, {
                 "model": self.model,
                 "prompt": prompt,
                 "stream": False,
-                "options": {"temperature": 0.4}
-            })
-            if res.status_code == 200:
-                raw = res.json().get('response', '').strip()
-                clean = re.sub(r'```json|```', '', raw).strip()
-                import json
+                "options": {"temperature": self.tests_temperature}
+            }, call="tests")
+            if raw is not None:
+                clean = re.sub(r'```json|```', '', raw.strip()).strip()
                 tests = json.loads(clean)
                 if isinstance(tests, list):
                     return tests[:3] # Cap at 3
         except Exception as e:
-            print(f"Test Gen Failed: {e}")
+            log_event("autofix.test_generation_failed", logging.WARNING, error=str(e))
         return []
 
-    def verify_fix(self, code: str, test_inputs: list[str]):
-        # Run in sandbox with batch inputs
-        logs = verify_solution_logic(code, test_inputs)
+    def generate_local_tests(self, code: str, sample_input: str, method_name: str = None) -> list[str]:
+        """Boundary + random inputs shaped like `sample_input` (see stress.py); no LLM call."""
+        if stress.is_design_input(sample_input):
+            return []
+        specs = stress.infer_arg_specs(code, sample_input, method_name)
+        cases = stress.generate_cases(specs, count=self.local_test_count + 1, max_size=100,
+                                      sample=stress.parse_sample(sample_input))
+        return [c for c in cases if c != sample_input][:self.local_test_count]
+
+    async def verify_fix(self, code: str, test_inputs: list[str], history: CaseHistory = None, **oracle):
+        # Run in sandbox with batch inputs; one failure is enough to reject a candidate.
+        # `oracle` (expected / reference_code / compare / ...) turns wrong answers into failures.
+        # Cases earlier candidates of this attempt_fix failed run first, so a repeat failure shows up early.
+        expected = oracle.pop("expected", None)
+        logs = await verify_in_order(code, test_inputs, expected, history or _fix_history.get(),
+                                     fail_fast=True, measure=False, **oracle)
         
-        # Logs are now JSON string (list of dicts) or a Runtime Error string
+        # Logs are a JSON list of per-case results or a fatal "Runtime Error: ..." string
+        results, error = parse_results(logs)
+        if error is not None:
+            # verify_solution_logic marks fatal errors with this prefix; anything
+            # else that isn't a result list is plain output (legacy callers)
+            return not error.startswith("Runtime Error"), error
+        # Check if ANY failed
+        failures = [r for r in results if r['status'] != 'Passed']
+        if failures:
+            # Return False and a summary of failures
+            return False, json.dumps(failures, indent=2)
+        return True, "All Tests Passed: " + json.dumps(results, indent=2)
+
+    async def _race_candidates(self, code: str, error: str, test_input: str, tests_task: asyncio.Task,
+                               attempt: int = 1, on_event=None, oracle: dict = None) -> list[dict]:
+        """
+        Generate `self.candidates` fixes concurrently (spread over temperatures)
+        and verify each against the full suite as soon as it arrives. Returns
+        the finished candidates in completion order; the first passing one is
+        last, and everything still running at that point is cancelled.
+        """
+        async def one(temperature):
+            kwargs = {}
+            if temperature is not None:
+                kwargs["temperature"] = temperature
+            if on_event is not None:
+                async def on_token(text):
+                    await on_event("token", {"attempt": attempt, "temperature": temperature, "text": text})
+                kwargs["on_token"] = on_token
+            candidate = await self.generate_fix(code, error, test_input, **kwargs)
+            if not candidate:
+                return {"code": None, "temperature": temperature, "success": False, "logs": "Failed to generate fix"}
+            await _emit(on_event, "candidate", {"attempt": attempt, "temperature": temperature, "code": candidate})
+            # The same candidate (modulo formatting) again: reuse its verification, or wait for it
+            seen = _seen_candidates.get()
+            key = fingerprint(candidate)
+            if seen is not None and key in seen:
+                try:
+                    success, logs = await asyncio.shield(seen[key])
+                except Exception as exc:
+                    # Its verification failed outright; that fails this copy too
+                    success, logs = False, f"Runtime Error: {type(exc).__name__}: {exc}"
+                await _emit(on_event, "verification", {
+                    "attempt": attempt, "temperature": temperature, "success": success, "logs": logs,
+                    "duplicate": True,
+                })
+                log_event("autofix.candidate_duplicate", attempt=attempt, temperature=temperature, success=success)
+                return {"code": candidate, "temperature": temperature, "success": success, "logs": logs,
+                        "duplicate": True}
+
+            verified = asyncio.get_running_loop().create_future()
+            if seen is not None:
+                seen[key] = verified
+            try:
+                # Shared suite; shield it so cancelling one candidate doesn't cancel it for the rest
+                generated_tests = await asyncio.shield(tests_task)
+                success, logs = await self.verify_fix(candidate, [test_input] + generated_tests,
+                                                      **_verify_options(oracle, len(generated_tests)))
+            except BaseException as exc:
+                if seen is not None:
+                    seen.pop(key, None)
+                if isinstance(exc, Exception):
+                    # Duplicates waiting on it get the error; nobody else has to retrieve it
+                    verified.set_exception(exc)
+                    verified.exception()
+                else:
+                    verified.cancel()
+                raise
+            verified.set_result((success, logs))
+            await _emit(on_event, "verification", {
+                "attempt": attempt, "temperature": temperature, "success": success, "logs": logs,
+            })
+            log_event("autofix.candidate_verified", attempt=attempt, temperature=temperature,
+                      success=success, tests=len(generated_tests) + 1)
+            return {"code": candidate, "temperature": temperature, "success": success, "logs": logs,
+                    "duplicate": False}
+
+        tasks = [asyncio.create_task(one(t)) for t in self.candidate_temperatures()]
+        finished = []
         try:
-            results = json.loads(logs)
-            # Check if ANY failed
-            failures = [r for r in results if r['status'] != 'Passed']
-            if failures:
-                # Return False and a summary of failures
-                return False, json.dumps(failures, indent=2)
-            return True, "All Tests Passed: " + json.dumps(results, indent=2)
-        except:
-            # If not JSON, it's a fatal error (syntax etc)
-            pass
-        
-        # Fallback for fatal errors
-        if "Runtime Error" in logs or "Traceback" in logs:
-            return False, logs
-        
-        return True, logs
+            for next_done in asyncio.as_completed(tasks):
+                outcome = await next_done
+                finished.append(outcome)
+                if outcome["success"]:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return finished
 
-    def attempt_fix(self, code: str, error: str, initial_input: str, max_retries: int = 3):
+    async def recall_fix(self, key: str, initial_input: str, oracle: dict = None, on_event=None):
+        """The memoized fix for this bug as an attempt_fix result, if it also passes `initial_input`."""
+        remembered = self.memo.get(key)
+        if remembered is None:
+            return None
+        await _emit(on_event, "status", {"message": "Known bug: checking the remembered fix..."})
+        success, logs = await self.verify_fix(remembered["fixed_code"], [initial_input],
+                                              **_verify_options(oracle, 0))
+        metrics.AUTOFIX_MEMO.inc(result="hit" if success else "stale")
+        log_event("autofix.memo_hit", verified=success, hits=remembered["hits"])
+        if not success:
+            return None
+        return {
+            "verified": True,
+            "fixed_code": remembered["fixed_code"],
+            "explanation": f"Known fix for this error (first found after {remembered['attempts']} attempts, passing {remembered['test_count']} tests). Passed the failing input.",
+            "logs": logs,
+            "attempts": 0,
+            "test_count": 1,
+            "memoized": True,
+        }
+
+    def candidate_temperatures(self) -> list:
+        # A single candidate keeps the model's default sampling
+        if self.candidates <= 1:
+            return [None]
+        return [self.temperatures[i % len(self.temperatures)] for i in range(self.candidates)]
+
+    async def attempt_fix(self, code: str, error: str, initial_input: str, max_retries: int = 3, on_event=None,
+                          oracle: dict = None):
+        """
+        Agent loop. `on_event(event, data)` is an optional async callback that
+        receives progress ("tests", "attempt", "token", "candidate",
+        "verification") as it happens - used by /autofix/stream.
+
+        `oracle` (see VerificationRequest.oracle) makes verification check
+        answers, not just the absence of errors: "expected" is the output for
+        `initial_input`, "reference_code" a known-good solution that supplies
+        the expected output for every generated test.
+        """
         current_code = code
         current_error = error
+
+        # A bug fixed before needs no LLM call: re-check the remembered fix on this input
+        bug_key = memo_key(code, error, oracle)
+        remembered = await self.recall_fix(bug_key, initial_input, oracle, on_event)
+        if remembered is not None:
+            return remembered
         
-        # 0. Generate Test Suite
-        print("Generating Test Suite...")
-        generated_tests = self.generate_tests(code, error)
-        # Combine with user's failing input (deduplicate?)
-        all_tests = [initial_input] + generated_tests
-        print(f"Test Suite: {len(all_tests)} tests")
+        # 0. Generate Test Suite - runs concurrently with the first fix generation
+        log_event("autofix.start", generator=self.test_generator, candidates=self.candidates, max_retries=max_retries)
+
+        async def build_suite():
+            if self.test_generator == "local":
+                generated = self.generate_local_tests(code, initial_input, (oracle or {}).get("method_name"))
+            else:
+                generated = await self.generate_tests(code, error)
+                if not generated and self.test_generator == "auto":
+                    generated = self.generate_local_tests(code, initial_input, (oracle or {}).get("method_name"))
+            await _emit(on_event, "tests", {"tests": [initial_input] + generated})
+            log_event("autofix.tests_ready", count=len(generated) + 1)
+            return generated
+
+        tests_task = asyncio.create_task(build_suite())
+        # Case outcomes across candidates and attempts: known failures are re-checked first.
+        # A contextvar, so the candidate tasks (and verify_fix) pick it up without new arguments
+        history_token = _fix_history.set(CaseHistory())
+        # Candidates identical to the broken code (or to an earlier candidate) are not verified again
+        seen = {}
+        if error_signature(error) != "Passed":
+            seen[fingerprint(code)] = asyncio.get_running_loop().create_future()
+            seen[fingerprint(code)].set_result((False, error))
+        seen_token = _seen_candidates.set(seen)
         
         history = [] 
+        logs = None
 
-        for attempt in range(max_retries):
-            print(f"--- Attempt {attempt + 1}/{max_retries} ---")
-            
-            # 1. Generate Fix
-            print("Generating fix...")
-            retry_context = ""
-            if attempt > 0:
-                retry_context = f"PREVIOUS ATTEMPT FAILED.\nCode tried:\n{current_code}\n\nError/Failures:\n{current_error}\n\nFix these specific failures."
-            
-            candidate = self.generate_fix(current_code if attempt > 0 else code, current_error if attempt == 0 else retry_context, initial_input)
-            
-            if not candidate:
-                return {"verified": False, "error": "Failed to generate fix"}
-
-            # 2. Verify against ALL tests
-            print("Verifying fix against suite...")
-            success, logs = self.verify_fix(candidate, all_tests)
-            
-            history.append({
-                "attempt": attempt + 1,
-                "code": candidate,
-                "logs": logs,
-                "success": success
-            })
+        try:
+            for attempt in range(max_retries):
+                # 1. Generate candidate fix(es) and verify each against ALL tests.
+                # Retries see the closest candidate's failures, compacted to the prompt budget
+                prompt_error = current_error if attempt == 0 else self.retry_context(
+                    current_code, current_error, initial_input)
+                prompt_tokens = estimate_tokens(self.fix_prompt(current_code, prompt_error, initial_input))
+                metrics.AUTOFIX_PROMPT_TOKENS.observe(prompt_tokens)
+                log_event("autofix.attempt", attempt=attempt + 1, max_retries=max_retries, prompt_tokens=prompt_tokens)
+                await _emit(on_event, "attempt", {"attempt": attempt + 1, "max_retries": max_retries,
+                                                  "prompt_tokens": prompt_tokens})
 
-            if success:
-                print(f"Verify Success on attempt {attempt + 1}!")
-                # Parse logs to get test details for UI
-                try:
-                    # extract JSON part if possible? 
-                    # verify_fix returns "All Tests Passed: [...]"
-                    # We might want to structured return
-                    pass
-                except: pass
-
-                return {
-                    "verified": True,
-                    "fixed_code": candidate,
-                    "explanation": f"Fixed after {attempt + 1} attempts. Passed {len(all_tests)}/{len(all_tests)} tests (including {len(generated_tests)} generated edge cases).",
-                    "logs": logs,
-                    "attempts": attempt + 1,
-                    "test_count": len(all_tests)
-                }
-            
-            # If we failed, update state
-            current_code = candidate
-            current_error = logs 
+                outcomes = await self._race_candidates(
+                    current_code,
+                    prompt_error,
+                    initial_input,
+                    tests_task,
+                    attempt=attempt + 1,
+                    on_event=on_event,
+                    oracle=oracle,
+                )
+                generated = [o for o in outcomes if o["code"]]
+                if not generated:
+                    metrics.AUTOFIX_ATTEMPTS.observe(attempt + 1, verified="false")
+                    log_event("autofix.done", verified=False, attempts=attempt + 1, reason="no_fix_generated")
+                    return {"verified": False, "error": "Failed to generate fix"}
+
+                for outcome in generated:
+                    history.append({
+                        "attempt": attempt + 1,
+                        "code": outcome["code"],
+                        "logs": outcome["logs"],
+                        "success": outcome["success"],
+                        "temperature": outcome["temperature"],
+                        "prompt_tokens": prompt_tokens,
+                        "duplicate": outcome.get("duplicate", False),
+                    })
+
+                winner = next((o for o in generated if o["success"]), None)
+                if winner:
+                    generated_tests = tests_task.result()
+                    all_tests = [initial_input] + generated_tests
+                    metrics.AUTOFIX_ATTEMPTS.observe(attempt + 1, verified="true")
+                    self.memo.put(bug_key, winner["code"], attempt + 1, len(all_tests))
+                    log_event("autofix.done", verified=True, attempts=attempt + 1, tests=len(all_tests))
+                    return {
+                        "verified": True,
+                        "fixed_code": winner["code"],
+                        "explanation": f"Fixed after {attempt + 1} attempts. Passed {len(all_tests)}/{len(all_tests)} tests (including {len(generated_tests)} generated edge cases).",
+                        "logs": winner["logs"],
+                        "attempts": attempt + 1,
+                        "test_count": len(all_tests)
+                    }
+                
+                # If we failed, carry the closest candidate into the next attempt
+                closest = min(generated, key=lambda o: _failure_count(o["logs"]))
+                current_code = closest["code"]
+                current_error = closest["logs"]
+                logs = closest["logs"]
+        finally:
+            if not tests_task.done():
+                tests_task.cancel()
+            _fix_history.reset(history_token)
+            _seen_candidates.reset(seen_token)
         
+        metrics.AUTOFIX_ATTEMPTS.observe(max_retries, verified="false")
+        log_event("autofix.done", verified=False, attempts=max_retries)
         return {
             "verified": False,
             "fixed_code": current_code,
@@ -218,10 +802,33 @@ class AgentFixer:
             "history": history
         }
 
+async def _emit(on_event, event: str, data: dict):
+    if on_event is not None:
+        await on_event(event, data)
+
+def _verify_options(oracle: dict, generated: int) -> dict:
+    """verify_fix kwargs for [initial_input] + `generated` tests."""
+    if not oracle:
+        return {}
+    options = {k: v for k, v in oracle.items() if k != "expected"}
+    if oracle.get("expected") is not None:
+        options["expected"] = [oracle["expected"]] + [None] * generated
+    return options
+
+def _failure_count(logs: str) -> float:
+    """Failing cases in verify_fix logs; fatal errors rank last."""
+    try:
+        failures = json.loads(logs)
+        if isinstance(failures, list):
+            return len(failures)
+    except (TypeError, ValueError):
+        pass
+    return float("inf")
+
 agent = AgentFixer()
 
-@app.post("/autofix")
-def autofix_endpoint(req: VerificationRequest):
+@app.post("/autofix", dependencies=[admit("autofix")])
+async def autofix_endpoint(req: VerificationRequest):
     """
     Agentic Endpoint: Generates and Verifies a fix.
     """
@@ -232,21 +839,143 @@ def autofix_endpoint(req: VerificationRequest):
     # Current VerificationRequest only has code/input.
     # Let's run the BROKEN code first to get the error trace!
     
-    print(f"Auto-Fix Request for: {req.test_input}")
+    async with autofix_limiter.slot():
+        return await run_autofix(req)
+
+async def run_autofix(req: VerificationRequest, on_event=None) -> dict:
+    test_input = req.inputs()[0]
+    log_event("autofix.request", code_chars=len(req.code), input_chars=len(test_input))
     
     # 1. Reproduce the error locally
     # verify_solution_logic expects a list, even for a single input
-    initial_logs = verify_solution_logic(req.code, [req.test_input])
+    await _emit(on_event, "status", {"message": "Reproducing the error..."})
+    oracle = req.oracle()
+    initial_logs = await verify_solution_logic(req.code, [test_input], **_verify_options(oracle, 0))
     
     # Extract error from logs
     # Assume logs format: "Runtime Error: ... \nTraceback: ..."
     error_context = initial_logs
     
     # 2. Agent Loop
-    result = agent.attempt_fix(req.code, error_context, req.test_input)
-    return result
+    return await agent.attempt_fix(req.code, error_context, test_input, on_event=on_event, oracle=oracle or None)
+
+SSE_KEEPALIVE_SECONDS = 15
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that gives back a limiter slot however sending it
+    ends. Starlette neither starts the body iterator nor runs background
+    tasks when the client is gone before the body, so neither can own it.
+    """
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._release()
+
+@app.post("/autofix/stream", dependencies=[admit("autofix")])
+async def autofix_stream_endpoint(req: VerificationRequest):
+    """
+    Same agent loop as /autofix, streamed as Server-Sent Events:
+    status, tests, attempt, token, candidate, verification, then result
+    (the /autofix response body) or error. Closing the connection cancels
+    the loop, including in-flight LLM calls and sandbox runs.
+    """
+    # Take the slot up front so overload is still a plain 429/503; the response gives it back
+    slot = autofix_limiter.slot()
+    await slot.__aenter__()
+
+    async def release():
+        await slot.__aexit__(None, None, None)
+
+    events = asyncio.Queue()
+
+    async def on_event(event, data):
+        await events.put((event, data))
+
+    async def run():
+        try:
+            result = await run_autofix(req, on_event=on_event)
+            await events.put(("result", result))
+        except Exception as e:
+            await events.put(("error", {"detail": str(e)}))
+        finally:
+            await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(events.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield _sse(*item)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    try:
+        return _SlotStreamingResponse(
+            stream(),
+            release,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except BaseException:
+        await release()
+        raise
+
+class AutofixJobRequest(VerificationRequest):
+    priority: int = 0 # Higher runs first
+
+async def _run_autofix_job(request: dict, on_event) -> dict:
+    return await run_autofix(VerificationRequest(**request), on_event=on_event)
+
+# Auto-fix loops queued as jobs; the worker pool is the concurrency bound
+job_queue = JobQueue(
+    JobStore(server.data_path("JOBS_DB", "jobs.db")),
+    _run_autofix_job,
+    workers=int(os.getenv("JOBS_WORKERS", "2")),
+    max_queued=int(os.getenv("JOBS_MAX_QUEUED", "100")),
+    retention_seconds=float(os.getenv("JOBS_RETENTION_SECONDS", "86400")),
+)
+
+@app.exception_handler(JobNotFound)
+async def job_not_found_handler(request: Request, exc: JobNotFound):
+    return JSONResponse(status_code=404, content={"detail": f"Unknown job: {exc}"})
+
+@app.post("/jobs/autofix", status_code=202, dependencies=[admit("autofix")])
+async def submit_autofix_job(req: AutofixJobRequest):
+    """
+    Queue an auto-fix and return its job id immediately. A submission
+    matching a queued/running job (same code, input and oracle, hence the
+    same reproduced error) joins that job instead.
+    """
+    request = req.model_dump(exclude={"priority"}, exclude_none=True)
+    dedupe_key = cache_key(req.code, req.inputs()[:1], **req.oracle())
+    job, deduplicated = job_queue.submit(request, priority=req.priority, dedupe_key=dedupe_key)
+    return {"job_id": job["id"], "state": job["state"], "deduplicated": deduplicated}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """State, progress events (as in /autofix/stream, minus tokens) and the /autofix result once done."""
+    return job_queue.get(job_id)
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    return job_queue.cancel(job_id)
 
 if __name__ == "__main__":
-    import uvicorn
     # Run on port 8000
     uvicorn.run("api:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,377 @@
+"""
+Load and latency benchmarks for /verify and /autofix.
+
+Drives the real FastAPI app, either in-process (httpx ASGITransport, no
+sockets) or over a uvicorn server on a local port, with two stand-ins so the
+numbers measure this service rather than E2B or a GPU:
+
+- FakeSandbox answers every harness run with "Passed" for each case after
+  `sandbox_latency` (+ `case_latency` per case). `--executor inprocess|local`
+  swaps in a real backend instead.
+- A fake Ollama server (uvicorn, local port) answers /api/generate after
+  `llm_latency` with a working fix or a fixed test list, streamed or not.
+
+Each scenario (endpoint x concurrency x batch size) sends `--requests`
+requests from `concurrency` concurrent clients and reports throughput and
+p50/p95/p99 latency. Every request carries distinct code so the
+verification cache and single-flight coalescing don't turn the run into a
+cache benchmark (`--identical` measures exactly that instead). Results are
+written as JSON; `--compare baseline.json` flags p95 regressions.
+
+    python benchmark.py --concurrency 1,8,32 --batch-sizes 1,10 --out bench.json
+    python benchmark.py --mode uvicorn --endpoints autofix --llm-latency 0.5
+    python benchmark.py --compare bench-main.json --out bench-branch.json
+
+The service's own limits still apply (VERIFY_MAX_CONCURRENCY, AUTOFIX_*...),
+so concurrency beyond them shows up as 429s (queue full), counted in
+"rejected" apart from real failures, or 503s in "errors". Per-client
+admission control is off unless `--admission` is given; each simulated
+client sends its own X-Client-ID, so it then gets its own share.
+"""
+import argparse
+import ast
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+import admission
+import harness
+import server
+import tracing
+from executors import PooledExecutor, build_executor
+from sandbox_pool import _Execution
+from verification_cache import VerificationCache
+
+# A plain wrong answer (checked against "expected"): it has to reach the sandbox, not fail preflight
+BUGGY = "class Solution:\n    def add(self, a, b):\n        return a - b\n"
+FIXED = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+GENERATED_TESTS = ["3\n4", "0\n0", "-1\n1"]
+
+
+# --- stand-ins -----------------------------------------------------------------
+
+class FakeSandbox:
+    """A sandbox that skips the user code: every case "Passes" after a fixed delay."""
+
+    def __init__(self, latency: float = 0.0, case_latency: float = 0.0):
+        self.latency = latency
+        self.case_latency = case_latency
+
+    @classmethod
+    def factory(cls, latency: float = 0.0, case_latency: float = 0.0):
+        async def create():
+            return cls(latency, case_latency)
+        return create
+
+    async def run_code(self, code: str) -> _Execution:
+        payload = _stub_payload(code)
+        if payload is None:
+            # Loader, reset or health probe
+            return _Execution()
+        inputs = payload["inputs"]
+        await asyncio.sleep(self.latency + self.case_latency * len(inputs))
+        results = [{"index": i, "input": raw, "output": "0", "status": "Passed", "wall_ms": 0.0, "cpu_ms": 0.0}
+                   for i, raw in enumerate(inputs)]
+        stream = io.StringIO()
+        harness.write_frame(stream, {"results": results})
+        return _Execution(stdout=stream.getvalue())
+
+    async def reset(self):
+        pass
+
+    def kill(self):
+        pass
+
+
+def _stub_payload(code: str):
+    """The payload of a harness.run_script() stub, or None for any other script."""
+    prefix = f"import {harness.MODULE_NAME}\n{harness.MODULE_NAME}.main("
+    if not code.startswith(prefix):
+        return None
+    return json.loads(ast.literal_eval(code[len(prefix):].strip().rstrip(")")))
+
+
+def fake_ollama_app(latency: float = 0.0, fix_code: str = FIXED, tests: list = None) -> FastAPI:
+    tests = GENERATED_TESTS if tests is None else tests
+    app = FastAPI()
+
+    @app.post("/api/generate")
+    async def generate(body: dict):
+        await asyncio.sleep(latency)
+        text = json.dumps(tests) if "QA Engineer" in body.get("prompt", "") else fix_code
+        if not body.get("stream"):
+            return {"model": body.get("model"), "response": text, "done": True}
+
+        async def lines():
+            for line in text.splitlines(keepends=True):
+                yield json.dumps({"response": line, "done": False}) + "\n"
+            yield json.dumps({"response": "", "done": True}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+class LocalServer:
+    """Serve an ASGI app with uvicorn on 127.0.0.1 (random port) inside the running loop."""
+
+    def __init__(self, app, lifespan: str = "off"):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning",
+                                                    lifespan=lifespan))
+        self.server.install_signal_handlers = lambda: None  # uvicorn < 0.29
+        self._task = None
+
+    async def __aenter__(self) -> str:
+        self._task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def __aexit__(self, *exc):
+        self.server.should_exit = True
+        await self._task
+
+
+# --- measurement ------------------------------------------------------------------
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, errors: int, elapsed: float, rejected: int = 0) -> dict:
+    ordered = sorted(latencies)
+    total = len(latencies) + errors + rejected
+    return {
+        "requests": total,
+        "ok": len(latencies),
+        "rejected": rejected,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 3),
+            "p95": round(percentile(ordered, 95) * 1000, 3),
+            "p99": round(percentile(ordered, 99) * 1000, 3),
+            "mean": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        },
+    }
+
+
+def request_body(endpoint: str, n: int, batch_size: int, identical: bool, measure: bool = True) -> dict:
+    # A distinct constant changes the AST, so neither cache nor coalescing kicks in
+    salt = "" if identical else f"_REQUEST = {n}\n"
+    if endpoint == "verify":
+        return {"code": salt + FIXED, "test_inputs": [f"{i}\n{n}" for i in range(batch_size)], "measure": measure}
+    return {"code": salt + BUGGY, "test_input": "1\n2", "expected": ["3"]}
+
+
+async def run_scenario(client: httpx.AsyncClient, endpoint: str, concurrency: int, batch_size: int,
+                       requests: int, identical: bool = False, warmup: int = 2, measure: bool = True) -> dict:
+    path = "/verify" if endpoint == "verify" else "/autofix"
+    for n in range(warmup):
+        await client.post(path, json=request_body(endpoint, -1 - n, batch_size, identical, measure),
+                          headers={"X-Client-ID": "bench-warmup"})
+
+    latencies, errors, rejected, statuses = [], 0, 0, {}
+    counter = iter(range(requests))
+
+    async def worker(client_no: int):
+        nonlocal errors, rejected
+        # One admission bucket per simulated client, as with real users
+        headers = {"X-Client-ID": f"bench-{client_no}"}
+        for n in counter:
+            started = time.perf_counter()
+            try:
+                res = await client.post(path, json=request_body(endpoint, n, batch_size, identical, measure),
+                                        headers=headers)
+                status = res.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+            elif status == 429:
+                rejected += 1
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    report = summarize(latencies, errors, time.perf_counter() - started, rejected)
+    return {"endpoint": endpoint, "concurrency": concurrency, "batch_size": batch_size,
+            **report, "status_codes": statuses}
+
+
+# --- wiring ---------------------------------------------------------------------
+
+def build_benchmark_executor(kind: str, sandbox_latency: float, case_latency: float, pool_size: int):
+    if kind == "fake":
+        return PooledExecutor("fake", FakeSandbox.factory(sandbox_latency, case_latency), max_size=pool_size)
+    os.environ.setdefault("SANDBOX_POOL_MAX_SIZE", str(pool_size))
+    return build_executor(kind)
+
+
+async def run_benchmarks(args) -> dict:
+    import api  # after env tweaks, so the limiters read them
+
+    server._executor = build_benchmark_executor(args.executor, args.sandbox_latency, args.case_latency,
+                                                args.pool_size)
+    server._verification_cache = VerificationCache(max_entries=0)
+    if not args.admission:
+        api.admission_scheduler = admission.AdmissionScheduler(rate=0)
+    api.agent.llm.cache_size = 0
+    api.agent.llm.max_retries = 0
+    api.agent.test_generator = "llm"
+
+    scenarios = []
+    async with LocalServer(fake_ollama_app(args.llm_latency)) as ollama_url:
+        api.agent.llm_url = f"{ollama_url}/api/generate"
+
+        if args.mode == "uvicorn":
+            async with LocalServer(api.app, lifespan="on") as api_url:
+                async with httpx.AsyncClient(base_url=api_url, timeout=args.timeout,
+                                             limits=httpx.Limits(max_connections=max(args.concurrency))) as client:
+                    scenarios = await _all_scenarios(client, args)
+        else:
+            async with api.lifespan(api.app):
+                transport = httpx.ASGITransport(app=api.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                             timeout=args.timeout) as client:
+                    scenarios = await _all_scenarios(client, args)
+
+    return {"meta": _meta(args), "results": scenarios}
+
+
+async def _all_scenarios(client, args) -> list:
+    out = []
+    for endpoint in args.endpoints:
+        batch_sizes = args.batch_sizes if endpoint == "verify" else [1]
+        for batch_size in batch_sizes:
+            for concurrency in args.concurrency:
+                result = await run_scenario(client, endpoint, concurrency, batch_size, args.requests,
+                                            identical=args.identical, measure=args.measure)
+                out.append(result)
+                print(_format_row(result), file=sys.stderr)
+    return out
+
+
+def _meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "mode": args.mode,
+        "executor": args.executor,
+        "sandbox_latency_s": args.sandbox_latency,
+        "case_latency_s": args.case_latency,
+        "llm_latency_s": args.llm_latency,
+        "requests_per_scenario": args.requests,
+        "identical": args.identical,
+        "admission": args.admission,
+        "measure": args.measure,
+    }
+
+
+def _format_row(r: dict) -> str:
+    lat = r["latency_ms"]
+    return (f"{r['endpoint']:8} c={r['concurrency']:<4} batch={r['batch_size']:<4} "
+            f"{r['throughput_rps']:>9.1f} req/s  p50={lat['p50']:.1f}ms p95={lat['p95']:.1f}ms "
+            f"p99={lat['p99']:.1f}ms rejected={r.get('rejected', 0)} errors={r['errors']}")
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list:
+    """Scenarios whose p95 grew by more than `threshold` (fraction) against the baseline."""
+    def key(r):
+        return r["endpoint"], r["concurrency"], r["batch_size"]
+
+    before = {key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current.get("results", []):
+        old = before.get(key(r))
+        if old is None or not old["latency_ms"]["p95"]:
+            continue
+        change = r["latency_ms"]["p95"] / old["latency_ms"]["p95"] - 1
+        if change > threshold:
+            regressions.append({"endpoint": r["endpoint"], "concurrency": r["concurrency"],
+                                "batch_size": r["batch_size"], "p95_before_ms": old["latency_ms"]["p95"],
+                                "p95_after_ms": r["latency_ms"]["p95"], "change": round(change, 3)})
+    return regressions
+
+
+def _int_list(text: str) -> list:
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--endpoints", type=lambda s: s.split(","), default=["verify", "autofix"])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16])
+    parser.add_argument("--batch-sizes", type=_int_list, default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--executor", choices=["fake", "inprocess", "local"], default="fake")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--sandbox-latency", type=float, default=0.05, help="fake sandbox seconds per run")
+    parser.add_argument("--case-latency", type=float, default=0.0, help="fake sandbox seconds per case")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake Ollama seconds per call")
+    parser.add_argument("--identical", action="store_true", help="send identical requests (cache/coalescing)")
+    parser.add_argument("--measure", action=argparse.BooleanOptionalAction, default=True,
+                        help="ask /verify for peak memory and call counts (the service default is off)")
+    parser.add_argument("--admission", action="store_true",
+                        help="keep per-client admission control on (429s are reported as rejected)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to check p95 against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 growth that counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    tracing.configure_logging()
+    tracing.logger.setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmarks(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['endpoint']} c={r['concurrency']} batch={r['batch_size']}: "
+                  f"p95 {r['p95_before_ms']}ms -> {r['p95_after_ms']}ms ({r['change']:+.0%})", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Per-session memory of test-case outcomes, used to order re-verification.
+
+A retry in the agent loop, or a user re-running a drill after a one-line
+edit, mostly fails where the previous version failed. CaseHistory remembers
+the latest outcome of every case it has seen and orders the next run so that
+previously failing cases go first, then cases never seen, then the ones that
+passed. With fail_fast the harness stops at the first failure, so a
+still-broken candidate is rejected after one or two cases instead of after
+the whole suite, and the passing cases only run again (as confirmation) once
+everything before them passed.
+
+Each outcome also remembers the code hash (normalized code) that produced
+it. Ordering only looks at a case's latest outcome, whichever version
+produced it; the hash tells a new version re-checking past failures (which
+verify_in_order runs fail_fast) from the same code run again, which gets
+its full answer from the verification cache.
+
+Results are mapped back to the caller's order (server.verify_solution_logic
+`order`), so ordering is invisible except in timing and in which cases end
+up "Skipped"; the verification cache is keyed on the caller's order too.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from verification_cache import normalize_code
+
+# Statuses that don't say anything about the case itself
+UNINFORMATIVE = {"Skipped"}
+
+
+def case_key(test_input: str, expected=None) -> str:
+    payload = json.dumps([test_input.strip(), expected])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()[:32]
+
+
+class CaseHistory:
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._latest = {}  # case -> (seq, status, code hash) of the most recent informative run
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "reordered": 0}
+
+    def order(self, test_inputs: list, expected: list = None) -> list:
+        """Permutation of range(len(test_inputs)): failing first (most recent first), unseen, passed."""
+        keys = [case_key(raw, (expected or [None] * len(test_inputs))[i]) for i, raw in enumerate(test_inputs)]
+
+        def rank(i):
+            latest = self._latest.get(keys[i])
+            if latest is None:
+                return (1, 0, i)
+            seq, status, _ = latest
+            if status != "Passed":
+                return (0, -seq, i)
+            return (2, 0, i)
+
+        with self._lock:
+            perm = sorted(range(len(test_inputs)), key=rank)
+            self._stats["runs"] += 1
+            if perm != list(range(len(test_inputs))):
+                self._stats["reordered"] += 1
+        return perm
+
+    def failing(self, test_inputs: list, expected: list = None, code: str = None) -> list:
+        """Indices of the cases whose latest outcome was a failure (of a version other than `code`)."""
+        expected = expected or [None] * len(test_inputs)
+        digest = code_hash(code) if code is not None else None
+        with self._lock:
+            latest = [self._latest.get(case_key(raw, expected[i])) for i, raw in enumerate(test_inputs)]
+        return [i for i, outcome in enumerate(latest)
+                if outcome is not None and outcome[1] != "Passed" and outcome[2] != digest]
+
+    def record(self, test_inputs: list, expected: list, results: list, code: str = None):
+        """Remember each case's status (and the code that got it); `results` are in the caller's order."""
+        digest = code_hash(code) if code is not None else None
+        with self._lock:
+            self._seq += 1
+            for result in results:
+                status = result.get("status")
+                idx = result.get("index")
+                if status in UNINFORMATIVE or status is None or idx is None or idx >= len(test_inputs):
+                    continue
+                key = case_key(test_inputs[idx], (expected or [None] * len(test_inputs))[idx])
+                self._latest[key] = (self._seq, status, digest)
+            if len(self._latest) > self.max_entries:
+                # Keep the most recently seen cases
+                recent = sorted(self._latest.items(), key=lambda kv: kv[1][0])[-self.max_entries:]
+                self._latest = dict(recent)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "cases": len(self._latest)}
+
+
+def permute(values: list, perm: list) -> list:
+    if values is None:
+        return None
+    return [values[i] for i in perm]
+
+
+def restore(results: list, perm: list) -> list:
+    """Map results of a permuted run back to the original case order and indices."""
+    restored = []
+    for result in results:
+        idx = result.get("index")
+        if isinstance(idx, int) and 0 <= idx < len(perm):
+            result = {**result, "index": perm[idx]}
+        restored.append(result)
+    return sorted(restored, key=lambda r: r.get("index", 0))
+
+
+class CaseHistoryStore:
+    """CaseHistory per client session id, LRU-bounded with an idle TTL."""
+
+    def __init__(self, max_sessions: int = 1024, ttl_seconds: float = 3600.0, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._sessions = OrderedDict()  # id -> (last used, CaseHistory)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> CaseHistory:
+        now = self._clock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                history = CaseHistory()
+            else:
+                history = entry[1]
+            self._sessions[session_id] = (now, history)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return history
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "max_sessions": self.max_sessions}
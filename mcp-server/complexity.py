@@ -0,0 +1,272 @@
+"""
+Empirical time-complexity profiling.
+
+A correct but quadratic drill solution passes every sample and only fails
+on LeetCode with Time Limit Exceeded. The profiler runs the solution at a
+geometric series of input sizes in ONE harness execution (ascending, so the
+first size that overruns the budget stops the rest), takes the fastest of a
+few repeats per size, and fits the timings against the usual classes with
+least squares, t ~ a + b * f(n):
+
+    O(1), O(log n), O(n), O(n log n), O(n^2), O(2^n)
+
+Inputs of size n come either from a generator (code defining generate(n),
+run inside the sandbox, never here) or from scaling the sample input: every
+list/string argument gets length n, shaped like the sample by the stress
+module's inference (sorted samples stay sorted). Without list or string
+arguments, int arguments are taken to be the size.
+
+Over a few doublings of n, O(n) and O(n log n) (like O(1) and O(log n))
+differ by less than timing noise, so those pairs can come out either way;
+`exponent` (the log-log slope, ~1 vs ~2) is reported alongside. Polynomial
+jumps - the quadratic solution to a linear problem - are what it reliably
+catches.
+"""
+import math
+import random
+from typing import Optional
+
+import harness
+import server
+import stress
+
+# Simplest first; a more complex model has to fit clearly better to win
+MODELS = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n) ** 2),
+    ("O(2^n)", lambda n: 2.0 ** n if n < 1024 else math.inf),
+]
+RANK = {name: i for i, (name, _) in enumerate(MODELS)}
+
+# A more complex model must cut the relative error by this factor to be chosen
+SIMPLER_MODEL_SLACK = 1.25
+MIN_POINTS = 4
+# Below this a timing is mostly interpreter overhead and timer resolution
+MIN_MEASURABLE_MS = 0.005
+
+
+def geometric_sizes(min_size: int = 16, max_size: int = 32768, factor: float = 2.0) -> list:
+    sizes = []
+    n = max(1, min_size)
+    while n <= max_size:
+        sizes.append(int(n))
+        n = max(int(n) + 1, int(round(n * factor)))
+    return sizes
+
+
+# --- inputs ------------------------------------------------------------------
+
+def _is_sorted(value) -> bool:
+    try:
+        return isinstance(value, list) and len(value) > 1 and value == sorted(value)
+    except TypeError:
+        return False
+
+
+def scale_input(specs: list, sample: list, n: int, rng: random.Random) -> str:
+    """One LeetCode-format input with every list/string argument of size n (or int arguments = n)."""
+    scalable = [i for i, s in enumerate(specs) if s.kind in ("list", "str")]
+    args = []
+    for i, spec in enumerate(specs):
+        base = sample[i] if sample and i < len(sample) else stress.random_value(spec, rng, n)
+        if scalable and i in scalable and spec.kind == "list":
+            value = [stress.random_value(spec.elem, rng, n, 1) for _ in range(n)]
+            if _is_sorted(base):
+                value.sort()
+            args.append(value)
+        elif scalable and i in scalable:
+            args.append("".join(rng.choice(spec.alphabet) for _ in range(n)))
+        elif not scalable and spec.kind == "int":
+            args.append(n)
+        else:
+            args.append(base)
+    return stress.format_input(args)
+
+
+def scalable(specs: list) -> bool:
+    return any(s.kind in ("list", "str", "int") for s in specs)
+
+
+async def generate_inputs(generator: str, sizes: list, deadline: float) -> tuple:
+    """Run the user's generate(n) in the sandbox; returns (inputs, fatal error string)."""
+    executor = server.get_executor()
+    executor.install(harness.MODULE_NAME, server._harness_loader())
+    execution = await executor.run(harness.generator_script({"code": generator, "sizes": sizes, "deadline": deadline,
+                                                             "isolate": server.isolates(executor)}))
+    if execution.error:
+        return None, f"Runtime Error: {execution.error.name}: {execution.error.value}"
+    frame = harness.read_frame(execution.logs.stdout)
+    if frame is None:
+        return None, "Runtime Error: HarnessError: no result frame in sandbox output"
+    if "fatal" in frame:
+        err = frame["fatal"]
+        return None, f"Runtime Error: Generator {err['name']}: {err['value']}"
+    return frame["inputs"], None
+
+
+# --- fitting -------------------------------------------------------------------
+
+def fit_model(f, sizes: list, times: list) -> Optional[dict]:
+    """Least squares t = a + b * f(n) with b >= 0; None if f overflows on these sizes."""
+    xs = [f(n) for n in sizes]
+    if not all(math.isfinite(x) for x in xs):
+        return None
+    mean_x = sum(xs) / len(xs)
+    mean_t = sum(times) / len(times)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    b = sum((x - mean_x) * (t - mean_t) for x, t in zip(xs, times)) / var if var > 0 else 0.0
+    if b < 0:
+        b = 0.0
+    a = mean_t - b * mean_x
+    # Relative error, so the small sizes count as much as the big ones
+    errors = [((a + b * x) - t) / max(t, MIN_MEASURABLE_MS) for x, t in zip(xs, times)]
+    return {"a": a, "b": b, "error": math.sqrt(sum(e * e for e in errors) / len(errors))}
+
+
+def log_log_slope(sizes: list, times: list) -> Optional[float]:
+    """Empirical exponent k in t ~ n^k over the larger half of the sizes."""
+    points = [(math.log(n), math.log(t)) for n, t in zip(sizes, times) if t >= MIN_MEASURABLE_MS]
+    points = points[len(points) // 2:]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if var == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / var, 3)
+
+
+def classify(sizes: list, times: list) -> dict:
+    """Best-fit class plus every model's fit (relative RMS error, lower is better)."""
+    fits = []
+    for name, f in MODELS:
+        fit = fit_model(f, sizes, times)
+        if fit is not None:
+            fits.append({"model": name, **fit})
+    best = min(fits, key=lambda fit: fit["error"])
+    # The simplest model that is nearly as good as the best one
+    chosen = next(fit for fit in fits if fit["error"] <= best["error"] * SIMPLER_MODEL_SLACK + 1e-9)
+    if chosen["model"] != "O(1)" and chosen["b"] * (_model(chosen["model"])(sizes[-1]) -
+                                                  _model(chosen["model"])(sizes[0])) < MIN_MEASURABLE_MS:
+        # Growth below timer resolution is noise
+        chosen = next(fit for fit in fits if fit["model"] == "O(1)")
+    return {"complexity": chosen["model"], "fits": [{**fit, "error": round(fit["error"], 4)} for fit in fits],
+            "model": chosen}
+
+
+def _model(name: str):
+    return dict(MODELS)[name]
+
+
+def predict_ms(model: dict, n: int) -> Optional[float]:
+    x = _model(model["model"])(n)
+    if not math.isfinite(x):
+        return None
+    value = model["a"] + model["b"] * x
+    return round(value, 3) if math.isfinite(value) else None
+
+
+# --- profiling -----------------------------------------------------------------
+
+async def _add_measurements(code: str, method_name: str, inputs_by_size: dict, timings: list,
+                            budget_seconds: float):
+    """One measured run per timed size; sizes it doesn't reach keep their times only."""
+    logs = await server.verify_solution_logic(
+        code, [inputs_by_size[t["n"]] for t in timings], method_name=method_name, measure=True, max_failures=1,
+        case_timeout=budget_seconds / 2, deadline=budget_seconds, use_cache=False,
+    )
+    results, error = server.parse_results(logs)
+    if error is not None:
+        return
+    for timing, result in zip(timings, results):
+        if result.get("status") == "Passed":
+            timing.update({k: result[k] for k in ("peak_memory_kb", "calls") if k in result})
+
+
+async def profile(code: str, sample_input: str = None, generator: str = None, method_name: str = None,
+                  sizes: list = None, repeats: int = 3, budget_seconds: float = 10.0, seed: int = 0,
+                  target_size: int = None, time_limit_ms: float = None, max_complexity: str = None,
+                  measure: bool = True) -> dict:
+    """
+    Time `code` at each size and classify its growth. With `target_size`
+    (the problem's constraint on n) the chosen model predicts the time there
+    and `tle_risk` compares it to `time_limit_ms`; `max_complexity` is the
+    class the drill expects ("O(n log n)"), `too_slow` says whether the fit
+    is worse. `measure` (on, as for /profile) adds peak_memory_kb and calls
+    to each timing, from a separate run so the tracking doesn't skew the
+    times; /verify leaves it off (VERIFY_MEASURE).
+    """
+    if max_complexity is not None and max_complexity not in RANK:
+        raise ValueError(f"Unknown complexity class: {max_complexity}")
+    sizes = sorted(set(sizes or geometric_sizes()))
+    report = {"complexity": None, "timings": [], "fits": [], "sizes_timed_out": [], "error": None}
+
+    if generator:
+        inputs, error = await generate_inputs(generator, sizes, budget_seconds)
+        if error is not None:
+            return {**report, "error": error}
+    else:
+        if stress.is_design_input(sample_input):
+            return {**report, "error": "Design-problem inputs can only be profiled with a generator"}
+        specs = stress.infer_arg_specs(code, sample_input, method_name)
+        if not scalable(specs):
+            return {**report, "error": "No list, string or int argument to scale; provide a generator"}
+        sample = stress.parse_sample(sample_input) if sample_input else None
+        rng = random.Random(seed)
+        inputs = [scale_input(specs, sample, n, rng) for n in sizes]
+
+    # Ascending sizes, each repeated: the first overrun (or crash) skips everything larger.
+    # The first run of anything pays for cold caches, so one untimed run goes first.
+    cases = inputs[:1] + [raw for raw in inputs for _ in range(repeats)]
+    logs = await server.verify_solution_logic(
+        code, cases, method_name=method_name, measure=False, max_failures=1,
+        case_timeout=budget_seconds / 2, deadline=budget_seconds, use_cache=False,
+    )
+    results, error = server.parse_results(logs)
+    if error is not None:
+        return {**report, "error": error}
+    results = results[1:]
+
+    measured_sizes, times = [], []
+    for i, n in enumerate(sizes):
+        runs = results[i * repeats:(i + 1) * repeats]
+        failed = next((r for r in runs if r.get("status") not in ("Passed", "Skipped")), None)
+        if failed is not None:
+            if failed["status"] == "Time Limit Exceeded":
+                report["sizes_timed_out"].append(n)
+                continue
+            return {**report, "error": f"{failed['status']} at n={n}: {failed.get('error')}"}
+        walls = [r["wall_ms"] for r in runs if r.get("status") == "Passed" and "wall_ms" in r]
+        if not walls:
+            continue
+        measured_sizes.append(n)
+        times.append(min(walls))
+        report["timings"].append({"n": n, "ms": min(walls), "runs_ms": walls})
+
+    if measure and measured_sizes:
+        await _add_measurements(code, method_name, dict(zip(sizes, inputs)), report["timings"], budget_seconds)
+
+    if len(measured_sizes) < MIN_POINTS:
+        report["error"] = f"Only {len(measured_sizes)} sizes finished within the budget; need {MIN_POINTS}"
+        if report["sizes_timed_out"] and measured_sizes:
+            # Still useful: it is too slow for anything past the last size that finished
+            report["max_size_within_budget"] = measured_sizes[-1]
+        return report
+
+    fitted = classify(measured_sizes, times)
+    report.update(complexity=fitted["complexity"], fits=fitted["fits"],
+                  exponent=log_log_slope(measured_sizes, times))
+    if report["sizes_timed_out"]:
+        report["max_size_within_budget"] = measured_sizes[-1]
+    if target_size:
+        predicted = predict_ms(fitted["model"], target_size)
+        report["predicted_ms"] = predicted
+        if time_limit_ms:
+            report["tle_risk"] = predicted is None or predicted > time_limit_ms
+    if max_complexity is not None:
+        report["too_slow"] = RANK[fitted["complexity"]] > RANK[max_complexity]
+    return report
@@ -0,0 +1,349 @@
+"""
+Pluggable execution backends for the verification harness.
+
+Every backend exposes `await run(script)` and returns an execution object shaped like
+E2B's (`.logs.stdout`, `.logs.stderr`, `.error.name/.value/.traceback`), so
+server.py builds one harness script and parses one JSON contract regardless of
+where the code ran.
+
+Backends (selected with SANDBOX_BACKEND):
+- "e2b":      remote E2B code-interpreter VMs (default, real isolation)
+- "local":    pool of forked Python worker processes with rlimits; works offline
+- "inprocess": LocalSandbox, no isolation at all - tests only
+
+All of them are leased through SandboxPool, so warm-up, reset between leases,
+recycling and idle eviction behave the same everywhere. `install()` registers a
+loader script (e.g. the harness module) that runs once per sandbox, before its
+first run().
+"""
+import asyncio
+import builtins
+import contextlib
+import io
+import multiprocessing
+import os
+import time
+import traceback
+import weakref
+
+from sandbox_pool import SandboxPool, LocalSandbox, RESET_SNIPPET, _Execution, _Error
+
+
+class Executor:
+    """Interface: run a harness script, return an E2B-shaped execution."""
+    name = "base"
+
+    async def run(self, script: str, timings: dict = None):
+        """`timings`, if given, is filled with acquire_ms / execute_ms."""
+        raise NotImplementedError
+
+    async def warm(self):
+        pass
+
+    async def reap(self):
+        """Drop expired sandboxes and top back up to the warm minimum (called periodically)."""
+        pass
+
+    async def close(self):
+        pass
+
+    def install(self, name: str, loader: str):
+        """Make sure `loader` has run once in every sandbox before its next run()."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class PooledExecutor(Executor):
+    def __init__(self, name: str, factory, **pool_kwargs):
+        self.name = name
+        self.pool = SandboxPool(factory, **pool_kwargs)
+        self._loaders = {}  # name -> loader script
+        # Survives the per-lease reset (it only clears globals); a recycled
+        # sandbox is a new object and gets the loaders again
+        self._installed = weakref.WeakKeyDictionary()  # sandbox -> installed names
+
+    def install(self, name: str, loader: str):
+        self._loaders[name] = loader
+
+    async def _preload(self, sandbox):
+        installed = self._installed.setdefault(sandbox, set())
+        for name, loader in list(self._loaders.items()):
+            if name in installed:
+                continue
+            execution = await sandbox.run_code(loader)
+            if execution.error:
+                raise RuntimeError(f"Installing {name} failed: {execution.error.name}: {execution.error.value}")
+            installed.add(name)
+
+    async def run(self, script: str, timings: dict = None):
+        started = time.perf_counter()
+        async with self.pool.lease() as sandbox:
+            await self._preload(sandbox)
+            leased = time.perf_counter()
+            try:
+                return await sandbox.run_code(script)
+            finally:
+                if timings is not None:
+                    timings["acquire_ms"] = round((leased - started) * 1000, 3)
+                    timings["execute_ms"] = round((time.perf_counter() - leased) * 1000, 3)
+
+    async def warm(self):
+        await self.pool.warm()
+
+    async def reap(self):
+        await self.pool.reap()
+        await self.pool.warm()
+
+    async def close(self):
+        await self.pool.close()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self.pool.stats()}
+
+
+# --- Local process backend -------------------------------------------------
+
+def _block_network():
+    """
+    Best-effort network ban for the worker. A fresh network namespace is used
+    when the kernel allows it; otherwise inet sockets are refused at the
+    Python level. Hard isolation still requires the e2b backend.
+    """
+    if hasattr(os, "unshare"):
+        try:
+            os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+            return
+        except OSError:
+            pass
+
+    import socket
+    import _socket
+
+    def _denied(*args, **kwargs):
+        raise PermissionError("Network access is disabled in the sandbox")
+
+    class _NoInetSocket(socket.socket):
+        def __init__(self, family=-1, *args, **kwargs):
+            if family in (-1, socket.AF_INET, socket.AF_INET6):
+                _denied()
+            super().__init__(family, *args, **kwargs)
+
+    socket.socket = _NoInetSocket
+    _socket.socket = _NoInetSocket
+    socket.create_connection = _denied
+    socket.getaddrinfo = _denied
+
+
+def _apply_limits(memory_bytes: int, cpu_hard_seconds: int):
+    import resource
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    if cpu_hard_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard_seconds, cpu_hard_seconds))
+    # Keep user code from filling the disk; the harness forks each run and
+    # bans fork bombs in that child (harness._limit_child)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (16 * 1024 * 1024, 16 * 1024 * 1024))
+
+
+# Everything else in the server's environment (API keys, tokens) stays out of reach
+WORKER_ENV_ALLOWLIST = ("PATH", "HOME", "LANG", "LC_ALL", "LC_CTYPE", "TZ", "TMPDIR")
+
+
+def _isolate_process(keep_fd: int):
+    """
+    Drop what the forked worker inherited from the server: environment
+    variables outside WORKER_ENV_ALLOWLIST and every open fd except the
+    pipe to the parent. stdio points at /dev/null; run output is captured
+    in memory and sent back over the pipe.
+    """
+    kept = {name: os.environ[name] for name in WORKER_ENV_ALLOWLIST if name in os.environ}
+    os.environ.clear()
+    os.environ.update(kept)
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    os.closerange(3, keep_fd)
+    os.closerange(keep_fd + 1, os.sysconf("SC_OPEN_MAX"))
+
+
+def _cpu_used() -> float:
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _fresh_namespace() -> dict:
+    return {"__name__": "__main__", "__builtins__": builtins}
+
+
+def _worker_main(conn, cpu_seconds: int, memory_bytes: int, cpu_hard_seconds: int, allow_network: bool):
+    """Warm interpreter loop: ("run", script) -> (stdout, stderr, error), ("reset", None) -> "ok"."""
+    _isolate_process(conn.fileno())
+    _apply_limits(memory_bytes, cpu_hard_seconds)
+    if not allow_network:
+        _block_network()
+
+    import resource
+    namespace = _fresh_namespace()
+    while True:
+        try:
+            op, payload = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        if op == "reset":
+            namespace = _fresh_namespace()
+            conn.send("ok")
+            continue
+
+        # Per-run CPU budget: the soft limit sits `cpu_seconds` above what this
+        # worker has already used; exceeding it raises SIGXCPU and kills us.
+        soft = int(_cpu_used()) + cpu_seconds + 1
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        error = None
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                exec(compile(payload, "<sandbox>", "exec"), namespace)
+            except BaseException as e:
+                error = (type(e).__name__, str(e), traceback.format_exc())
+        conn.send((stdout.getvalue(), stderr.getvalue(), error))
+
+
+async def _wait_readable(conn, timeout: float) -> bool:
+    """Wait for data on a multiprocessing Connection without blocking the event loop."""
+    if conn.poll():
+        return True
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    fd = conn.fileno()
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(True))
+    try:
+        await asyncio.wait_for(ready, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(fd)
+
+
+class ProcessSandbox:
+    """
+    A forked Python worker that keeps its interpreter warm across runs.
+
+    Limits: CPU seconds per run (RLIMIT_CPU), address space (RLIMIT_AS), a
+    wall-clock timeout enforced by the parent, and no network. The worker
+    sees neither the server's environment nor its open files. A worker that
+    times out or dies is killed; the pool then replaces it.
+    """
+
+    def __init__(self, cpu_seconds: int = 10, memory_mb: int = 1024, timeout: float = 30.0,
+                 max_runs: int = 50, allow_network: bool = False):
+        ctx = multiprocessing.get_context("fork")
+        self.timeout = timeout
+        self._conn, child = ctx.Pipe()
+        # Hard CPU cap covers the worker's whole life; the pool recycles it sooner.
+        cpu_hard = cpu_seconds * (max_runs + 1) + 5
+        self._proc = ctx.Process(
+            target=_worker_main,
+            args=(child, cpu_seconds, memory_mb * 1024 * 1024, cpu_hard, allow_network),
+            daemon=True,
+        )
+        self._proc.start()
+        child.close()
+        self.alive = True
+
+    @classmethod
+    async def create(cls, **kwargs):
+        return cls(**kwargs)
+
+    async def run_code(self, code: str):
+        if not self.alive:
+            raise RuntimeError("Sandbox has been killed")
+        if code.strip() == RESET_SNIPPET:
+            await self.reset()
+            return _Execution()
+
+        self._conn.send(("run", code))
+        if not await _wait_readable(self._conn, self.timeout):
+            self.kill()
+            return _Execution(error=_Error("TimeoutError", f"Execution exceeded {self.timeout}s wall-clock limit"))
+        try:
+            stdout, stderr, error = self._conn.recv()
+        except (EOFError, OSError):
+            self._proc.join(timeout=1)
+            code = self._proc.exitcode
+            self.kill()
+            reason = "CPU time limit exceeded" if code == -24 else f"worker exited with code {code}"
+            return _Execution(error=_Error("TimeoutError" if code == -24 else "WorkerCrashed", reason))
+        return _Execution(stdout, stderr, _Error(*error) if error else None)
+
+    async def reset(self):
+        if not self.alive or not self._proc.is_alive():
+            raise RuntimeError("Worker is not running")
+        self._conn.send(("reset", None))
+        if not await _wait_readable(self._conn, 5) or self._conn.recv() != "ok":
+            raise RuntimeError("Worker did not acknowledge reset")
+
+    def kill(self):
+        self.alive = False
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+        if self._proc.is_alive():
+            self._proc.kill()
+        self._proc.join(timeout=1)
+
+
+# --- Config ----------------------------------------------------------------
+
+# A run that starts just before E2B's own timeout must still finish
+E2B_TIMEOUT_MARGIN_SECONDS = 60
+
+def _pool_kwargs_from_env() -> dict:
+    return {
+        "min_size": int(os.getenv("SANDBOX_POOL_MIN_SIZE", "0")),
+        "max_size": int(os.getenv("SANDBOX_POOL_MAX_SIZE", "4")),
+        "max_uses": int(os.getenv("SANDBOX_POOL_MAX_USES", "50")),
+        "max_idle_seconds": float(os.getenv("SANDBOX_POOL_IDLE_SECONDS", "120")),
+    }
+
+
+def build_executor(backend: str = None, **pool_overrides) -> Executor:
+    """`pool_overrides` replace the SANDBOX_POOL_* settings (e.g. max_size=1 for a session)."""
+    backend = backend or os.getenv("SANDBOX_BACKEND", "e2b")
+    pool_kwargs = {**_pool_kwargs_from_env(), **pool_overrides}
+
+    if backend == "e2b":
+        from e2b_code_interpreter import AsyncSandbox
+        # E2B kills a sandbox `timeout` seconds after creation; retire ours a bit before that
+        timeout = int(os.getenv("E2B_SANDBOX_TIMEOUT", "600"))
+        pool_kwargs.setdefault("max_age_seconds", max(timeout - E2B_TIMEOUT_MARGIN_SECONDS, timeout / 2))
+        return PooledExecutor("e2b", lambda: AsyncSandbox.create(timeout=timeout), **pool_kwargs)
+
+    if backend == "local":
+        cpu_seconds = int(os.getenv("LOCAL_EXECUTOR_CPU_SECONDS", "10"))
+        memory_mb = int(os.getenv("LOCAL_EXECUTOR_MEMORY_MB", "1024"))
+        timeout = float(os.getenv("LOCAL_EXECUTOR_TIMEOUT", "30"))
+        max_uses = pool_kwargs["max_uses"]
+        return PooledExecutor(
+            "local",
+            lambda: ProcessSandbox.create(
+                cpu_seconds=cpu_seconds, memory_mb=memory_mb, timeout=timeout, max_runs=max_uses
+            ),
+            **pool_kwargs,
+        )
+
+    if backend == "inprocess":
+        return PooledExecutor("inprocess", LocalSandbox.create, **pool_kwargs)
+
+    raise ValueError(f"Unknown SANDBOX_BACKEND: {backend!r} (expected e2b, local or inprocess)")
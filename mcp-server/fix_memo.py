@@ -0,0 +1,145 @@
+"""
+Candidate fingerprints and the verified-fix memo.
+
+The local model often returns the same fix again, or one that differs only
+in whitespace and comments: on the next retry, from another candidate of the
+same attempt, or for the next user who hits the same bug on the same
+problem. Two things avoid paying for those again:
+
+- `fingerprint` hashes the AST dump of a candidate (verification_cache's
+  normalize_code), so attempt_fix can tell a candidate it has already seen
+  fail and skip its sandbox run. The verification cache would catch most of
+  these too, but not timeouts or nondeterministic code, which it won't
+  store - and a candidate that times out is the most expensive kind.
+- `FixMemo` maps (broken-code fingerprint, error signature, oracle) to the
+  fix that was verified for it. A repeated auto-fix for a known bug, checked
+  against the same expected output or reference solution, re-checks that fix
+  on the new failing input and returns it without an LLM call.
+
+The memo lives in SQLite, in AUTOFIX_MEMO_DB (default: fix_memo.db in the
+data dir), so it survives restarts.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from verification_cache import normalize_code
+
+SIGNATURE_CHARS = 200
+
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]+")
+_NUMBER = re.compile(r"\d+")
+
+
+def fingerprint(code: str) -> str:
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+
+
+def _normalize_message(message: str) -> str:
+    """First line, with addresses and numbers (indices, sizes) masked."""
+    first = (message or "").strip().split("\n", 1)[0].split("\\n", 1)[0]
+    return _NUMBER.sub("#", _ADDRESS.sub("0x#", first))[:SIGNATURE_CHARS]
+
+
+def error_signature(logs: str) -> str:
+    """
+    What failed, independent of the input: the first failing case's status
+    and exception line, or the fatal error's first line.
+    """
+    try:
+        results = json.loads(logs)
+    except (TypeError, ValueError):
+        results = None
+    if not isinstance(results, list):
+        return _normalize_message(logs)
+    failed = next((r for r in results if isinstance(r, dict) and r.get("status") != "Passed"), None)
+    if failed is None:
+        return "Passed"
+    if failed.get("status") == "Wrong Answer" or not failed.get("error"):
+        return str(failed.get("status"))
+    return f"{failed.get('status')}: {_normalize_message(failed['error'])}"
+
+
+def memo_key(code: str, error: str, oracle: dict = None) -> str:
+    """
+    The bug: broken code, error signature and the oracle the fix was checked
+    against (a fix verified without expected outputs proves nothing about
+    them, and one verified against other outputs is wrong here).
+    """
+    oracle = dict(oracle or {})
+    if oracle.get("reference_code"):
+        oracle["reference_code"] = fingerprint(oracle["reference_code"])
+    checked = json.dumps(oracle, sort_keys=True, default=str)
+    return hashlib.sha256(f"{fingerprint(code)}\n{error_signature(error)}\n{checked}".encode("utf-8")).hexdigest()
+
+
+class FixMemo:
+    def __init__(self, db_path: str = ":memory:", max_entries: int = 4096, ttl_seconds: float = 604800.0,
+                 clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fix_memo ("
+            "key TEXT PRIMARY KEY, fixed_code TEXT NOT NULL, attempts INTEGER NOT NULL, "
+            "test_count INTEGER NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+            "stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str):
+        """The remembered fix as {"fixed_code", "attempts", "test_count", "hits"}, or None."""
+        if not self.enabled:
+            return None
+        now = self._clock()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fixed_code, attempts, test_count, hits, stored_at FROM fix_memo WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[4] >= self.ttl_seconds:
+                if row is not None:
+                    self._db.execute("DELETE FROM fix_memo WHERE key = ?", (key,))
+                    self._db.commit()
+                self._stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE fix_memo SET hits = hits + 1, used_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._stats["hits"] += 1
+        fixed_code, attempts, test_count, hits, _ = row
+        return {"fixed_code": fixed_code, "attempts": attempts, "test_count": test_count, "hits": hits + 1}
+
+    def put(self, key: str, fixed_code: str, attempts: int, test_count: int):
+        if not self.enabled:
+            return
+        now = self._clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fix_memo (key, fixed_code, attempts, test_count, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, fixed_code, attempts, test_count, now, now),
+            )
+            # Least recently used entries go first
+            self._db.execute(
+                "DELETE FROM fix_memo WHERE key NOT IN "
+                "(SELECT key FROM fix_memo ORDER BY used_at DESC LIMIT ?)", (self.max_entries,)
+            )
+            self._db.commit()
+            self._stats["stores"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM fix_memo").fetchone()[0]
+            return {**self._stats, "entries": entries}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,701 @@
+"""
+Verification harness that runs INSIDE the sandbox.
+
+This file is shipped to each sandbox once (see PooledExecutor.install) and
+imported there as the `_lc_harness` module. A verification run then only
+sends a two-line stub that calls `main()` with a JSON payload, so user code
+and inputs travel as data and are never spliced into harness source.
+
+main() compiles the user code into a fresh namespace, runs every case and
+writes ONE framed result to stdout:
+
+    \\x1e<lc-result>{length}\\n{json}
+
+User prints are captured per case (capped at `stdout_limit` characters) and
+never reach the real stdout, so they can't corrupt the result. server.py
+reads the frame back with read_frame().
+
+The sandbox serves many users in turn, and user code can rebind anything in
+its process: this module's functions, json, builtins. With the payload's
+"isolate" flag the run happens in a forked child, so such changes die with
+it; the long-lived parent only ever runs trusted code (the loader, session
+snapshots, parsing) and stays warm.
+
+The module is also importable on the server side (read_frame, tests).
+"""
+import ast
+import builtins
+import importlib
+import io
+import json
+import os
+import pickle
+import signal
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+import warnings
+from collections import OrderedDict
+
+MODULE_NAME = "_lc_harness"
+FRAME_MARKER = "\x1e<lc-result>"
+DEFAULT_STDOUT_LIMIT = 4096
+
+# Parsed input lines, kept as pickles so every reuse hands user code a fresh
+# copy (solutions sort/mutate their arguments). The module outlives the
+# per-lease reset, so autofix retries over the same suite parse it once
+# (isolated runs fill it from the parent, see warm_parse_cache).
+PARSE_CACHE_MIN_CHARS = 256  # shorter lines are cheaper to parse than to cache
+PARSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_parse_cache = OrderedDict()  # line -> pickled value
+_parse_cache_bytes = 0
+_JSON_START = set('[{"-0123456789tfn')
+NOTHING = object()  # "no reference output", distinct from a None result
+
+
+def parse_literal(line: str):
+    """One input line -> Python value: JSON fast path, then literal_eval, then the raw string."""
+    if line[0] in _JSON_START:
+        try:
+            return json.loads(line)
+        except ValueError:
+            pass
+    try:
+        return ast.literal_eval(line)
+    except Exception:
+        return line
+
+
+def parse_line(line: str):
+    global _parse_cache_bytes
+    if len(line) < PARSE_CACHE_MIN_CHARS:
+        return parse_literal(line)
+    blob = _parse_cache.get(line)
+    if blob is not None:
+        _parse_cache.move_to_end(line)
+        return pickle.loads(blob)
+
+    value = parse_literal(line)
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(blob) <= PARSE_CACHE_MAX_BYTES:
+        _parse_cache[line] = blob
+        _parse_cache_bytes += len(blob)
+        while _parse_cache_bytes > PARSE_CACHE_MAX_BYTES:
+            _, old = _parse_cache.popitem(last=False)
+            _parse_cache_bytes -= len(old)
+    return value
+
+
+def parse_input(raw_input_str: str) -> list:
+    # Split by lines to handle multiple arguments (standard LeetCode format)
+    return [parse_line(line.strip()) for line in raw_input_str.strip().split("\n") if line.strip()]
+
+
+class Cutoff(BaseException):
+    # BaseException so `except Exception` in user code doesn't swallow it
+    def __init__(self, reason, limit):
+        super().__init__(reason)
+        self.reason = reason
+        self.limit = limit
+
+
+class Guard:
+    """
+    Interrupt the enclosed code once it overruns its wall/CPU budget. Uses
+    interval timers on the main thread (re-firing in case user code swallows
+    the first one); elsewhere falls back to a trace function.
+    """
+
+    def __init__(self, wall=None, wall_reason="wall_timeout", cpu=None):
+        self.wall, self.wall_reason, self.cpu = wall, wall_reason, cpu
+        self.use_signals = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+    def _raise(self, reason, limit):
+        def handler(*_):
+            raise Cutoff(reason, limit)
+        return handler
+
+    def __enter__(self):
+        if self.use_signals:
+            if self.wall is not None:
+                self.old_alrm = signal.signal(signal.SIGALRM, self._raise(self.wall_reason, self.wall))
+                signal.setitimer(signal.ITIMER_REAL, max(self.wall, 0.001), 0.05)
+            if self.cpu is not None:
+                self.old_vtalrm = signal.signal(signal.SIGVTALRM, self._raise("cpu_timeout", self.cpu))
+                signal.setitimer(signal.ITIMER_VIRTUAL, self.cpu, 0.05)
+        elif self.wall is not None or self.cpu is not None:
+            wall_end = time.perf_counter() + self.wall if self.wall is not None else None
+            cpu_end = time.thread_time() + self.cpu if self.cpu is not None else None
+
+            def tracer(frame, event, arg):
+                if wall_end is not None and time.perf_counter() > wall_end:
+                    raise Cutoff(self.wall_reason, self.wall)
+                if cpu_end is not None and time.thread_time() > cpu_end:
+                    raise Cutoff("cpu_timeout", self.cpu)
+                return tracer
+            sys.settrace(tracer)
+        return self
+
+    def __exit__(self, *exc):
+        if self.use_signals:
+            if self.wall is not None:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, self.old_alrm)
+            if self.cpu is not None:
+                signal.setitimer(signal.ITIMER_VIRTUAL, 0)
+                signal.signal(signal.SIGVTALRM, self.old_vtalrm)
+        else:
+            sys.settrace(None)
+        return False
+
+
+class CappedOutput(io.TextIOBase):
+    """stdout replacement that keeps the first `limit` characters."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        room = self.limit - self.size
+        if len(text) > room:
+            self.truncated = True
+            text = text[:max(room, 0)]
+        if text:
+            self.parts.append(text)
+            self.size += len(text)
+        return len(text)
+
+    def getvalue(self):
+        return "".join(self.parts) + ("...[truncated]" if self.truncated else "")
+
+
+class CallCounter:
+    """Counts calls (recursive ones too) via a profile hook, adding no frames to user code."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.codes = set()
+        self.calls = 0
+
+    def _profile(self, frame, event, arg):
+        if event == "call" and frame.f_code in self.codes:
+            self.calls += 1
+
+    def watch(self, *funcs):
+        if not self.enabled:
+            return
+        self.codes = {getattr(getattr(f, "__func__", f), "__code__", None) for f in funcs}
+        sys.setprofile(self._profile)
+
+    def stop(self):
+        sys.setprofile(None)
+
+
+class Run:
+    def __init__(self, namespace, expected, opts):
+        self.ns = namespace
+        self.expected = expected
+        self.opts = opts
+        self.started = time.perf_counter()
+        self.counter = CallCounter(opts["measure"])
+        self.stdout_limit = opts.get("stdout_limit") or DEFAULT_STDOUT_LIMIT
+        self.reference = None  # (class, method name) of the oracle solution
+
+    # --- budgets -----------------------------------------------------------
+
+    def guard(self):
+        wall, reason = self.opts["case_timeout"], "wall_timeout"
+        if self.opts["deadline"] is not None:
+            remaining = self.started + self.opts["deadline"] - time.perf_counter()
+            if wall is None or remaining < wall:
+                wall, reason = remaining, "deadline"
+        return Guard(wall, reason, self.opts["case_cpu_timeout"])
+
+    def skip_reason(self, failures):
+        if self.opts["max_failures"] is not None and failures >= self.opts["max_failures"]:
+            return "fail_fast" if self.opts["fail_fast"] else "max_failures"
+        if self.opts["deadline"] is not None and time.perf_counter() - self.started >= self.opts["deadline"]:
+            return "deadline"
+        return None
+
+    # --- metrics -----------------------------------------------------------
+
+    def case_start(self):
+        self.counter.calls = 0
+        base = 0
+        if self.opts["measure"]:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        return time.perf_counter(), time.thread_time(), base
+
+    def case_metrics(self, started):
+        self.counter.stop()
+        wall0, cpu0, base = started
+        metrics = {
+            "wall_ms": round((time.perf_counter() - wall0) * 1000, 3),
+            "cpu_ms": round((time.thread_time() - cpu0) * 1000, 3),
+        }
+        if self.opts["measure"]:
+            metrics["peak_memory_kb"] = round(max(tracemalloc.get_traced_memory()[1] - base, 0) / 1024, 1)
+            metrics["calls"] = self.counter.calls
+        return metrics
+
+    # --- cases -------------------------------------------------------------
+
+    def passed(self, idx, raw_input_str, res, reference=NOTHING):
+        entry = {"index": idx, "input": raw_input_str, "output": str(res), "status": "Passed"}
+        exp = self.expected[idx] if idx < len(self.expected) else None
+        if exp is not None:
+            entry["expected"] = exp
+            # Same parsing as inputs, so JSON's true/false/null work too
+            exp_val = parse_literal(exp.strip()) if exp.strip() else ""
+        elif reference is not NOTHING:
+            exp_val = reference
+            entry["expected"] = str(reference)
+            entry["expected_source"] = "reference"
+        else:
+            return entry
+        if not outputs_match(res, exp_val, self.opts.get("compare"), self.opts.get("float_tolerance")):
+            entry["status"] = "Wrong Answer"
+        return entry
+
+    def run_case(self, idx, raw_input_str, parsed_args, reference=NOTHING):
+        try:
+            res = call_target(self.target_cls, self.method_name, parsed_args, self.counter)
+        except TargetError as e:
+            return {"index": idx, "input": raw_input_str, "error": str(e), "status": "Runtime Error"}
+        return self.passed(idx, raw_input_str, res, reference)
+
+    def run_reference(self, raw_input_str):
+        """(known-good output, None) or (NOTHING, why the reference failed)."""
+        out = CappedOutput(0)  # the reference's prints are noise here
+        real_stdout, sys.stdout = sys.stdout, out
+        try:
+            with self.guard():
+                return call_target(self.reference[0], self.reference[1], parse_input(raw_input_str)), None
+        except Cutoff as cut:
+            return NOTHING, f"Exceeded {cut.limit:.3g}s ({cut.reason})"
+        except Exception as e:
+            return NOTHING, f"{type(e).__name__}: {e}"
+        finally:
+            sys.stdout = real_stdout
+
+    def run_all(self, inputs):
+        results = []
+        failures = 0
+        self.target_cls, self.method_name = resolve(self.ns, self.opts.get("method_name"))
+        for idx, raw_input_str in enumerate(inputs):
+            skip = self.skip_reason(failures)
+            if skip:
+                results.append({"index": idx, "input": raw_input_str, "status": "Skipped", "reason": skip})
+                continue
+
+            # The oracle only fills in cases without an explicit expected output
+            reference, reference_error = NOTHING, None
+            has_expected = idx < len(self.expected) and self.expected[idx] is not None
+            if self.reference is not None and not has_expected:
+                reference, reference_error = self.run_reference(raw_input_str)
+
+            # Parsed outside the measured section so metrics describe the solution
+            parsed_args = parse_input(raw_input_str)
+            started = self.case_start()
+            out = CappedOutput(self.stdout_limit)
+            real_stdout, sys.stdout = sys.stdout, out
+            try:
+                with self.guard():
+                    entry = self.run_case(idx, raw_input_str, parsed_args, reference)
+            except Cutoff as cut:
+                entry = {"index": idx, "input": raw_input_str, "error": f"Exceeded {cut.limit:.3g}s ({cut.reason})",
+                         "status": "Time Limit Exceeded", "reason": cut.reason}
+            except Exception as e:
+                # Capture individual test failure
+                entry = {"index": idx, "input": raw_input_str, "error": str(e),
+                         "traceback": traceback.format_exc(), "status": "Runtime Error"}
+            finally:
+                sys.stdout = real_stdout
+
+            entry.update(self.case_metrics(started))
+            if out.size or out.truncated:
+                entry["stdout"] = out.getvalue()
+            if reference_error is not None:
+                entry["reference_error"] = reference_error
+            results.append(entry)
+            if entry["status"] != "Passed":
+                failures += 1
+
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return results
+
+
+class TargetError(Exception):
+    """The code has nothing to call (no class / method)."""
+
+
+def resolve(namespace, method_name=None):
+    """Target class and method name in `namespace`, looked up once per run."""
+    target_cls = None
+    if isinstance(namespace.get("Solution"), type):
+        target_cls = namespace["Solution"]
+    else:
+        for obj in list(namespace.values()):
+            if isinstance(obj, type) and obj.__module__ == "__main__":
+                target_cls = obj
+                break
+
+    if target_cls is not None and not method_name:
+        methods = [m for m in dir(target_cls) if not m.startswith("__") and callable(getattr(target_cls, m))]
+        method_name = methods[0] if methods else None
+    return target_cls, method_name
+
+
+def call_target(target_cls, method_name, parsed_args, counter=None):
+    """Run one case against a fresh instance and return the raw result."""
+    if target_cls is None:
+        raise TargetError("No Solution class found")
+
+    # Design problems: ["MinStack","push",...] + [[],[1],...]
+    if len(parsed_args) == 2 and isinstance(parsed_args[0], list) and isinstance(parsed_args[1], list):
+        commands, params = parsed_args
+        if len(commands) > 0 and commands[0] in (target_cls.__name__, "MyQueue", "MinStack"):
+            obj = target_cls()
+            design_results = [None]
+            if counter is not None:
+                counter.watch(*[getattr(obj, c) for c in set(commands[1:]) if callable(getattr(obj, c, None))])
+            for i in range(1, len(commands)):
+                cmd = commands[i]
+                args = params[i]
+                if not hasattr(obj, cmd):
+                    design_results.append(None)
+                    continue
+                method = getattr(obj, cmd)
+                try:
+                    res = method(*args)
+                except TypeError:
+                    res = method(args)
+                design_results.append(res)
+            return design_results
+
+    if method_name is None:
+        raise TargetError("No public method found")
+    method = getattr(target_cls(), method_name, None)
+    if not callable(method):
+        raise TargetError(f"Method {method_name!r} not found on {target_cls.__name__}")
+    if counter is not None:
+        counter.watch(method)
+    try:
+        return method(*parsed_args)
+    except Exception:
+        return method(parsed_args)
+
+
+# --- output comparison -----------------------------------------------------
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _sort_key(value):
+    # Numbers sort numerically (so float tolerance still lines up), the rest by repr
+    return (0, value, "") if _is_number(value) else (1, 0, repr(value))
+
+
+def unordered(value, deep=False):
+    """Lists/tuples as order-insensitive multisets (recursively with `deep`)."""
+    if isinstance(value, (list, tuple)):
+        items = [unordered(v, deep) if deep else v for v in value]
+        try:
+            return sorted(items, key=_sort_key)
+        except TypeError:
+            return items
+    return value
+
+
+def approx_equal(a, b, tolerance):
+    if _is_number(a) and _is_number(b):
+        return abs(a - b) <= tolerance * max(1.0, abs(a), abs(b))
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(approx_equal(x, y, tolerance) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(approx_equal(a[k], b[k], tolerance) for k in a)
+    return a == b
+
+
+def outputs_match(res, exp_val, compare=None, float_tolerance=None):
+    """
+    compare: "exact" (default), "unordered" (top-level order ignored) or
+    "unordered_deep" (order ignored at every level). `float_tolerance` allows
+    a relative/absolute error on numbers.
+    """
+    if compare in ("unordered", "unordered_deep"):
+        deep = compare == "unordered_deep"
+        res, exp_val = unordered(res, deep), unordered(exp_val, deep)
+    if float_tolerance is not None:
+        if approx_equal(res, exp_val, float_tolerance):
+            return True
+    elif res == exp_val:
+        return True
+    return str(res) == str(exp_val)
+
+
+def fatal(exc, tb=None) -> dict:
+    return {"name": type(exc).__name__, "value": str(exc), "traceback": tb or traceback.format_exc()}
+
+
+def load(source, filename, namespace, deadline):
+    """Compile and run module-level code; returns a fatal dict or None. Prints are discarded by the caller."""
+    try:
+        code = compile(source, filename, "exec")
+        with Guard(deadline, "deadline"):
+            exec(code, namespace)
+    except SyntaxError as e:
+        return fatal(e, "".join(traceback.format_exception_only(type(e), e)))
+    except Cutoff as cut:
+        return {"name": "TimeoutError", "value": f"Exceeded {cut.limit:.3g}s ({cut.reason})",
+                "traceback": traceback.format_exc()}
+    except BaseException as e:
+        return fatal(e)
+    return None
+
+
+# --- session prelude -------------------------------------------------------
+#
+# Session sandboxes import the usual LeetCode modules once and start every run
+# from a copy of the resulting namespace snapshot, LeetCode-style (`typing`
+# names such as List/Optional come pre-bound).
+
+STAR_IMPORTS = {"typing"}
+
+_snapshots = {}  # tuple(modules) -> namespace snapshot
+
+
+def snapshot(modules) -> dict:
+    """Namespace with `modules` imported (built once per sandbox and module list)."""
+    key = tuple(modules)
+    snap = _snapshots.get(key)
+    if snap is None:
+        snap = {"__name__": "__main__", "__builtins__": builtins}
+        for name in key:
+            module = importlib.import_module(name)
+            snap[name.split(".")[0]] = importlib.import_module(name.split(".")[0])
+            if name in STAR_IMPORTS:
+                snap.update((attr, getattr(module, attr)) for attr in getattr(module, "__all__", ()))
+        _snapshots[key] = snap
+    return snap
+
+
+def fresh_namespace(opts: dict) -> dict:
+    prelude = opts.get("prelude")
+    if prelude:
+        return dict(snapshot(prelude))
+    return {"__name__": "__main__", "__builtins__": builtins}
+
+
+def execute(payload: dict) -> dict:
+    """Run one verification payload; returns {"results": [...]} or {"fatal": {...}}."""
+    opts = payload["options"]
+    recursion_limit = sys.getrecursionlimit()
+    try:
+        return _execute(payload, opts)
+    finally:
+        # The sandbox outlives the run; don't let sys.setrecursionlimit leak into the next one
+        sys.setrecursionlimit(recursion_limit)
+
+
+def _execute(payload: dict, opts: dict) -> dict:
+    namespace = fresh_namespace(opts)
+    run = Run(namespace, list(payload.get("expected") or []), opts)
+
+    # User code runs at module level once; its prints are captured too
+    out = CappedOutput(run.stdout_limit)
+    real_stdout, sys.stdout = sys.stdout, out
+    try:
+        error = load(payload["code"], "<solution>", namespace, opts["deadline"])
+        if error is None and payload.get("reference_code"):
+            # Known-good solution, run on the same inputs in its own namespace
+            ref_namespace = fresh_namespace(opts)
+            ref_error = load(payload["reference_code"], "<reference>", ref_namespace, opts["deadline"])
+            if ref_error is not None:
+                return {"fatal": {**ref_error, "name": "ReferenceSolutionError",
+                                  "value": f"{ref_error['name']}: {ref_error['value']}"}}
+            run.reference = resolve(ref_namespace, opts.get("method_name"))
+    finally:
+        sys.stdout = real_stdout
+    if error is not None:
+        return {"fatal": error}
+
+    return {"results": run.run_all(payload["inputs"]), "stdout": out.getvalue()}
+
+
+def generate(payload: dict) -> dict:
+    """
+    Inputs from a size-parameterized generator (complexity profiling): the
+    code defines generate(n) returning the argument list, or a ready
+    LeetCode-format string. Returns {"inputs": [...]} or {"fatal": {...}}.
+    """
+    namespace = {"__name__": "__main__", "__builtins__": builtins}
+    deadline = payload.get("deadline")
+    out = io.StringIO()
+    real_stdout, sys.stdout = sys.stdout, out
+    try:
+        error = load(payload["code"], "<generator>", namespace, deadline)
+        if error is not None:
+            return {"fatal": error}
+        generate_fn = namespace.get("generate")
+        if not callable(generate_fn):
+            return {"fatal": {"name": "TargetError", "value": "The generator must define generate(n)",
+                              "traceback": ""}}
+        inputs = []
+        try:
+            with Guard(deadline, "deadline"):
+                for n in payload["sizes"]:
+                    args = generate_fn(n)
+                    inputs.append(args if isinstance(args, str) else "\n".join(json.dumps(a) for a in args))
+        except Cutoff as cut:
+            return {"fatal": {"name": "TimeoutError", "value": f"Exceeded {cut.limit:.3g}s ({cut.reason})",
+                              "traceback": traceback.format_exc()}}
+        except Exception as e:
+            return {"fatal": fatal(e)}
+        return {"inputs": inputs}
+    finally:
+        sys.stdout = real_stdout
+
+
+def write_frame(stream, result: dict):
+    body = json.dumps(result)
+    stream.write(f"\n{FRAME_MARKER}{len(body)}\n{body}\n")
+    stream.flush()
+
+
+def read_frame(stdout):
+    """Last result frame in `stdout` (str or E2B's list of chunks), or None."""
+    if isinstance(stdout, (list, tuple)):
+        stdout = "".join(stdout)
+    if not stdout:
+        return None
+    start = stdout.rfind(FRAME_MARKER)
+    if start < 0:
+        return None
+    header_end = stdout.find("\n", start)
+    try:
+        length = int(stdout[start + len(FRAME_MARKER):header_end])
+        return json.loads(stdout[header_end + 1:header_end + 1 + length])
+    except ValueError:
+        return None
+
+
+def warm_parse_cache(inputs):
+    """Parse the cacheable input lines here, so isolated children find them cached."""
+    for raw_input_str in inputs or ():
+        for line in raw_input_str.strip().split("\n"):
+            if len(line.strip()) >= PARSE_CACHE_MIN_CHARS:
+                parse_line(line.strip())
+
+
+def _safely(fn, payload) -> dict:
+    try:
+        return fn(payload)
+    except BaseException as e:
+        return {"fatal": fatal(e)}
+
+
+def _limit_child():
+    try:
+        import resource
+    except ImportError:
+        return
+    if os.getuid() != 0:
+        # No fork bombs from user code
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def isolated(fn, payload: dict) -> dict:
+    """fn(payload) in a forked child; falls back to this process where fork is unavailable."""
+    try:
+        read_fd, write_fd = os.pipe()
+        with warnings.catch_warnings():
+            # Forking a multi-threaded kernel: the child only runs this module's code
+            warnings.simplefilter("ignore", DeprecationWarning)
+            pid = os.fork()
+    except (AttributeError, OSError):
+        return _safely(fn, payload)
+
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            _limit_child()
+            with os.fdopen(write_fd, "w") as pipe:
+                write_frame(pipe, _safely(fn, payload))
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        output = pipe.read()
+    _, status = os.waitpid(pid, 0)
+    result = read_frame(output)
+    if result is not None:
+        return result
+    if os.WIFSIGNALED(status) and os.WTERMSIG(status) == getattr(signal, "SIGXCPU", None):
+        return {"fatal": {"name": "TimeoutError", "value": "CPU time limit exceeded", "traceback": ""}}
+    return {"fatal": {"name": "WorkerCrashed", "traceback": "",
+                      "value": f"run ended without a result (exit status {os.waitstatus_to_exitcode(status)})"}}
+
+
+def _main(fn, payload_json: str):
+    stream = sys.stdout
+    try:
+        payload = json.loads(payload_json)
+        if payload.get("isolate"):
+            warm_parse_cache(payload.get("inputs"))
+            result = isolated(fn, payload)
+        else:
+            result = _safely(fn, payload)
+    except BaseException as e:
+        result = {"fatal": fatal(e)}
+    write_frame(stream, result)
+
+
+def main(payload_json: str):
+    _main(execute, payload_json)
+
+
+def generate_main(payload_json: str):
+    _main(generate, payload_json)
+
+
+def loader_script(source: str) -> str:
+    """Script that installs `source` as the `_lc_harness` module in a sandbox."""
+    return (
+        "import sys, types\n"
+        f"_lc_module = types.ModuleType({MODULE_NAME!r})\n"
+        f"exec(compile({source!r}, {MODULE_NAME + '.py'!r}, 'exec'), _lc_module.__dict__)\n"
+        f"sys.modules[{MODULE_NAME!r}] = _lc_module\n"
+        "del _lc_module\n"
+    )
+
+
+def run_script(payload: dict) -> str:
+    """Per-run stub: the payload is a JSON string literal, never code."""
+    return f"import {MODULE_NAME}\n{MODULE_NAME}.main({json.dumps(payload)!r})\n"
+
+
+def generator_script(payload: dict) -> str:
+    return f"import {MODULE_NAME}\n{MODULE_NAME}.generate_main({json.dumps(payload)!r})\n"
+
+
+def source() -> str:
+    with open(__file__, encoding="utf-8") as f:
+        return f.read()
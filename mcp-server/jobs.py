@@ -0,0 +1,280 @@
+"""
+Background job queue for the auto-fix agent loop.
+
+`/autofix` keeps an HTTP connection open for minutes and dies with it. Jobs
+decouple the two: `submit` returns an id straight away and a fixed pool of
+asyncio workers runs the loop, highest priority first.
+
+- Job state (request, progress events, result) lives in SQLite, in
+  JOBS_DB (default: jobs.db in the data dir), so a restart re-queues
+  whatever was queued or running.
+- Submissions with the same dedupe key as a queued/running job are merged
+  into that job instead of starting a second agent loop.
+- Cancelling a queued job just marks it; cancelling a running one cancels
+  its task (LLM calls and sandbox runs included).
+"""
+import asyncio
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+import tracing
+from limits import Overloaded
+from tracing import log_event
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Token events are far too chatty to keep in a job's history
+UNRECORDED_EVENTS = {"token"}
+
+
+class JobNotFound(Exception):
+    pass
+
+
+class JobStore:
+    def __init__(self, db_path: str = ":memory:", clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, dedupe_key TEXT, priority INTEGER NOT NULL, state TEXT NOT NULL, "
+            "request TEXT NOT NULL, events TEXT NOT NULL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, state)")
+        self._db.commit()
+
+    def create(self, request: dict, priority: int = 0, dedupe_key: str = None) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, dedupe_key, priority, state, request, events, created_at) "
+                "VALUES (?, ?, ?, ?, ?, '[]', ?)",
+                (job_id, dedupe_key, priority, QUEUED, json.dumps(request), self._clock()),
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        return self._to_dict(row)
+
+    def find_active(self, dedupe_key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE dedupe_key = ? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+                (dedupe_key, *ACTIVE_STATES),
+            ).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def count(self, state: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,)).fetchone()[0]
+
+    def mark_running(self, job_id: str) -> bool:
+        """Queued -> running; False if the job was cancelled while it waited."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET state = ?, started_at = ? WHERE id = ? AND state = ?",
+                (RUNNING, self._clock(), job_id, QUEUED),
+            )
+            self._db.commit()
+            return cur.rowcount == 1
+
+    def finish(self, job_id: str, state: str, result: dict = None, error: str = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (state, json.dumps(result) if result is not None else None, error, self._clock(), job_id),
+            )
+            self._db.commit()
+
+    def cancel_queued(self, job_id: str) -> bool:
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET state = ?, finished_at = ? WHERE id = ? AND state = ?",
+                (CANCELLED, self._clock(), job_id, QUEUED),
+            )
+            self._db.commit()
+            return cur.rowcount == 1
+
+    def append_event(self, job_id: str, event: str, data: dict):
+        entry = {"event": event, "data": data, "at": self._clock()}
+        with self._lock:
+            row = self._db.execute("SELECT events FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            events = json.loads(row["events"])
+            events.append(entry)
+            self._db.execute("UPDATE jobs SET events = ? WHERE id = ?", (json.dumps(events), job_id))
+            self._db.commit()
+
+    def recover(self) -> list:
+        """After a restart: running jobs go back to queued; returns every queued job."""
+        with self._lock:
+            self._db.execute("UPDATE jobs SET state = ?, started_at = NULL WHERE state = ?", (QUEUED, RUNNING))
+            self._db.commit()
+            rows = self._db.execute("SELECT * FROM jobs WHERE state = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def prune(self, older_than: float):
+        """Drop finished jobs that ended more than `older_than` seconds ago."""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE state NOT IN (?, ?) AND finished_at < ?",
+                (*ACTIVE_STATES, self._clock() - older_than),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {
+            "id": row["id"],
+            "state": row["state"],
+            "priority": row["priority"],
+            "request": json.loads(row["request"]),
+            "events": json.loads(row["events"]),
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+
+
+class JobQueue:
+    """
+    `runner(request, on_event)` does the actual work and returns the result
+    dict; it runs on at most `workers` jobs at a time.
+    """
+
+    def __init__(self, store: JobStore, runner, workers: int = 2, max_queued: int = 100,
+                 retention_seconds: float = 86400.0, retry_after: int = 30):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.retry_after = retry_after
+        self._queue = None
+        self._seq = itertools.count()
+        self._tasks = []
+        self._running = {}  # job id -> task running it
+        self._cancelling = set()
+        self._stats = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        for job in self.store.recover():
+            self._enqueue(job)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Running jobs stay "running" in the store and are re-queued by the next start()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, request: dict, priority: int = 0, dedupe_key: str = None):
+        """Returns (job, deduplicated)."""
+        if dedupe_key is not None:
+            existing = self.store.find_active(dedupe_key)
+            if existing is not None:
+                self._stats["deduplicated"] += 1
+                return existing, True
+        if self.store.count(QUEUED) >= self.max_queued:
+            raise Overloaded(429, "jobs: too many queued jobs", self.retry_after)
+
+        self.store.prune(self.retention_seconds)
+        job = self.store.create(request, priority, dedupe_key)
+        self._stats["submitted"] += 1
+        log_event("job.submitted", job_id=job["id"], priority=priority)
+        self._enqueue(job)
+        return job, False
+
+    def get(self, job_id: str) -> dict:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> dict:
+        job = self.store.get(job_id)
+        if job["state"] == QUEUED and self.store.cancel_queued(job_id):
+            self._stats["cancelled"] += 1
+        elif job["state"] == RUNNING and job_id in self._running:
+            self._cancelling.add(job_id)
+            self._running[job_id].cancel()
+        return self.store.get(job_id)
+
+    def _enqueue(self, job: dict):
+        if self._queue is not None:
+            self._queue.put_nowait((-job["priority"], next(self._seq), job["id"]))
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                if self.store.mark_running(job_id):
+                    await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        request = self.store.get(job_id)["request"]
+
+        async def on_event(event, data):
+            if event not in UNRECORDED_EVENTS:
+                self.store.append_event(job_id, event, data)
+
+        # The job id is the request id of everything the job does
+        with tracing.bind(job_id):
+            task = asyncio.create_task(self.runner(request, on_event))
+        self._running[job_id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job_id not in self._cancelling:
+                raise
+            self.store.finish(job_id, CANCELLED)
+            self._stats["cancelled"] += 1
+            log_event("job.cancelled", job_id=job_id)
+        except Exception as e:
+            self.store.finish(job_id, FAILED, error=f"{type(e).__name__}: {e}")
+            self._stats["failed"] += 1
+            log_event("job.failed", logging.WARNING, exc_info=e, job_id=job_id)
+        else:
+            self.store.finish(job_id, DONE, result=result)
+            self._stats["completed"] += 1
+            log_event("job.done", job_id=job_id)
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelling.discard(job_id)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "queued": self.store.count(QUEUED),
+            "running": len(self._running),
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+        }
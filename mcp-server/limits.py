@@ -0,0 +1,70 @@
+"""
+Per-endpoint concurrency limits.
+
+Each endpoint gets a semaphore (how many requests run at once) and a bounded
+wait queue. Instead of letting latency pile up, overflow is rejected early:
+
+- 429 when the wait queue is already full
+- 503 when a queued request could not get a slot within `queue_timeout`
+
+Both carry a Retry-After hint (seconds) that api.py turns into a header;
+`info` adds fields to the JSON body (see admission.py).
+"""
+import asyncio
+import contextlib
+
+
+class Overloaded(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int, info: dict = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+        self.info = info or {}
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 queue_timeout: float = 10.0, retry_after: int = 5):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be >= 1")
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._sem = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+        self._waiting = 0
+        self._rejected = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self._sem.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise Overloaded(429, f"{self.name}: too many queued requests", self.retry_after)
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise Overloaded(503, f"{self.name}: no capacity within {self.queue_timeout}s", self.retry_after)
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._sem.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
@@ -0,0 +1,166 @@
+"""
+Pooled Ollama client.
+
+One long-lived httpx.AsyncClient per AgentFixer keeps connections to
+localhost:11434 alive between calls instead of opening a fresh TCP connection
+for every generate_fix / generate_tests. Calls get separate connect and read
+timeouts, and transient failures (connection errors, timeouts, 5xx) are
+retried with exponential backoff.
+
+Deterministic calls (options.temperature == 0) are memoized by a hash of the
+request payload in a bounded LRU, so e.g. generate_tests for the same code and
+error is answered from memory.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+
+import metrics
+from tracing import log_event
+
+
+def prompt_key(payload: dict) -> str:
+    # "stream" only changes the transport, not the answer
+    stable = {k: v for k, v in payload.items() if k != "stream"}
+    return hashlib.sha256(json.dumps(stable, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def is_deterministic(payload: dict) -> bool:
+    return (payload.get("options") or {}).get("temperature") == 0
+
+
+class OllamaClient:
+    def __init__(
+        self,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        max_retries: int = None,
+        backoff_seconds: float = 0.5,
+        cache_size: int = None,
+        max_connections: int = 10,
+    ):
+        self.timeout = httpx.Timeout(
+            read_timeout if read_timeout is not None else float(os.getenv("LLM_TIMEOUT_SECONDS", "120")),
+            connect=connect_timeout if connect_timeout is not None else float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.backoff_seconds = backoff_seconds
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("LLM_CACHE_SIZE", "256"))
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+        self._client = None
+        self._loop = None
+        self._cache = OrderedDict()
+        self._stats = {"requests": 0, "retries": 0, "cache_hits": 0, "cache_misses": 0, "errors": 0}
+
+    def _http(self) -> httpx.AsyncClient:
+        # A client is tied to the loop it was created on (tests start several)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._loop = loop
+        return self._client
+
+    async def generate(self, url: str, payload: dict, on_token=None, call: str = "generate") -> Optional[str]:
+        """
+        POST an Ollama /api/generate payload and return the full response text
+        (None on a non-200 answer). With `on_token`, the call is streamed and
+        each token is awaited through the callback as it arrives. `call` names
+        the call type (fix, tests) in metrics and logs.
+        """
+        cacheable = self.cache_size > 0 and is_deterministic(payload)
+        key = prompt_key(payload) if cacheable else None
+        if cacheable:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                if on_token is not None:
+                    await on_token(hit)
+                return hit
+            self._stats["cache_misses"] += 1
+
+        started = time.perf_counter()
+        try:
+            if on_token is None:
+                text = await self._with_retries(lambda: self._post(url, payload))
+            else:
+                text = await self._with_retries(lambda: self._stream(url, payload, on_token))
+        except Exception:
+            metrics.LLM_ERRORS.inc(call=call)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.LLM_REQUEST_SECONDS.observe(elapsed, call=call)
+            log_event("llm.request", call=call, model=payload.get("model"), seconds=round(elapsed, 3))
+
+        if cacheable and text is not None:
+            self._cache[key] = text
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    async def _with_retries(self, call):
+        for attempt in range(self.max_retries + 1):
+            self._stats["requests"] += 1
+            try:
+                return await call()
+            except (httpx.TransportError, _ServerError) as e:
+                if attempt >= self.max_retries or getattr(e, "partial", False):
+                    self._stats["errors"] += 1
+                    raise
+                self._stats["retries"] += 1
+                await asyncio.sleep(self.backoff_seconds * (2 ** attempt))
+
+    async def _post(self, url: str, payload: dict) -> Optional[str]:
+        res = await self._http().post(url, json={**payload, "stream": False})
+        if res.status_code >= 500:
+            raise _ServerError(res.status_code)
+        if res.status_code != 200:
+            return None
+        return res.json().get("response", "")
+
+    async def _stream(self, url: str, payload: dict, on_token) -> Optional[str]:
+        """Ollama streams one JSON object per line."""
+        chunks = []
+        try:
+            async with self._http().stream("POST", url, json={**payload, "stream": True}) as res:
+                if res.status_code >= 500:
+                    raise _ServerError(res.status_code)
+                if res.status_code != 200:
+                    return None
+                async for line in res.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("response", "")
+                    if token:
+                        chunks.append(token)
+                        await on_token(token)
+                    if chunk.get("done"):
+                        break
+        except httpx.TransportError as e:
+            # Tokens already reached the client; replaying would duplicate them
+            e.partial = bool(chunks)
+            raise
+        return "".join(chunks)
+
+    def stats(self) -> dict:
+        return {**self._stats, "cache_entries": len(self._cache)}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class _ServerError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"LLM server returned {status_code}")
+        self.status_code = status_code
@@ -0,0 +1,154 @@
+"""
+Compaction of verify_fix logs for the next fix prompt.
+
+A failed attempt's logs are per-case failures (json.dumps(failures,
+indent=2)) or a fatal "Runtime Error: ..." string. Either way they carry
+full tracebacks through the harness, every input echoed back, and timing
+fields the model has no use for. On large inputs that makes each retry
+prompt bigger than the last, and Ollama's prompt evaluation becomes the
+slowest part of the loop.
+
+`compact_logs` rewrites them for the model:
+
+- metrics fields are dropped;
+- tracebacks keep only the innermost frames in the user's code ("<solution>")
+  and the exception line;
+- cases failing with the same error are merged into one entry listing their
+  indices;
+- long inputs, outputs and messages keep their head and tail around a
+  "...[N chars truncated]..." marker.
+
+If the result is still over the token budget, the limits shrink and fewer
+cases are shown until it fits. As a last resort the text is cut.
+"""
+import json
+import re
+
+# Rough chars-per-token for code and JSON in llama-family tokenizers
+CHARS_PER_TOKEN = 4
+USER_FILE = "<solution>"
+USER_FRAMES = 2
+
+# Fields the model doesn't need to fix the code
+DROPPED_FIELDS = {"wall_ms", "cpu_ms", "peak_memory_kb", "calls", "expected_source"}
+CLIPPED_FIELDS = ("input", "output", "expected", "error", "stdout", "reference_error")
+
+_FRAME = re.compile(r'^\s*File "([^"]+)", line \d+')
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def clip(text, limit: int) -> str:
+    """`text` cut to about `limit` chars, keeping head and tail around a size marker."""
+    if not isinstance(text, str):
+        text = json.dumps(text)
+    if len(text) <= limit:
+        return text
+    head = max(limit * 2 // 3, 1)
+    tail = max(limit - head, 0)
+    return f"{text[:head]}...[{len(text) - head - tail} chars truncated]...{text[len(text) - tail:] if tail else ''}"
+
+
+def user_frames(tb: str, keep: int = USER_FRAMES) -> str:
+    """The innermost `keep` frames in user code (with their source line) plus the exception line."""
+    if not tb:
+        return ""
+    lines = tb.rstrip("\n").split("\n")
+    frames = []
+    i = 0
+    while i < len(lines):
+        match = _FRAME.match(lines[i])
+        if match:
+            block = [lines[i].strip()]
+            if i + 1 < len(lines) and not _FRAME.match(lines[i + 1]) and lines[i + 1].startswith("    "):
+                block.append(lines[i + 1].strip())
+                i += 1
+            if match.group(1) == USER_FILE:
+                frames.append("\n".join(block))
+        i += 1
+    exception = next((line for line in reversed(lines) if line and not line.startswith(" ")), "")
+    return "\n".join(frames[-keep:] + ([exception] if exception else []))
+
+
+def _compact_case(case: dict, limit: int) -> dict:
+    compact = {}
+    for key, value in case.items():
+        if key in DROPPED_FIELDS or value is None:
+            continue
+        if key == "traceback":
+            value = clip(user_frames(value), limit)
+        elif key in CLIPPED_FIELDS:
+            value = clip(value, limit)
+        compact[key] = value
+    return compact
+
+
+def _group(failures: list, limit: int) -> list:
+    """Failures with the same status/error/traceback merged; first-seen order."""
+    groups = {}
+    for case in failures:
+        compact = _compact_case(case, limit)
+        signature = (compact.get("status"), compact.get("error"), compact.get("traceback"),
+                     compact.get("output") if compact.get("status") == "Wrong Answer" else None)
+        if signature in groups:
+            groups[signature]["same_failure_indices"].append(case.get("index"))
+        else:
+            groups[signature] = {**compact, "same_failure_indices": []}
+    compacted = []
+    for entry in groups.values():
+        if not entry["same_failure_indices"]:
+            del entry["same_failure_indices"]
+        compacted.append(entry)
+    return compacted
+
+
+def _render(groups: list, shown: int) -> str:
+    lines = [json.dumps(g, separators=(", ", ": ")) for g in groups[:shown]]
+    if len(groups) > shown:
+        lines.append(f"...[{len(groups) - shown} more distinct failures omitted]")
+    return "\n".join(lines)
+
+
+def _compact_fatal(logs: str, limit: int) -> str:
+    head, sep, tb = logs.partition("\\nTraceback:\\n")
+    if not sep:
+        head, sep, tb = logs.partition("\nTraceback:\n")
+    if not sep:
+        return clip(logs, limit)
+    frames = user_frames(tb)
+    return f"{clip(head, limit)}\nTraceback (innermost user frames):\n{clip(frames, limit)}"
+
+
+def compact_logs(logs: str, budget_tokens: int, field_limit: int = 400) -> str:
+    """verify_fix `logs` rewritten to fit in about `budget_tokens` tokens."""
+    if not logs:
+        return logs or ""
+    budget_chars = max(budget_tokens, 1) * CHARS_PER_TOKEN
+    try:
+        failures = json.loads(logs)
+    except (TypeError, ValueError):
+        failures = None
+
+    if not isinstance(failures, list) or not all(isinstance(f, dict) for f in failures):
+        limit = field_limit
+        text = _compact_fatal(logs, limit)
+        while len(text) > budget_chars and limit > 40:
+            limit //= 2
+            text = _compact_fatal(logs, limit)
+        return clip(text, budget_chars)
+
+    limit = field_limit
+    groups = _group(failures, limit)
+    shown = len(groups)
+    text = _render(groups, shown)
+    while len(text) > budget_chars and (limit > 40 or shown > 1):
+        # Shorter fields first, then fewer distinct failures
+        if limit > 40:
+            limit //= 2
+            groups = _group(failures, limit)
+        else:
+            shown = max(1, shown // 2)
+        text = _render(groups, shown)
+    return clip(text, budget_chars)
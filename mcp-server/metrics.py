@@ -0,0 +1,167 @@
+"""
+Process-wide metrics in the Prometheus text exposition format.
+
+A deliberately small subset of prometheus_client (not a dependency here):
+counters, gauges and cumulative histograms with labels, rendered by
+`render()` for the /metrics endpoint. Instruments are module globals so any
+module can record into them without threading a registry around.
+"""
+import threading
+
+# Seconds; covers a warm in-process run up to a cold E2B sandbox or a slow LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _label_key(labelnames, labels: dict) -> tuple:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=()) -> str:
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            _registry.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def reset(self):
+        with _lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def value(self, **labels):
+        """(count, sum) for one label set."""
+        state = self._values.get(_label_key(self.labelnames, labels))
+        return (state["count"], state["sum"]) if state else (0, 0.0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = sorted((k, {**v, "counts": list(v["counts"])}) for k, v in self._values.items())
+        for key, state in items:
+            for bound, count in zip(self.buckets, state["counts"]):
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+def render() -> str:
+    with _lock:
+        metrics = list(_registry)
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+# --- instruments -------------------------------------------------------------
+
+SANDBOX_ACQUIRE_SECONDS = Histogram(
+    "sandbox_acquire_seconds", "Time to lease a sandbox from the pool")
+VERIFY_EXECUTE_SECONDS = Histogram(
+    "verify_execute_seconds", "Harness execution time inside the sandbox")
+VERIFY_REQUESTS = Counter(
+    "verify_requests_total", "verify_solution_logic calls by how they were served",
+    ("source",))  # executed | cache | coalesced | preflight
+VERIFY_CASES = Counter(
+    "verify_cases_total", "Per-case harness results by status", ("status",))
+VERIFY_FATAL_ERRORS = Counter(
+    "verify_fatal_errors_total", "Runs that failed outright, by error name", ("error",))
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds", "Ollama call latency (cache hits excluded), by call type", ("call",))
+LLM_ERRORS = Counter(
+    "llm_errors_total", "Ollama calls that failed after retries, by call type", ("call",))
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests refused by the fair-share scheduler", ("endpoint", "reason"))
+AUTOFIX_ATTEMPTS = Histogram(
+    "autofix_attempts", "Fix attempts per auto-fix run", ("verified",), buckets=(1, 2, 3, 4, 5, 8))
+AUTOFIX_MEMO = Counter(
+    "autofix_memo_total", "Auto-fix runs answered from the verified-fix memo", ("result",))  # hit | stale
+AUTOFIX_PROMPT_TOKENS = Histogram(
+    "autofix_prompt_tokens", "Estimated tokens in each attempt's fix prompt",
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384))
+
+# Point-in-time values copied from component stats() at scrape time
+VERIFY_CACHE = Gauge(
+    "verification_cache_lookups", "Verification cache lookups since start", ("result",))
+VERIFY_CACHE_HIT_RATIO = Gauge(
+    "verification_cache_hit_ratio", "Verification cache hit rate since start")
+LLM_CACHE = Gauge(
+    "llm_cache_lookups", "LLM response cache lookups since start", ("result",))
+QUEUE_DEPTH = Gauge(
+    "queue_depth", "Requests or jobs waiting for capacity", ("queue",))
+IN_FLIGHT = Gauge(
+    "in_flight", "Requests or jobs currently running", ("queue",))
+SANDBOXES = Gauge(
+    "sandboxes", "Sandboxes in the pool by state", ("state",))
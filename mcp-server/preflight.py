@@ -0,0 +1,210 @@
+"""
+Static checks run in-process before any sandbox is leased.
+
+A submission that cannot parse, has nothing to call, imports something the
+sandbox is not meant to be used for, or calls a name that is defined
+nowhere fails the same way on every input. Finding that out used to cost a
+pool lease and a full harness run, once per /verify and once per autofix
+candidate. `check` finds it from `ast`/`symtable` alone and returns the
+harness's own fatal shape, so callers can't tell the difference except in
+latency:
+
+    {"name": "SyntaxError", "value": "...", "traceback": "..."}
+
+The checks are deliberately conservative: anything that could be defined
+dynamically (star imports, subclasses, classes built at runtime) passes and
+is left to the harness.
+
+The import denylist is a fast-fail for honest mistakes, not a security
+boundary: it covers `import`, `__import__` and `importlib`, but code that
+digs the import machinery out of builtins or an allowed module still gets
+through. Isolation is the sandbox's job.
+"""
+import ast
+import builtins
+import os
+import symtable
+import traceback
+
+import harness
+
+DEFAULT_DISALLOWED_IMPORTS = ("os", "subprocess", "socket", "shutil", "ctypes", "multiprocessing", "signal", "pty",
+                              "importlib")
+
+# Stands for an __import__() whose module isn't a string literal
+DYNAMIC_IMPORT = "__import__"
+
+# Always bound in the harness namespace (besides builtins)
+_NAMESPACE_NAMES = {"__name__", "__builtins__"}
+
+
+def disallowed_imports() -> set:
+    """VERIFY_DISALLOWED_IMPORTS (comma-separated top-level modules; empty = none)."""
+    raw = os.getenv("VERIFY_DISALLOWED_IMPORTS")
+    if raw is None:
+        return set(DEFAULT_DISALLOWED_IMPORTS)
+    return {m.strip() for m in raw.split(",") if m.strip()}
+
+
+def _error(name: str, value: str, filename: str, source: str, lineno: int = None) -> dict:
+    """A harness-style fatal dict pointing at `lineno`."""
+    tb = ""
+    if lineno:
+        lines = source.splitlines()
+        line = lines[lineno - 1].strip() if 0 < lineno <= len(lines) else ""
+        tb = f'  File "{filename}", line {lineno}\n    {line}\n'
+    return {"name": name, "value": value, "traceback": f"{tb}{name}: {value}\n"}
+
+
+def _imports(tree):
+    """
+    (top-level module, lineno) for every import, including __import__("...")
+    literals; an __import__ of anything else yields DYNAMIC_IMPORT.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split(".")[0], node.lineno
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module.split(".")[0], node.lineno
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "__import__":
+            if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+                yield node.args[0].value.split(".")[0], node.lineno
+            else:
+                yield DYNAMIC_IMPORT, node.lineno
+
+
+def _has_star_import(tree) -> bool:
+    return any(isinstance(node, ast.ImportFrom) and any(a.name == "*" for a in node.names)
+               for node in ast.walk(tree))
+
+
+def _target_error(tree, method_name: str = None):
+    """Why the harness would find nothing to call, or None."""
+    classes = [node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
+    assigned = {t.id for node in tree.body if isinstance(node, ast.Assign) for t in node.targets
+                if isinstance(t, ast.Name)}
+    if not classes:
+        return None if "Solution" in assigned else ("No Solution class found", None)
+
+    # Same pick as harness.resolve: Solution, else the first class
+    top = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+    target = next((c for c in top if c.name == "Solution"), top[0] if top else None)
+    if target is None or target.bases or target.keywords or target.decorator_list:
+        return None  # Methods may come from elsewhere
+    members = set()
+    for node in target.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            members.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            return None  # e.g. f = staticmethod(...); let the harness decide
+    if method_name:
+        if method_name not in members:
+            return f"{target.name} has no method {method_name!r}", target.lineno
+    elif not any(not m.startswith("__") for m in members):
+        return f"{target.name} has no method to call", target.lineno
+    return None
+
+
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+
+
+def _first_read(tree, spans: dict, name: str, table) -> int:
+    """
+    Line of the first read of `name` in `table`'s scope. symtable only knows
+    where the scope starts; reads in nested scopes where `name` is local
+    belong to those scopes.
+    """
+    if table.get_type() == "module":
+        start, end = 1, float("inf")
+    else:
+        start = table.get_lineno()
+        end = spans.get(start, start)
+    hidden = [(c.get_lineno(), spans.get(c.get_lineno(), c.get_lineno())) for c in table.get_children()
+              if name in c.get_identifiers() and c.lookup(name).is_local()]
+    lines = [node.lineno for node in ast.walk(tree)
+             if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Load)
+             and start <= node.lineno <= end and not any(a <= node.lineno <= b for a, b in hidden)]
+    return min(lines, default=table.get_lineno())
+
+
+def _undefined_names(source: str, filename: str, known: set, tree) -> list:
+    """(name, lineno of its first read) for global names that are read but bound nowhere."""
+    top = symtable.symtable(source, filename, "exec")
+    defined = set(known)
+    tables, referenced = [top], []
+    while tables:
+        table = tables.pop()
+        for symbol in table.get_symbols():
+            name = symbol.get_name()
+            if table is top and (symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace()):
+                defined.add(name)
+            elif symbol.is_declared_global() and symbol.is_assigned():
+                defined.add(name)
+            # is_local() guards against symtable treating a function named "top" as module scope
+            if symbol.is_referenced() and symbol.is_global() and (table is top or not symbol.is_local()):
+                referenced.append((name, table))
+        tables.extend(table.get_children())
+    spans = {node.lineno: node.end_lineno for node in ast.walk(tree) if isinstance(node, _SCOPES)}
+    missing = {}
+    for name, table in referenced:
+        if name not in defined:
+            lineno = _first_read(tree, spans, name, table)
+            missing[name] = min(lineno, missing.get(name, lineno))
+    return sorted(missing.items(), key=lambda item: (item[1], item[0]))
+
+
+def prelude_names(prelude) -> set:
+    """Names a session prelude binds (see harness.snapshot) without importing anything here."""
+    names = set()
+    for module in prelude or ():
+        names.add(module.split(".")[0])
+        if module in harness.STAR_IMPORTS:
+            names.update(getattr(__import__(module), "__all__", ()))
+    return names
+
+
+def check(source: str, filename: str = "<solution>", method_name: str = None, prelude=None,
+          disallowed: set = None) -> dict:
+    """The fatal error the harness would report for `source` regardless of input, or None."""
+    try:
+        tree = compile(source, filename, "exec", ast.PyCF_ONLY_AST)
+        # ast alone misses some errors the compiler raises ('return' outside function, ...)
+        compile(tree, filename, "exec")
+    except SyntaxError as e:
+        return {"name": type(e).__name__, "value": str(e),
+                "traceback": "".join(traceback.format_exception_only(type(e), e))}
+    except ValueError as e:  # null bytes
+        return {"name": "SyntaxError", "value": str(e), "traceback": f"SyntaxError: {e}\n"}
+
+    blocked = disallowed_imports() if disallowed is None else disallowed
+    for module, lineno in _imports(tree):
+        if module == DYNAMIC_IMPORT and blocked:
+            return _error("ImportError", "__import__ of a computed module name is not allowed", filename, source,
+                          lineno)
+        if module in blocked:
+            return _error("ImportError", f"import of {module!r} is not allowed", filename, source, lineno)
+
+    problem = _target_error(tree, method_name)
+    if problem is not None:
+        message, lineno = problem
+        return _error("TargetError", message, filename, source, lineno)
+
+    if not _has_star_import(tree):
+        known = set(vars(builtins)) | _NAMESPACE_NAMES | prelude_names(prelude)
+        missing = _undefined_names(source, filename, known, tree)
+        if missing:
+            name, lineno = missing[0]
+            return _error("NameError", f"name {name!r} is not defined", filename, source, lineno)
+    return None
+
+
+def check_submission(code: str, reference_code: str = None, method_name: str = None, prelude=None) -> dict:
+    """check() for the solution and, if given, the reference solution (reported as in the harness)."""
+    error = check(code, "<solution>", method_name, prelude)
+    if error is None and reference_code:
+        ref_error = check(reference_code, "<reference>", method_name, prelude)
+        if ref_error is not None:
+            return {**ref_error, "name": "ReferenceSolutionError",
+                    "value": f"{ref_error['name']}: {ref_error['value']}"}
+    return error
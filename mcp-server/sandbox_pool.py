@@ -0,0 +1,365 @@
+"""
+Warm sandbox pool.
+
+Creating an E2B sandbox is a VM cold start, which dominated /verify latency
+when every call did `with Sandbox.create() as sandbox:`. The pool keeps a
+bounded set of sandboxes alive and leases them out:
+
+    async with pool.lease() as sandbox:
+        execution = await sandbox.run_code(script)
+
+Between leases each sandbox is reset so one user's globals never leak into the
+next run. Sandboxes are recycled after `max_uses` executions, evicted after
+`max_idle_seconds` without work, and probed before reuse if they have been idle
+longer than `health_check_after` seconds. With `max_age_seconds` set (E2B
+sandboxes are killed server-side once their creation timeout runs out), a
+sandbox that old is dropped rather than leased again. Eviction happens on
+the next acquire and whenever `reap()` runs; the server schedules it.
+
+Sandboxes follow the `e2b_code_interpreter.AsyncSandbox` surface: an async
+factory, `await run_code()`, and `kill()` (sync or async). `LocalSandbox` is an
+in-process stand-in so the pool (and the harness in server.py) can be exercised
+offline.
+"""
+import asyncio
+import builtins
+import contextlib
+import inspect
+import io
+import logging
+import threading
+import time
+import traceback
+
+from tracing import log_event
+
+# Clears the IPython user namespace of an E2B code-interpreter kernel.
+RESET_SNIPPET = "%reset -f"
+HEALTH_PROBE = "1 + 1"
+
+
+class PoolExhausted(TimeoutError):
+    """Raised when no sandbox could be leased within `acquire_timeout`."""
+
+
+# --- In-process stand-in -------------------------------------------------
+
+class _Logs:
+    def __init__(self, stdout: str = "", stderr: str = ""):
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class _Error:
+    def __init__(self, name: str, value: str, traceback: str = ""):
+        self.name = name
+        self.value = value
+        self.traceback = traceback
+
+
+class _Execution:
+    def __init__(self, stdout: str = "", stderr: str = "", error: _Error = None):
+        self.logs = _Logs(stdout, stderr)
+        self.error = error
+
+
+class LocalSandbox:
+    """
+    Mimics the subset of `e2b_code_interpreter.AsyncSandbox` the server uses.
+
+    Code runs in this process (on a worker thread) with a persistent
+    `__main__`-like namespace, the same way a Jupyter kernel keeps state
+    between cells. There is NO isolation: use it for tests and offline
+    development only.
+    """
+
+    # redirect_stdout swaps sys.stdout process-wide, so runs are serialized.
+    _exec_lock = threading.Lock()
+
+    def __init__(self):
+        self.alive = True
+        self._namespace = {}
+        self._clear()
+
+    @classmethod
+    async def create(cls):
+        return cls()
+
+    def _clear(self):
+        self._namespace = {"__name__": "__main__", "__builtins__": builtins}
+
+    async def reset(self):
+        self._clear()
+
+    async def run_code(self, code: str) -> _Execution:
+        if not self.alive:
+            raise RuntimeError("Sandbox has been killed")
+        if code.strip() == RESET_SNIPPET:
+            self._clear()
+            return _Execution()
+        return await asyncio.to_thread(self._run_sync, code)
+
+    def _run_sync(self, code: str) -> _Execution:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        error = None
+        with self._exec_lock:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    exec(compile(code, "<sandbox>", "exec"), self._namespace)
+                except BaseException as e:  # mirror a kernel: nothing escapes the cell
+                    error = _Error(type(e).__name__, str(e), traceback.format_exc())
+        return _Execution(stdout.getvalue(), stderr.getvalue(), error)
+
+    def kill(self):
+        self.alive = False
+        self._namespace = {}
+
+
+# --- Pool ----------------------------------------------------------------
+
+class _Entry:
+    __slots__ = ("sandbox", "uses", "created", "last_used")
+
+    def __init__(self, sandbox, now: float):
+        self.sandbox = sandbox
+        self.uses = 0
+        self.created = now
+        self.last_used = now
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def _default_reset(sandbox) -> bool:
+    if hasattr(sandbox, "reset"):
+        await _maybe_await(sandbox.reset())
+        return True
+    execution = await sandbox.run_code(RESET_SNIPPET)
+    return not execution.error
+
+
+async def _default_health_check(sandbox) -> bool:
+    execution = await sandbox.run_code(HEALTH_PROBE)
+    return not execution.error
+
+
+async def _kill_quietly(sandbox):
+    try:
+        await _maybe_await(sandbox.kill())
+    except Exception as e:
+        log_event("sandbox.kill_failed", logging.WARNING, error=str(e))
+
+
+class SandboxPool:
+    def __init__(
+        self,
+        factory,
+        min_size: int = 0,
+        max_size: int = 4,
+        max_uses: int = 50,
+        max_idle_seconds: float = 120.0,
+        max_age_seconds: float = None,
+        health_check_after: float = 30.0,
+        acquire_timeout: float = 30.0,
+        reset=_default_reset,
+        health_check=_default_health_check,
+        clock=time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        if not 0 <= min_size <= max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_idle_seconds = max_idle_seconds
+        self.max_age_seconds = max_age_seconds
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self._reset = reset
+        self._health_check = health_check
+        self._clock = clock
+
+        self._cond = asyncio.Condition()
+        self._idle = []      # LIFO stack of _Entry; the bottom is the oldest
+        self._size = 0       # idle + leased + being created
+        self._closed = False
+        self._stats = {"created": 0, "recycled": 0, "evicted": 0, "unhealthy": 0, "expired": 0, "leases": 0}
+
+    # -- public API --
+
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        """Lease a warm sandbox. It is discarded if the block raises or is cancelled."""
+        entry = await self._acquire()
+        ok = False
+        try:
+            yield entry.sandbox
+            ok = True
+        finally:
+            await self._release(entry, discard=not ok)
+
+    async def warm(self):
+        """Create sandboxes until `min_size` exist (e.g. at server startup)."""
+        while True:
+            async with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            entry = await self._create()
+            async with self._cond:
+                self._idle.insert(0, entry)
+                self._cond.notify()
+
+    async def reap(self):
+        """
+        Evict sandboxes idle for longer than `max_idle_seconds`, down to
+        `min_size`, and idle ones older than `max_age_seconds`.
+        """
+        async with self._cond:
+            victims = self._pop_expired()
+        for entry in victims:
+            await _kill_quietly(entry.sandbox)
+
+    async def close(self):
+        async with self._cond:
+            self._closed = True
+            victims, self._idle = self._idle, []
+            self._size -= len(victims)
+            self._cond.notify_all()
+        for entry in victims:
+            await _kill_quietly(entry.sandbox)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "size": self._size,
+            "idle": len(self._idle),
+            "leased": self._size - len(self._idle),
+            "max_size": self.max_size,
+        }
+
+    # -- internals --
+
+    def _too_old(self, entry: _Entry, now: float) -> bool:
+        return self.max_age_seconds is not None and now - entry.created >= self.max_age_seconds
+
+    def _pop_expired(self) -> list:
+        """Caller holds the lock."""
+        now = self._clock()
+        # Past max_age the sandbox is gone server-side, whatever min_size says
+        victims = [entry for entry in self._idle if self._too_old(entry, now)]
+        if victims:
+            self._idle = [entry for entry in self._idle if not self._too_old(entry, now)]
+            self._size -= len(victims)
+            self._stats["expired"] += len(victims)
+        while self._idle and self._size > self.min_size:
+            oldest = self._idle[0]
+            if now - oldest.last_used < self.max_idle_seconds:
+                break
+            victims.append(self._idle.pop(0))
+            self._size -= 1
+            self._stats["evicted"] += 1
+        return victims
+
+    async def _create(self) -> _Entry:
+        """Caller has already reserved a slot in `_size`."""
+        try:
+            sandbox = await self.factory()
+        except BaseException:
+            async with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._stats["created"] += 1
+        return _Entry(sandbox, self._clock())
+
+    async def _acquire(self) -> _Entry:
+        deadline = self._clock() + self.acquire_timeout
+        while True:
+            async with self._cond:
+                victims = self._pop_expired()
+                entry = None
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Sandbox pool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        raise PoolExhausted(
+                            f"No sandbox available within {self.acquire_timeout}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                self._stats["leases"] += 1
+
+            for victim in victims:
+                await _kill_quietly(victim.sandbox)
+
+            if entry is None:
+                return await self._create()
+
+            idle_for = self._clock() - entry.last_used
+            if idle_for < self.health_check_after or await self._is_healthy(entry.sandbox):
+                return entry
+
+            # Stale sandbox (e.g. expired server-side): drop it and try again.
+            await self._discard(entry, stat="unhealthy")
+
+    async def _is_healthy(self, sandbox) -> bool:
+        try:
+            return bool(await self._health_check(sandbox))
+        except Exception:
+            return False
+
+    async def _release(self, entry: _Entry, discard: bool = False):
+        entry.uses += 1
+        if discard:
+            await self._discard(entry, stat="unhealthy")
+            return
+        if entry.uses >= self.max_uses:
+            await self._discard(entry, stat="recycled")
+            return
+        if self._too_old(entry, self._clock()):
+            await self._discard(entry, stat="expired")
+            return
+
+        try:
+            clean = await self._reset(entry.sandbox)
+        except Exception as e:
+            log_event("sandbox.reset_failed", logging.WARNING, error=str(e))
+            clean = False
+        if not clean:
+            await self._discard(entry, stat="unhealthy")
+            return
+
+        entry.last_used = self._clock()
+        async with self._cond:
+            closed = self._closed
+            if closed:
+                self._size -= 1
+            else:
+                self._idle.append(entry)
+            self._cond.notify()
+        if closed:
+            await _kill_quietly(entry.sandbox)
+
+    async def _discard(self, entry: _Entry, stat: str):
+        async with self._cond:
+            self._size -= 1
+            self._stats[stat] += 1
+            self._cond.notify()
+        await _kill_quietly(entry.sandbox)
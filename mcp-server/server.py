@@ -1,120 +1,265 @@
-from e2b_code_interpreter import Sandbox
-import ast
-import traceback
-import sys
+import json
+import logging
+import os
+import time
 from dotenv import load_dotenv
 
+import harness
+import metrics
+import preflight
+from tracing import log_event
+from executors import Executor, build_executor
+from single_flight import SingleFlight
+from verification_cache import VerificationCache, cache_key, normalize_code
+from case_history import permute, restore
+
 load_dotenv()
 
-def verify_solution_logic(code: str, test_inputs: list[str]) -> str:
-    # 1. Initialize E2B Sandbox (Synchronous context manager)
-    with Sandbox.create() as sandbox:
-        # 2. Prepare the verification script
-        # Safe string injection: repr() ensures we get a valid python string literal
-        inputs_repr = repr(test_inputs)
-        
-        full_script = f"""
-import ast
-import traceback
-import sys
-import json
+_executor = None
+_verification_cache = None
+# Identical concurrent verifications share one execution
+verify_flights = SingleFlight()
+
+def get_executor() -> Executor:
+    """Lazily build the process-wide executor (SANDBOX_BACKEND picks e2b/local/inprocess)."""
+    global _executor
+    if _executor is None:
+        _executor = build_executor()
+    return _executor
+
+# Where state that should survive a restart lives unless its own setting says otherwise
+DATA_DIR = os.getenv("DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+def data_path(setting: str, filename: str) -> str:
+    """
+    The SQLite path in environment variable `setting` (":memory:" keeps the
+    data in memory, as the tests do), else `filename` under DATA_DIR.
+    """
+    path = os.getenv(setting)
+    if path:
+        return path
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, filename)
+
+def get_verification_cache() -> VerificationCache:
+    """Process-wide result cache (VERIFY_CACHE_SIZE=0 disables it)."""
+    global _verification_cache
+    if _verification_cache is None:
+        _verification_cache = VerificationCache(
+            max_entries=int(os.getenv("VERIFY_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("VERIFY_CACHE_TTL", "3600")),
+            db_path=os.getenv("VERIFY_CACHE_DB") or None,
+        )
+    return _verification_cache
+
+def harness_options(fail_fast: bool = False, max_failures: int = None, case_timeout: float = None,
+                    case_cpu_timeout: float = None, deadline: float = None, measure: bool = None,
+                    method_name: str = None, compare: str = None, float_tolerance: float = None,
+                    prelude: list = None) -> dict:
+    """
+    Settings for one harness run. Timeouts left as None fall back to
+    VERIFY_CASE_TIMEOUT / VERIFY_CASE_CPU_TIMEOUT / VERIFY_DEADLINE (0 = off).
+    `measure` turns on peak-memory and call-count tracking (VERIFY_MEASURE,
+    off by default: tracemalloc and the call counter slow every case down);
+    wall and CPU time are always reported. `method_name` names the method to
+    call; by default the first public method of the target class is used.
+    `compare` ("exact", "unordered", "unordered_deep") and `float_tolerance`
+    control how outputs are checked against expected/reference outputs.
+    `prelude` lists modules pre-imported into the user namespace (session
+    sandboxes, see sessions.py).
+    """
+    if compare not in (None, "exact", "unordered", "unordered_deep"):
+        raise ValueError(f"Unknown compare mode: {compare}")
+    def env_seconds(name, default):
+        value = float(os.getenv(name, default))
+        return value if value > 0 else None
+
+    if fail_fast:
+        max_failures = 1
+    return {
+        "fail_fast": bool(fail_fast),
+        "max_failures": max_failures if max_failures and max_failures > 0 else None,
+        "case_timeout": case_timeout if case_timeout is not None else env_seconds("VERIFY_CASE_TIMEOUT", "10"),
+        "case_cpu_timeout": case_cpu_timeout if case_cpu_timeout is not None else env_seconds("VERIFY_CASE_CPU_TIMEOUT", "0"),
+        "deadline": deadline if deadline is not None else env_seconds("VERIFY_DEADLINE", "25"),
+        "measure": measure if measure is not None else os.getenv("VERIFY_MEASURE", "0") == "1",
+        "method_name": method_name or None,
+        "compare": compare or "exact",
+        "float_tolerance": float_tolerance,
+        "prelude": list(prelude) if prelude else None,
+    }
+
+async def verify_solution_logic(code: str, test_inputs: list[str], expected: list = None,
+                                timings: dict = None, reference_code: str = None,
+                                executor: Executor = None, use_cache: bool = True, order: list = None,
+                                **options) -> str:
+    """
+    Run every input in ONE execution (user code is compiled once) and return
+    the harness results as a JSON list with one result dict per case, or a
+    "Runtime Error: ..." string when the code or the sandbox failed outright.
+
+    `expected` optionally holds one expected output per input (None = don't
+    check); cases whose output differs are reported as "Wrong Answer".
+    `reference_code` is a known-good solution run on the same inputs in the
+    same execution: its output is the expected value for every case that has
+    none ("expected_source": "reference").
+
+    `options` are harness_options() keywords: with `fail_fast` / `max_failures`
+    the remaining cases are "Skipped" once enough have failed, and cases that
+    overrun `case_timeout` (wall), `case_cpu_timeout` or the run-wide `deadline`
+    are cut short as "Time Limit Exceeded". Either way the case's "reason"
+    says why. `executor` runs the harness somewhere other than the shared
+    pool (a session's pinned sandbox).
+
+    Every case that ran reports wall_ms and cpu_ms, plus peak_memory_kb
+    (tracemalloc) and calls (invocations of the target method, recursion
+    included) when `measure` is on. `timings`, if given, is filled with the
+    run's phase timings: build_ms, acquire_ms, execute_ms (or cache_hit),
+    and sandbox_error when the executor itself failed.
+
+    Deterministic results are served from the verification cache, so
+    re-running an unchanged drill doesn't pay for another sandbox run, and a
+    request identical to one still executing waits for that execution
+    instead of starting its own (timings then only say "coalesced").
+    `use_cache=False` skips both, for callers that want the run itself
+    (profiling: cached timings measure nothing).
+
+    `order` (a permutation of the case indices, see case_history.py) runs
+    the cases in that order; results still come back in the caller's order,
+    and the cache and coalescing keys don't depend on it.
+
+    Code that fails the static pre-flight checks (preflight.py: syntax,
+    missing target, disallowed imports, undefined names) is rejected with
+    the same fatal error the harness would give, without leasing a sandbox
+    (timings then say "preflight": "rejected").
+    """
+    opts = harness_options(**options)
+    cache = get_verification_cache()
+    key = cache_key(code, test_inputs, expected, **opts,
+                    reference=normalize_code(reference_code) if reference_code else None)
+    cached = cache.get(key) if use_cache else None
+    if cached is not None:
+        if timings is not None:
+            timings["cache_hit"] = True
+        metrics.VERIFY_REQUESTS.inc(source="cache")
+        log_event("verify.cache_hit", logging.DEBUG, key=key[:16], cases=len(test_inputs))
+        return cached
+
+    rejected = preflight_error(code, reference_code, opts["method_name"], opts["prelude"], timings)
+    if rejected is not None:
+        return rejected
+
+    async def execute():
+        run_timings = timings if timings is not None else {}
+        if order is None:
+            result = await _execute_harness(code, test_inputs, expected, opts, run_timings, reference_code, executor)
+        else:
+            result = await _execute_harness(code, permute(test_inputs, order), permute(expected, order), opts,
+                                            run_timings, reference_code, executor)
+            results, error = parse_results(result)
+            if error is None:
+                result = json.dumps(restore(results, order))
+        # A failed sandbox says nothing about the code, whatever the error is called
+        if use_cache and "sandbox_error" not in run_timings:
+            cache.put(key, result, code=code if not reference_code else f"{code}\n{reference_code}")
+        metrics.VERIFY_REQUESTS.inc(source="executed")
+        log_event("verify.executed", key=key[:16], cases=len(test_inputs), **run_timings)
+        return result
+
+    def joined():
+        if timings is not None:
+            timings["coalesced"] = True
+        metrics.VERIFY_REQUESTS.inc(source="coalesced")
+        log_event("verify.coalesced", logging.DEBUG, key=key[:16], cases=len(test_inputs))
+
+    if not use_cache:
+        return await execute()
+    return await verify_flights.do(key, execute, on_join=joined)
+
+async def _execute_harness(code: str, test_inputs: list[str], expected: list = None, options: dict = None,
+                           timings: dict = None, reference_code: str = None, executor: Executor = None) -> str:
+    build_started = time.perf_counter()
+    # 1. The harness module is installed once per sandbox; a run only ships data
+    executor = executor or get_executor()
+    executor.install(harness.MODULE_NAME, _harness_loader())
+    script = harness.run_script({
+        "code": code,
+        "inputs": list(test_inputs),
+        "expected": list(expected or []),
+        "reference_code": reference_code,
+        "isolate": isolates(executor),
+        "options": {**(options or harness_options()), "stdout_limit": int(os.getenv("VERIFY_STDOUT_LIMIT", "4096"))},
+    })
+    if timings is not None:
+        timings["build_ms"] = round((time.perf_counter() - build_started) * 1000, 3)
+
+    # 2. Run the code on the configured backend (warm, pooled)
+    execution = await executor.run(script, timings=timings)
+    if timings is not None:
+        if "acquire_ms" in timings:
+            metrics.SANDBOX_ACQUIRE_SECONDS.observe(timings["acquire_ms"] / 1000)
+        if "execute_ms" in timings:
+            metrics.VERIFY_EXECUTE_SECONDS.observe(timings["execute_ms"] / 1000)
+
+    if execution.error:
+        # The sandbox itself failed (timeout, crashed worker)
+        if timings is not None:
+            timings["sandbox_error"] = execution.error.name
+        return _fatal(execution.error.name, execution.error.value, execution.logs.stderr)
+
+    frame = harness.read_frame(execution.logs.stdout)
+    if frame is None:
+        return _fatal("HarnessError", "no result frame in sandbox output", execution.logs.stderr)
+    if "fatal" in frame:
+        # User code didn't compile or failed at import time
+        err = frame["fatal"]
+        return _fatal(err["name"], err["value"], err["traceback"])
+    for result in frame["results"]:
+        metrics.VERIFY_CASES.inc(status=result.get("status", "unknown"))
+    return json.dumps(frame["results"])
+
+def preflight_error(code: str, reference_code: str = None, method_name: str = None, prelude: list = None,
+                    timings: dict = None):
+    """verify_solution_logic's fatal-error string for code that can't pass on any input, or None."""
+    if os.getenv("VERIFY_PREFLIGHT", "1") == "0":
+        return None
+    error = preflight.check_submission(code, reference_code, method_name, prelude)
+    if error is None:
+        return None
+    if timings is not None:
+        timings["preflight"] = "rejected"
+    metrics.VERIFY_REQUESTS.inc(source="preflight")
+    return _fatal(error["name"], error["value"], error["traceback"])
+
+def isolates(executor: Executor) -> bool:
+    """Whether runs fork per submission in the sandbox (harness.isolated); the in-process backend can't."""
+    return executor.name != "inprocess"
+
+_loader = None
+
+def _harness_loader() -> str:
+    global _loader
+    if _loader is None:
+        _loader = harness.loader_script(harness.source())
+    return _loader
+
+def _fatal(name: str, value: str, details) -> str:
+    metrics.VERIFY_FATAL_ERRORS.inc(error=name)
+    log_event("verify.fatal", logging.WARNING, error=name, detail=str(value)[:200])
+    if isinstance(details, (list, tuple)):
+        details = "".join(details)
+    return f"Runtime Error: {name}: {value}\\nTraceback:\\n{details}"
 
-# --- User Code ---
-{code}
-# -----------------
-
-# --- Test Harness ---
-results = []
-try:
-    # 1. Parse Input Batch
-    # We expect raw_inputs to be a list of strings
-    raw_inputs = {inputs_repr}
-    
-    for idx, raw_input_str in enumerate(raw_inputs):
-        try:
-            # Split by lines to handle multiple arguments (standard LeetCode format)
-            lines = [line.strip() for line in raw_input_str.strip().split('\\n') if line.strip()]
-            parsed_args = []
-            for line in lines:
-                try:
-                    parsed_args.append(ast.literal_eval(line))
-                except:
-                    parsed_args.append(line)
-                    
-            # 2. Dynamic Class Discovery (Do this once? No, maybe per test if state leaks? 
-            # Actually user code is global, but instance should be fresh per test)
-            target_cls = None
-            if 'Solution' in globals():
-                target_cls = Solution
-            else:
-                for name, obj in list(globals().items()):
-                    if isinstance(obj, type) and obj.__module__ == '__main__':
-                        target_cls = obj
-                        break
-            
-            if target_cls:
-                # 3. Design Pattern Detection
-                is_design = False
-                if len(parsed_args) == 2 and isinstance(parsed_args[0], list) and isinstance(parsed_args[1], list):
-                     commands = parsed_args[0]
-                     params = parsed_args[1]
-                     if len(commands) > 0 and (commands[0] == target_cls.__name__ or commands[0] == 'MyQueue' or commands[0] == 'MinStack'): 
-                         is_design = True
-                         
-                if is_design:
-                     commands = parsed_args[0]
-                     params = parsed_args[1]
-                     obj = target_cls() 
-                     design_results = [None] 
-                     
-                     for i in range(1, len(commands)):
-                         cmd = commands[i]
-                         args = params[i]
-                         if not hasattr(obj, cmd):
-                             design_results.append(None)
-                             continue
-                         method = getattr(obj, cmd)
-                         try:
-                             res = method(*args)
-                             design_results.append(res)
-                         except TypeError:
-                             res = method(args)
-                             design_results.append(res)
-                     
-                     results.append({{"index": idx, "input": raw_input_str, "output": str(design_results), "status": "Passed"}})
-                     
-                else:
-                     sol = target_cls()
-                     methods = [m for m in dir(sol) if not m.startswith('__')]
-                     if methods:
-                         method_name = methods[0]
-                         method = getattr(sol, method_name)
-                         try:
-                            res = method(*parsed_args)
-                         except:
-                            res = method(parsed_args)
-                         
-                         results.append({{"index": idx, "input": raw_input_str, "output": str(res), "status": "Passed"}})
-                     else:
-                         results.append({{"index": idx, "input": raw_input_str, "error": "No public method found", "status": "Runtime Error"}})
-            else:
-                results.append({{"index": idx, "input": raw_input_str, "error": "No Solution class found", "status": "Runtime Error"}})
-
-        except Exception as e:
-            # Capture individual test failure
-            results.append({{"index": idx, "input": raw_input_str, "error": str(e), "traceback": traceback.format_exc(), "status": "Runtime Error"}})
-
-    # Print JSON results to stdout for easier parsing
-    print(json.dumps(results))
-
-except Exception:
-    traceback.print_exc()
-"""
-        # 3. Run the code inside the isolated VM
-        execution = sandbox.run_code(full_script)
-        
-        if execution.error:
-            # Fatal script error (syntax error in user code likely)
-            return f"Runtime Error: {execution.error.name}: {execution.error.value}\\nTraceback:\\n{execution.logs.stderr}"
-        
-        return execution.logs.stdout
+def parse_results(logs: str):
+    """
+    Split verify_solution_logic output into (per-case results, fatal error).
+    Exactly one of the two is meaningful: a JSON list means the harness ran,
+    anything else is a fatal error string (syntax error, sandbox failure).
+    """
+    try:
+        results = json.loads(logs)
+        if isinstance(results, list):
+            return results, None
+    except (TypeError, ValueError):
+        pass
+    return [], logs
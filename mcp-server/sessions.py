@@ -0,0 +1,151 @@
+"""
+Pinned sandboxes for drill sessions.
+
+A user working through a drill session verifies many small programs in a
+row. Through the shared pool every run may land on a different sandbox and
+starts from an empty namespace that re-imports what it needs. A session
+instead owns a one-sandbox executor for its lifetime:
+
+- the harness and a prelude (collections, heapq, bisect, ...) are loaded
+  once when the session is created, so the first verify is already warm;
+- each run starts from a copy of the prelude namespace snapshot taken in the
+  sandbox (harness.snapshot), not from a new interpreter;
+- sessions idle for longer than their TTL are closed, and their sandbox
+  with them, on the next sweep: on the next request, or when the server's
+  periodic reaper calls `reap()`.
+"""
+import asyncio
+import re
+import time
+import uuid
+
+import harness
+from limits import Overloaded
+from tracing import log_event
+
+DEFAULT_PRELUDE = ("collections", "heapq", "bisect", "itertools", "functools", "math", "typing",
+                   "string", "re", "operator")
+_MODULE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+class Session:
+    def __init__(self, session_id: str, executor, prelude: list, ttl_seconds: float, now: float):
+        self.id = session_id
+        self.executor = executor
+        self.prelude = list(prelude)
+        self.ttl_seconds = ttl_seconds
+        self.created_at = now
+        self.last_used = now
+        self.runs = 0
+
+    def expired(self, now: float) -> bool:
+        return now - self.last_used > self.ttl_seconds
+
+    def info(self, now: float) -> dict:
+        return {
+            "session_id": self.id,
+            "prelude": self.prelude,
+            "runs": self.runs,
+            "ttl_seconds": self.ttl_seconds,
+            "expires_in": round(max(0.0, self.ttl_seconds - (now - self.last_used)), 3),
+            "executor": self.executor.stats(),
+        }
+
+
+class SessionManager:
+    """
+    `executor_factory()` builds the executor a new session pins (one sandbox);
+    `harness_loader()` returns the script that installs the harness in it.
+    """
+
+    def __init__(self, executor_factory, harness_loader, max_sessions: int = 32, ttl_seconds: float = 900.0,
+                 max_ttl_seconds: float = 3600.0, prelude=DEFAULT_PRELUDE, clock=time.monotonic):
+        self.executor_factory = executor_factory
+        self.harness_loader = harness_loader
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_ttl_seconds = max_ttl_seconds
+        self.prelude = tuple(prelude)
+        self._clock = clock
+        self._sessions = {}
+        self._stats = {"created": 0, "expired": 0, "closed": 0}
+
+    async def create(self, ttl_seconds: float = None, prelude: list = None) -> Session:
+        await self.sweep()
+        if len(self._sessions) >= self.max_sessions:
+            raise Overloaded(429, "sessions: too many open sessions", int(self.ttl_seconds))
+        modules = list(self.prelude if prelude is None else prelude)
+        bad = [m for m in modules if not _MODULE_NAME.match(m)]
+        if bad:
+            raise ValueError(f"Invalid module name(s): {', '.join(bad)}")
+        ttl = min(ttl_seconds or self.ttl_seconds, self.max_ttl_seconds)
+
+        executor = self.executor_factory()
+        try:
+            executor.install(harness.MODULE_NAME, self.harness_loader())
+            # Importing the prelude here leaves both the sandbox and its snapshot warm
+            execution = await executor.run(
+                f"import {harness.MODULE_NAME}\n{harness.MODULE_NAME}.snapshot({modules!r})\n")
+            if execution.error:
+                raise ValueError(f"Prelude failed: {execution.error.name}: {execution.error.value}")
+        except BaseException:
+            await executor.close()
+            raise
+
+        session = Session(uuid.uuid4().hex, executor, modules, ttl, self._clock())
+        self._sessions[session.id] = session
+        self._stats["created"] += 1
+        log_event("session.created", session_id=session.id, prelude=modules, ttl_seconds=ttl)
+        return session
+
+    async def get(self, session_id: str) -> Session:
+        """The live session for one more run; its TTL starts over."""
+        await self.sweep()
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        session.last_used = self._clock()
+        session.runs += 1
+        return session
+
+    def peek(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is None or session.expired(self._clock()):
+            raise SessionNotFound(session_id)
+        return session
+
+    async def close(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            raise SessionNotFound(session_id)
+        self._stats["closed"] += 1
+        await session.executor.close()
+        log_event("session.closed", session_id=session_id, runs=session.runs)
+
+    async def sweep(self):
+        now = self._clock()
+        expired = [s for s in self._sessions.values() if s.expired(now)]
+        for session in expired:
+            del self._sessions[session.id]
+            self._stats["expired"] += 1
+            log_event("session.expired", session_id=session.id, runs=session.runs)
+        await asyncio.gather(*(s.executor.close() for s in expired), return_exceptions=True)
+
+    async def reap(self):
+        """sweep(), and let live sessions replace sandboxes their pool has retired (E2B timeout)."""
+        await self.sweep()
+        await asyncio.gather(*(s.executor.reap() for s in list(self._sessions.values())), return_exceptions=True)
+
+    async def close_all(self):
+        sessions, self._sessions = list(self._sessions.values()), {}
+        await asyncio.gather(*(s.executor.close() for s in sessions), return_exceptions=True)
+
+    def describe(self, session: Session) -> dict:
+        return session.info(self._clock())
+
+    def stats(self) -> dict:
+        return {**self._stats, "open": len(self._sessions), "max_sessions": self.max_sessions}
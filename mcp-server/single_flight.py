@@ -0,0 +1,52 @@
+"""
+Single-flight coalescing for identical concurrent work.
+
+Several tabs, or a quick re-submit, often send the same /verify while the
+first copy is still in the sandbox. The result cache can't help until that
+copy finishes, so without this each one would start its own execution.
+SingleFlight runs the work once per key; every concurrent caller awaits the
+same task and gets the same result (or exception).
+
+The shared task outlives any single caller: a caller that goes away (client
+disconnect) only stops waiting, and the execution is cancelled only once
+nobody is waiting for it any more.
+"""
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}  # key -> [task, waiters]
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    async def do(self, key: str, fn, on_join=None):
+        """
+        Await `fn()` for `key`, sharing an in-flight call when there is one.
+        `on_join` is called when this caller joins someone else's call.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(fn())
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self._stats["executions"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            if on_join is not None:
+                on_join()
+
+        flight[1] += 1
+        try:
+            return await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not flight[0].done():
+                flight[0].cancel()
+
+    def _forget(self, key: str, task):
+        flight = self._flights.get(key)
+        if flight is not None and flight[0] is task:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {**self._stats, "in_flight": len(self._flights)}
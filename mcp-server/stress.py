@@ -0,0 +1,377 @@
+"""
+Local stress / differential test generation.
+
+An alternative to asking the LLM for three edge cases: argument types are
+inferred from the Solution method signature (parsed with ast, the code is
+never executed here) and from the literal shape of the failing input. From
+that, hundreds of boundary and random inputs are produced in LeetCode format
+(one JSON line per argument) and run through the batch verifier in a single
+execution, with an optional reference / brute-force solution as the oracle.
+A failing input is then shrunk to a minimal one, one batch per round.
+
+Design problems (["MinStack", "push", ...]) are not supported.
+"""
+import ast
+import json
+import random
+import string
+from typing import Optional
+
+import server
+from harness import parse_literal
+
+DEFAULT_INT_RANGE = (-100, 100)
+DEFAULT_MAX_SIZE = 1000
+MAX_SHRINK_ROUNDS = 20
+MAX_SHRINK_CANDIDATES = 60
+
+
+class ArgSpec:
+    """
+    Shape of one argument: kind is "int", "float", "bool", "str", "list" or
+    "any" (unknown - the sample value is reused as is).
+    """
+
+    def __init__(self, kind: str, elem: "ArgSpec" = None, lo: int = None, hi: int = None,
+                 alphabet: str = None, sample=None):
+        self.kind = kind
+        self.elem = elem
+        self.lo = DEFAULT_INT_RANGE[0] if lo is None else lo
+        self.hi = DEFAULT_INT_RANGE[1] if hi is None else hi
+        self.alphabet = alphabet or string.ascii_lowercase
+        self.sample = sample
+
+    def __repr__(self):
+        inner = f"[{self.elem!r}]" if self.elem else ""
+        return f"ArgSpec({self.kind}{inner})"
+
+
+# --- inference ---------------------------------------------------------------
+
+_NAMED = {"int": "int", "float": "float", "bool": "bool", "str": "str"}
+
+
+def spec_from_annotation(node) -> Optional[ArgSpec]:
+    """`List[int]`, `list[list[str]]`, `Optional[int]`, `int`... -> ArgSpec (None if unknown)."""
+    if node is None:
+        return None
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        # String annotations: "List[int]"
+        try:
+            return spec_from_annotation(ast.parse(node.value, mode="eval").body)
+        except SyntaxError:
+            return None
+    if isinstance(node, ast.Name):
+        return ArgSpec(_NAMED[node.id]) if node.id in _NAMED else None
+    if isinstance(node, ast.Attribute):
+        return spec_from_annotation(ast.Name(id=node.attr))
+    if isinstance(node, ast.Subscript):
+        outer = node.value.attr if isinstance(node.value, ast.Attribute) else getattr(node.value, "id", None)
+        if outer in ("List", "list", "Sequence"):
+            elem = spec_from_annotation(node.slice)
+            return ArgSpec("list", elem=elem or ArgSpec("int"))
+        if outer == "Optional":
+            return spec_from_annotation(node.slice)
+    return None
+
+
+def signature_specs(code: str, method_name: str = None) -> Optional[list]:
+    """ArgSpecs (or None per unannotated arg) of the target method, or None if not found."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    classes = [n for n in tree.body if isinstance(n, ast.ClassDef)]
+    target = next((c for c in classes if c.name == "Solution"), classes[0] if classes else None)
+    if target is None:
+        return None
+    methods = sorted(
+        (n for n in target.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))),
+        key=lambda n: n.name,
+    )
+    if method_name:
+        method = next((m for m in methods if m.name == method_name), None)
+    else:
+        # Same rule as the harness: first public method in dir() order
+        method = next((m for m in methods if not m.name.startswith("__")), None)
+    if method is None:
+        return None
+    args = method.args.args[1:]  # drop self
+    return [spec_from_annotation(a.annotation) for a in args]
+
+
+def spec_from_value(value) -> ArgSpec:
+    """Infer a spec (with ranges/alphabet) from one sample value."""
+    if isinstance(value, bool):
+        return ArgSpec("bool", sample=value)
+    if isinstance(value, int):
+        # Non-negative samples (sizes, k, indices) keep the range non-negative
+        bound = max(abs(value) * 2, DEFAULT_INT_RANGE[1])
+        return ArgSpec("int", lo=-bound if value < 0 else 0, hi=bound, sample=value)
+    if isinstance(value, float):
+        return ArgSpec("float", sample=value)
+    if isinstance(value, str):
+        return ArgSpec("str", alphabet=_alphabet(value), sample=value)
+    if isinstance(value, (list, tuple)):
+        elems = [spec_from_value(v) for v in value]
+        return ArgSpec("list", elem=_merge(elems) if elems else ArgSpec("int"), sample=list(value))
+    return ArgSpec("any", sample=value)
+
+
+def _alphabet(text: str) -> str:
+    if not text:
+        return string.ascii_lowercase
+    for alphabet in (string.digits, string.ascii_lowercase, string.ascii_uppercase, string.ascii_letters):
+        if all(c in alphabet for c in text):
+            return alphabet
+    return "".join(sorted(set(text)))
+
+
+def _merge(specs: list) -> ArgSpec:
+    kinds = {s.kind for s in specs}
+    if len(kinds) != 1:
+        return ArgSpec("any", sample=specs[0].sample)
+    first = specs[0]
+    if first.kind == "int":
+        return ArgSpec("int", lo=min(s.lo for s in specs), hi=max(s.hi for s in specs))
+    if first.kind == "str":
+        return ArgSpec("str", alphabet=_alphabet("".join(s.alphabet for s in specs)))
+    if first.kind == "list":
+        return ArgSpec("list", elem=_merge([s.elem for s in specs]))
+    return ArgSpec(first.kind)
+
+
+def _refine(declared: Optional[ArgSpec], observed: Optional[ArgSpec]) -> ArgSpec:
+    """Signature gives the kind, the sample gives ranges and alphabets."""
+    if declared is None:
+        return observed or ArgSpec("int")
+    if observed is None or observed.kind != declared.kind:
+        return declared
+    if declared.kind == "list":
+        return ArgSpec("list", elem=_refine(declared.elem, observed.elem), sample=observed.sample)
+    return observed
+
+
+def parse_sample(sample_input: str) -> list:
+    return [parse_literal(line.strip()) for line in sample_input.strip().split("\n") if line.strip()]
+
+
+def infer_arg_specs(code: str, sample_input: str = None, method_name: str = None) -> list:
+    sample = parse_sample(sample_input) if sample_input else []
+    declared = signature_specs(code, method_name)
+    observed = [spec_from_value(v) for v in sample]
+    if declared is None or (observed and len(declared) != len(observed)):
+        return observed
+    return [_refine(d, observed[i] if i < len(observed) else None) for i, d in enumerate(declared)]
+
+
+def is_design_input(sample_input: str) -> bool:
+    sample = parse_sample(sample_input or "")
+    return (len(sample) == 2 and isinstance(sample[0], list) and isinstance(sample[1], list)
+            and bool(sample[0]) and isinstance(sample[0][0], str))
+
+
+# --- generation ----------------------------------------------------------------
+
+def random_value(spec: ArgSpec, rng: random.Random, max_size: int, depth: int = 0):
+    if spec.kind == "int":
+        return rng.randint(spec.lo, spec.hi)
+    if spec.kind == "float":
+        return round(rng.uniform(-1e3, 1e3), 5)
+    if spec.kind == "bool":
+        return rng.random() < 0.5
+    if spec.kind == "str":
+        return "".join(rng.choice(spec.alphabet) for _ in range(rng.randint(0, min(max_size, 20))))
+    if spec.kind == "list":
+        # Nested lists stay small so a case doesn't explode quadratically
+        size = rng.randint(0, min(max_size, 20 if depth == 0 else 5))
+        return [random_value(spec.elem, rng, max_size, depth + 1) for _ in range(size)]
+    return spec.sample
+
+
+def boundary_values(spec: ArgSpec, rng: random.Random, max_size: int) -> list:
+    """Empty, single-element, max-size, duplicate and extreme values for one argument."""
+    if spec.kind == "int":
+        return list(dict.fromkeys(v for v in (0, 1, -1, spec.lo, spec.hi) if spec.lo <= v <= spec.hi))
+    if spec.kind == "float":
+        return [0.0, -1.0, 1e-9, 1e9]
+    if spec.kind == "bool":
+        return [True, False]
+    if spec.kind == "str":
+        c = spec.alphabet[0]
+        return ["", c, c * max_size, "".join(rng.choice(spec.alphabet) for _ in range(max_size))]
+    if spec.kind == "list":
+        one = random_value(spec.elem, rng, max_size, 1)
+        values = [[], [one], [one] * min(max_size, 50)]
+        big = [random_value(spec.elem, rng, max_size, 1) for _ in range(max_size)]
+        values.append(big)
+        if spec.elem.kind in ("int", "float", "str"):
+            values.extend([sorted(big), sorted(big, reverse=True)])
+        if spec.elem.kind == "int":
+            values.append([spec.elem.hi] * min(max_size, 50))
+        return values
+    return [spec.sample]
+
+
+def format_input(args: list) -> str:
+    """LeetCode format: one JSON literal per argument line."""
+    return "\n".join(json.dumps(a) for a in args)
+
+
+def generate_cases(specs: list, count: int = 200, seed: int = 0, max_size: int = DEFAULT_MAX_SIZE,
+                   sample: list = None) -> list:
+    """
+    Boundary cases first (one argument varied at a time around the sample),
+    then random ones, deduplicated, `count` at most.
+    """
+    if not specs:
+        return []
+    rng = random.Random(seed)
+    base = sample if sample and len(sample) == len(specs) else [random_value(s, rng, max_size) for s in specs]
+    cases = []
+    seen = set()
+
+    def add(args):
+        line = format_input(args)
+        if line not in seen:
+            seen.add(line)
+            cases.append(line)
+
+    for i, spec in enumerate(specs):
+        for value in boundary_values(spec, rng, max_size):
+            add(base[:i] + [value] + base[i + 1:])
+    attempts = 0
+    while len(cases) < count and attempts < count * 5:
+        attempts += 1
+        add([random_value(s, rng, max_size) for s in specs])
+    return cases[:count]
+
+
+# --- shrinking -------------------------------------------------------------
+
+def shrink_value(value) -> list:
+    """Strictly smaller variants of one value, most aggressive first."""
+    if isinstance(value, bool):
+        return [False] if value else []
+    if isinstance(value, int):
+        out = [0] if value != 0 else []
+        if abs(value) > 1:
+            out += [value // 2, value - (1 if value > 0 else -1)]
+        return list(dict.fromkeys(out))
+    if isinstance(value, float):
+        return [0.0] if value != 0 else []
+    if isinstance(value, str):
+        if not value:
+            return []
+        half = len(value) // 2
+        return list(dict.fromkeys([""] + ([value[:half], value[half:]] if half else [])
+                                  + [value[:i] + value[i + 1:] for i in range(min(len(value), 10))]))
+    if isinstance(value, list):
+        if not value:
+            return []
+        half = len(value) // 2
+        out = [[]]
+        if half:
+            out += [value[:half], value[half:]]
+        out += [value[:i] + value[i + 1:] for i in range(min(len(value), 10))]
+        # Then shrink elements in place
+        for i, item in enumerate(value[:10]):
+            out += [value[:i] + [s] + value[i + 1:] for s in shrink_value(item)[:2]]
+        return out
+    return []
+
+
+def shrink_candidates(args: list, limit: int = MAX_SHRINK_CANDIDATES) -> list:
+    out = []
+    seen = set()
+    for i, value in enumerate(args):
+        for smaller in shrink_value(value):
+            candidate = args[:i] + [smaller] + args[i + 1:]
+            key = format_input(candidate)
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(candidate)
+            if len(out) >= limit:
+                return out
+    return out
+
+
+def is_failure(result: dict, has_oracle: bool) -> bool:
+    """
+    A counterexample: wrong answer, or a crash/timeout the oracle didn't share.
+    A case cut short by the run-wide deadline says nothing about its input.
+    """
+    if result.get("status") in (None, "Passed", "Skipped") or "reference_error" in result:
+        return False
+    if result.get("reason") == "deadline":
+        return False
+    if result["status"] == "Wrong Answer":
+        return has_oracle
+    return True
+
+
+def batch_deadline(case_count: int, case_timeout: float, has_reference: bool) -> Optional[float]:
+    """
+    Room for every case (and its reference run) to use all of case_timeout,
+    within the run budget the sandbox is sized for (VERIFY_DEADLINE).
+    """
+    needed = case_timeout * case_count * (2 if has_reference else 1)
+    budget = server.harness_options()["deadline"]
+    return min(needed, budget) if budget else needed
+
+
+async def run_stress(code: str, sample_input: str, reference_code: str = None, count: int = 200,
+                     seed: int = 0, max_size: int = DEFAULT_MAX_SIZE, method_name: str = None,
+                     case_timeout: float = 2.0) -> dict:
+    """
+    Generate cases, run them in one batch against the oracle, and shrink the
+    first counterexample one batch per round. Without `reference_code` only
+    crashes and timeouts count as failures. Cases the batch deadline left
+    unfinished are counted in "cases_unfinished", never as failures.
+    """
+    if is_design_input(sample_input):
+        return {"supported": False, "cases_run": 0, "failure": None,
+                "error": "Design-problem inputs are not supported by the stress generator"}
+
+    specs = infer_arg_specs(code, sample_input, method_name)
+    sample = parse_sample(sample_input) if sample_input else None
+    cases = generate_cases(specs, count=count, seed=seed, max_size=max_size, sample=sample)
+    options = {"reference_code": reference_code, "method_name": method_name,
+               "case_timeout": case_timeout, "measure": False}
+    has_oracle = reference_code is not None
+    unfinished = 0
+
+    async def first_failure(inputs):
+        nonlocal unfinished
+        # No fail_fast: a case where the reference fails too isn't a counterexample
+        deadline = batch_deadline(len(inputs), case_timeout, has_oracle)
+        logs = await server.verify_solution_logic(code, inputs, deadline=deadline, **options)
+        results, error = server.parse_results(logs)
+        if error is not None:
+            return None, error
+        unfinished = sum(1 for r in results if r.get("reason") == "deadline")
+        return next((r for r in results if is_failure(r, has_oracle)), None), None
+
+    failure, error = await first_failure(cases)
+    report = {"supported": True, "specs": [repr(s) for s in specs], "cases_run": len(cases) - unfinished,
+              "cases_unfinished": unfinished, "failure": None, "minimal_input": None, "shrink_rounds": 0,
+              "error": error}
+    if failure is None:
+        return report
+
+    report["failure"] = failure
+    current, current_result = parse_sample(failure["input"]), failure
+    for round_no in range(MAX_SHRINK_ROUNDS):
+        candidates = [format_input(c) for c in shrink_candidates(current)]
+        if not candidates:
+            break
+        smaller, _ = await first_failure(candidates)
+        if smaller is None:
+            break
+        current, current_result = parse_sample(smaller["input"]), smaller
+        report["shrink_rounds"] = round_no + 1
+
+    report["minimal_input"] = format_input(current)
+    report["minimal_result"] = current_result
+    return report
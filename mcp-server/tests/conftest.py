@@ -0,0 +1,8 @@
+import os
+
+# State the service keeps on disk stays in memory for tests (see server.data_path)
+os.environ.setdefault("JOBS_DB", ":memory:")
+os.environ.setdefault("AUTOFIX_MEMO_DB", ":memory:")
+# One shared admission bucket for every TestClient request would make results depend on suite speed;
+# admission tests build their own AdmissionScheduler
+os.environ.setdefault("ADMISSION_CLIENT_RATE", "0")
@@ -0,0 +1,121 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import admission
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from admission import AdmissionScheduler, TokenBucket, parse_costs
+from limits import Overloaded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def scheduler(clock, **kwargs):
+    options = dict(rate=1.0, burst=10.0, server_rate=100.0, server_burst=1000.0, reserve=0.25,
+                   costs={"verify": (1, 0), "autofix": (5, 1)}, clock=clock)
+    options.update(kwargs)
+    return AdmissionScheduler(**options)
+
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(10, 2.0, now=0.0)
+    bucket.tokens = 0
+    assert bucket.wait_time(4, now=1.0) == pytest.approx(1.0)  # 2 tokens after 1s, 2 missing
+    assert bucket.wait_time(4, now=2.0) == 0
+    bucket.refill(100.0)
+    assert bucket.tokens == 10
+
+
+def test_client_over_its_share_gets_429_with_retry_after():
+    clock = FakeClock()
+    s = scheduler(clock)
+    s.admit("a", "autofix")
+    s.admit("a", "autofix")
+    with pytest.raises(Overloaded) as exc:
+        s.admit("a", "autofix")
+    err = exc.value
+    assert err.status_code == 429
+    assert err.retry_after == 5  # 5 tokens at 1/s
+    assert err.info == {"reason": "client_rate", "endpoint": "autofix", "cost": 5}
+
+    clock.now = 5.0
+    s.admit("a", "autofix")
+
+
+def test_one_client_does_not_use_up_another_clients_share():
+    clock = FakeClock()
+    s = scheduler(clock)
+    for _ in range(10):
+        s.admit("greedy", "verify")
+    with pytest.raises(Overloaded):
+        s.admit("greedy", "verify")
+    s.admit("other", "verify")
+    assert s.stats()["clients"] == 2
+
+
+def test_server_reserve_is_kept_for_cheap_requests():
+    clock = FakeClock()
+    # 20-token server bucket, 5 of them (25%) only for priority 0
+    s = scheduler(clock, burst=100.0, server_rate=1.0, server_burst=20.0)
+    for client in ("a", "b", "c"):
+        s.admit(client, "autofix")
+    with pytest.raises(Overloaded) as exc:
+        s.admit("d", "autofix")  # 5 left: all reserve
+    assert exc.value.info["reason"] == "server_reserve"
+    assert exc.value.retry_after == 5
+
+    for _ in range(5):
+        s.admit("d", "verify")
+    with pytest.raises(Overloaded) as exc:
+        s.admit("d", "verify")
+    assert exc.value.info["reason"] == "server_rate"
+    assert s.stats()["rejected"] == {"server_reserve": 1, "server_rate": 1}
+
+
+def test_rejections_are_not_charged():
+    clock = FakeClock()
+    s = scheduler(clock, burst=6.0)
+    s.admit("a", "autofix")
+    with pytest.raises(Overloaded):
+        s.admit("a", "autofix")
+    s.admit("a", "verify")
+    assert s.stats()["admitted"] == 2
+
+
+def test_cost_above_burst_is_capped_so_it_can_ever_run():
+    clock = FakeClock()
+    s = scheduler(clock, burst=3.0)
+    s.admit("a", "autofix")
+    with pytest.raises(Overloaded) as exc:
+        s.admit("a", "autofix")
+    assert exc.value.retry_after == 3
+
+
+def test_disabled_admits_everything():
+    s = scheduler(FakeClock(), rate=0)
+    for _ in range(100):
+        s.admit("a", "autofix")
+    assert s.stats()["enabled"] is False
+
+
+def test_least_recently_seen_clients_are_evicted():
+    s = scheduler(FakeClock(), max_clients=2)
+    for client in ("a", "b", "a", "c"):
+        s.admit(client, "verify")
+    assert list(s._clients) == ["a", "c"]
+
+
+def test_parse_costs_overrides_weights_and_keeps_priority():
+    costs = parse_costs("autofix=12, stress=6")
+    assert costs["autofix"] == (12.0, 1)
+    assert costs["stress"] == (6.0, 1)
+    assert costs["verify"] == (1, 0)
+    with pytest.raises(ValueError):
+        parse_costs("nope=1")
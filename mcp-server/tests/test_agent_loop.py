@@ -1,3 +1,5 @@
+import asyncio
+import json
 import unittest
 from unittest.mock import MagicMock, patch
 import sys
@@ -5,7 +7,10 @@ import os
 
 # Add parent directory to path to import api
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the fix memo in memory when run as a script too (conftest.py does it under pytest)
+os.environ.setdefault("AUTOFIX_MEMO_DB", ":memory:")
 
+import api
 from api import AgentFixer
 
 class TestAgentLoop(unittest.TestCase):
@@ -30,7 +35,7 @@ class TestAgentLoop(unittest.TestCase):
         mock_verify.side_effect = [(False, "Runtime Error: Bad Code"), (True, "Output: Success")]
         
         # Run
-        result = self.agent.attempt_fix("def solution(): return 'buggy'", "Initial Error", "initial_test", max_retries=3)
+        result = asyncio.run(self.agent.attempt_fix("def solution(): return 'buggy'", "Initial Error", "initial_test", max_retries=3))
         
         # Assertions
         self.assertTrue(result['verified'])
@@ -56,11 +61,297 @@ class TestAgentLoop(unittest.TestCase):
         mock_generate_fix.return_value = "def solution(): return 'still_bad'"
         mock_verify.return_value = (False, "Runtime Error: Still Bad")
         
-        result = self.agent.attempt_fix("buggy", "error", "input", max_retries=2)
+        result = asyncio.run(self.agent.attempt_fix("buggy", "error", "input", max_retries=2))
         
         self.assertFalse(result['verified'])
         self.assertEqual(len(result['history']), 2)
         self.assertEqual(mock_generate_fix.call_count, 2)
 
+
+class TestSpeculativeMode(unittest.TestCase):
+    def test_first_passing_candidate_wins_and_rest_are_cancelled(self):
+        agent = AgentFixer(candidates=3)
+        verified = []
+
+        async def fake_fix(code, error, test_input, temperature=None):
+            # The low-temperature candidate is wrong, the mid one right, the hot one slow
+            delay = {0.2: 0.01, 0.5: 0.02, 0.8: 0.5}[temperature]
+            await asyncio.sleep(delay)
+            return f"fix@{temperature}"
+
+        async def fake_verify(code, tests):
+            verified.append(code)
+            return (code == "fix@0.5", "[]" if code == "fix@0.5" else '[{"status": "Runtime Error"}]')
+
+        async def fake_tests(code, error):
+            return ["t2"]
+
+        with patch.object(agent, 'generate_fix', side_effect=fake_fix), \
+             patch.object(agent, 'verify_fix', side_effect=fake_verify), \
+             patch.object(agent, 'generate_tests', side_effect=fake_tests):
+            result = asyncio.run(agent.attempt_fix("buggy", "error", "input", max_retries=2))
+
+        self.assertTrue(result['verified'])
+        self.assertEqual(result['fixed_code'], "fix@0.5")
+        self.assertEqual(result['attempts'], 1)
+        self.assertEqual(result['test_count'], 2)
+        self.assertNotIn("fix@0.8", verified)
+
+    def test_candidates_use_distinct_temperatures(self):
+        agent = AgentFixer(candidates=3)
+        self.assertEqual(agent.candidate_temperatures(), [0.2, 0.5, 0.8])
+        self.assertEqual(AgentFixer(candidates=1).candidate_temperatures(), [None])
+
+    def test_retry_continues_from_closest_candidate(self):
+        agent = AgentFixer(candidates=2)
+        prompts = []
+
+        async def fake_fix(code, error, test_input, temperature=None):
+            prompts.append(code)
+            return f"fix@{temperature}@{len(prompts)}"
+
+        async def fake_verify(code, tests):
+            # Candidate at 0.5 fails fewer cases than the one at 0.2
+            failures = [{"status": "Runtime Error"}] * (1 if "@0.5@" in code else 3)
+            return False, json.dumps(failures)
+
+        with patch.object(agent, 'generate_fix', side_effect=fake_fix), \
+             patch.object(agent, 'verify_fix', side_effect=fake_verify), \
+             patch.object(agent, 'generate_tests', return_value=[]):
+            result = asyncio.run(agent.attempt_fix("buggy", "error", "input", max_retries=2))
+
+        self.assertFalse(result['verified'])
+        self.assertEqual(len(result['history']), 4)
+        self.assertTrue(prompts[2].startswith("fix@0.5@"))
+
+    def test_test_generation_overlaps_first_fix(self):
+        agent = AgentFixer()
+        events = []
+
+        async def slow_tests(code, error):
+            events.append("tests-start")
+            await asyncio.sleep(0.05)
+            events.append("tests-done")
+            return ["t2"]
+
+        async def fake_fix(code, error, test_input):
+            events.append("fix-start")
+            return "fixed"
+
+        with patch.object(agent, 'generate_tests', side_effect=slow_tests), \
+             patch.object(agent, 'generate_fix', side_effect=fake_fix), \
+             patch.object(agent, 'verify_fix', return_value=(True, "ok")) as mock_verify:
+            result = asyncio.run(agent.attempt_fix("buggy", "error", "input"))
+
+        self.assertTrue(result['verified'])
+        self.assertLess(events.index("fix-start"), events.index("tests-done"))
+        # Verification still waits for the full suite
+        self.assertEqual(mock_verify.call_args[0][1], ["input", "t2"])
+
+    def test_oracle_is_passed_to_verification(self):
+        agent = AgentFixer()
+        oracle = {"expected": "3", "reference_code": "class Solution: ...", "compare": "unordered"}
+
+        with patch.object(agent, 'generate_tests', return_value=["t2", "t3"]), \
+             patch.object(agent, 'generate_fix', return_value="fixed"), \
+             patch.object(agent, 'verify_fix', return_value=(True, "ok")) as mock_verify:
+            asyncio.run(agent.attempt_fix("buggy", "error", "input", oracle=oracle))
+
+        kwargs = mock_verify.call_args[1]
+        self.assertEqual(kwargs["expected"], ["3", None, None])
+        self.assertEqual(kwargs["reference_code"], "class Solution: ...")
+        self.assertEqual(kwargs["compare"], "unordered")
+
+    def test_local_test_generator_skips_the_llm(self):
+        agent = AgentFixer()
+        agent.test_generator = "local"
+        agent.local_test_count = 5
+        code = "class Solution:\n    def add(self, a: int, b: int) -> int:\n        return a - b\n"
+
+        with patch.object(agent, 'generate_tests') as mock_tests, \
+             patch.object(agent, 'generate_fix', return_value="fixed"), \
+             patch.object(agent, 'verify_fix', return_value=(True, "ok")) as mock_verify:
+            asyncio.run(agent.attempt_fix(code, "error", "1\n2"))
+
+        mock_tests.assert_not_called()
+        suite = mock_verify.call_args[0][1]
+        self.assertEqual(suite[0], "1\n2")
+        self.assertEqual(len(suite), 6)
+
+    def test_auto_generator_falls_back_when_llm_gives_nothing(self):
+        agent = AgentFixer()
+        agent.test_generator = "auto"
+        agent.local_test_count = 3
+
+        with patch.object(agent, 'generate_tests', return_value=[]), \
+             patch.object(agent, 'generate_fix', return_value="fixed"), \
+             patch.object(agent, 'verify_fix', return_value=(True, "ok")) as mock_verify:
+            asyncio.run(agent.attempt_fix("class Solution:\n    def f(self, nums):\n        pass\n", "error", "[1,2]"))
+
+        self.assertEqual(len(mock_verify.call_args[0][1]), 4)
+
+    def test_retry_checks_previous_failures_first(self):
+        agent = AgentFixer()
+        orders = []
+
+        async def fake_logic(code, inputs, expected=None, order=None, **kwargs):
+            # The order the cases run in; results still come back in the caller's order
+            orders.append([inputs[i] for i in order] if order else list(inputs))
+            return json.dumps([{"index": i, "input": raw, "status": "Wrong Answer" if raw == "b" else "Passed"}
+                               for i, raw in enumerate(inputs)])
+
+        with patch('api.verify_solution_logic', side_effect=fake_logic), \
+             patch.object(agent, 'generate_tests', return_value=["b", "c"]), \
+             patch.object(agent, 'generate_fix', side_effect=["still broken", "still broken too"]):
+            asyncio.run(agent.attempt_fix("buggy", "error", "a", max_retries=2))
+
+        self.assertEqual(orders, [["a", "b", "c"], ["b", "a", "c"]])
+
+    def test_repeated_candidate_is_not_verified_again(self):
+        agent = AgentFixer(candidates=2)
+        verified = []
+
+        async def fake_fix(code, error, test_input, temperature=None):
+            # Both temperatures give the same fix, once reformatted; then the original code comes back
+            if code == "class S:\n    def f(self): return 0\n":
+                return "class S:\n    def f(self): return 1\n" if temperature == 0.2 else \
+                    "class S:\n\n    def f(self):\n        return 1\n"
+            return "class S:\n    def f(self):\n        return 0  # original\n"
+
+        async def fake_verify(code, tests):
+            verified.append(code)
+            await asyncio.sleep(0.01)
+            return False, '[{"status": "Wrong Answer"}]'
+
+        with patch.object(agent, 'generate_fix', side_effect=fake_fix), \
+             patch.object(agent, 'verify_fix', side_effect=fake_verify), \
+             patch.object(agent, 'generate_tests', return_value=[]):
+            result = asyncio.run(agent.attempt_fix("class S:\n    def f(self): return 0\n", "Runtime Error: X",
+                                                   "input", max_retries=2))
+
+        self.assertEqual(len(verified), 1)
+        self.assertEqual([h["duplicate"] for h in result["history"]], [False, True, True, True])
+        self.assertEqual(result["history"][1]["logs"], '[{"status": "Wrong Answer"}]')
+        self.assertEqual(result["history"][2]["logs"], "Runtime Error: X")
+
+    def test_duplicate_of_a_candidate_whose_verification_raised_fails(self):
+        agent = AgentFixer(candidates=1)
+        candidate = "class S:\n    def f(self): return 1\n"
+
+        async def scenario():
+            # The original is still verifying when the duplicate arrives, then its verification raises
+            pending = asyncio.get_running_loop().create_future()
+            asyncio.get_running_loop().call_later(0.01, pending.set_exception, RuntimeError("sandbox lost"))
+            token = api._seen_candidates.set({api.fingerprint(candidate): pending})
+            try:
+                tests_task = asyncio.create_task(asyncio.sleep(0, result=[]))
+                return await agent._race_candidates("broken", "error", "input", tests_task)
+            finally:
+                api._seen_candidates.reset(token)
+
+        with patch.object(agent, 'generate_fix', return_value=candidate):
+            outcomes = asyncio.run(scenario())
+
+        self.assertEqual(len(outcomes), 1)
+        self.assertFalse(outcomes[0]["success"])
+        self.assertTrue(outcomes[0]["duplicate"])
+        self.assertEqual(outcomes[0]["logs"], "Runtime Error: RuntimeError: sandbox lost")
+
+
+class TestFixMemo(unittest.TestCase):
+    BUGGY = "class Solution:\n    def f(self, a):\n        return a[3]\n"
+    ERROR = json.dumps([{"index": 0, "status": "Runtime Error", "error": "IndexError: list index out of range"}])
+
+    def run_fix(self, agent, code, error, fixed="class Solution:\n    def f(self, a):\n        return a[-1]\n",
+                verify_result=(True, "[]"), oracle=None):
+        fix = MagicMock(return_value=fixed)
+
+        async def fake_fix(*args, **kwargs):
+            return fix()
+
+        with patch.object(agent, 'generate_fix', side_effect=fake_fix), \
+             patch.object(agent, 'verify_fix', return_value=verify_result) as verify, \
+             patch.object(agent, 'generate_tests', return_value=["[1]"]):
+            result = asyncio.run(agent.attempt_fix(code, error, "[1,2]", oracle=oracle))
+        return result, fix.call_count, verify
+
+    def test_known_bug_is_answered_from_the_memo(self):
+        agent = AgentFixer()
+        first, calls, _ = self.run_fix(agent, self.BUGGY, self.ERROR)
+        self.assertTrue(first["verified"])
+        self.assertEqual(calls, 1)
+
+        # Reformatted code, same failure on another input: no LLM call, one re-check on the new input
+        again, calls, verify = self.run_fix(agent, self.BUGGY.replace("return", "return  "), self.ERROR)
+        self.assertEqual(calls, 0)
+        self.assertTrue(again["memoized"])
+        self.assertEqual(again["fixed_code"], first["fixed_code"])
+        self.assertEqual(verify.call_args[0][1], ["[1,2]"])
+        self.assertEqual(agent.memo.stats()["hits"], 1)
+
+    def test_memo_miss_on_a_different_error(self):
+        agent = AgentFixer()
+        self.run_fix(agent, self.BUGGY, self.ERROR)
+        other = json.dumps([{"index": 0, "status": "Runtime Error", "error": "TypeError: bad operand"}])
+        _, calls, _ = self.run_fix(agent, self.BUGGY, other)
+        self.assertEqual(calls, 1)
+
+    def test_memo_miss_under_another_oracle(self):
+        agent = AgentFixer()
+        self.run_fix(agent, self.BUGGY, self.ERROR, oracle={"expected": "2"})
+        # Verified against another expected output, or none: not a known fix here
+        _, calls, _ = self.run_fix(agent, self.BUGGY, self.ERROR, oracle={"expected": "1"})
+        self.assertEqual(calls, 1)
+        _, calls, _ = self.run_fix(agent, self.BUGGY, self.ERROR)
+        self.assertEqual(calls, 1)
+        again, calls, _ = self.run_fix(agent, self.BUGGY, self.ERROR, oracle={"expected": "2"})
+        self.assertEqual(calls, 0)
+        self.assertTrue(again["memoized"])
+
+    def test_remembered_fix_failing_the_new_input_runs_the_loop(self):
+        agent = AgentFixer()
+        self.run_fix(agent, self.BUGGY, self.ERROR)
+        result, calls, _ = self.run_fix(agent, self.BUGGY, self.ERROR, verify_result=(False, "[]"))
+        self.assertEqual(calls, 3)
+        self.assertFalse(result["verified"])
+
+
+class TestRetryPromptBudget(unittest.TestCase):
+    def test_retry_prompt_stays_under_budget(self):
+        agent = AgentFixer()
+        agent.prompt_budget = 600
+        errors = []
+        big_input = json.dumps(list(range(20000)))
+        failures = [{"index": i, "input": big_input, "status": "Runtime Error", "error": "boom",
+                     "traceback": 'Traceback (most recent call last):\n  File "<solution>", line 2, in f\n'
+                                  '    raise ValueError("boom")\nValueError: boom\n', "wall_ms": 1.0}
+                    for i in range(20)]
+
+        async def fake_fix(code, error, test_input, temperature=None, on_token=None):
+            errors.append(error)
+            return "class Solution:\n    def f(self, x):\n        raise ValueError('boom')\n"
+
+        async def fake_verify(code, tests):
+            return False, json.dumps(failures, indent=2)
+
+        events = []
+
+        async def on_event(event, data):
+            if event == "attempt":
+                events.append(data)
+
+        with patch.object(agent, 'generate_fix', side_effect=fake_fix), \
+             patch.object(agent, 'verify_fix', side_effect=fake_verify), \
+             patch.object(agent, 'generate_tests', return_value=[]):
+            result = asyncio.run(agent.attempt_fix("buggy", "error", big_input, max_retries=3, on_event=on_event))
+
+        self.assertFalse(result['verified'])
+        self.assertIn("same_failure_indices", errors[1])
+        self.assertLess(len(errors[1]), len(json.dumps(failures, indent=2)) // 50)
+        self.assertEqual([e["attempt"] for e in events], [1, 2, 3])
+        self.assertTrue(all(e["prompt_tokens"] <= 600 for e in events[1:]))
+        self.assertEqual(result['history'][1]['prompt_tokens'], events[1]['prompt_tokens'])
+
+
 if __name__ == '__main__':
     unittest.main()
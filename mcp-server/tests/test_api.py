@@ -0,0 +1,354 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import api
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from executors import PooledExecutor
+from sandbox_pool import LocalSandbox, _Error, _Execution
+from limits import ConcurrencyLimiter
+from admission import AdmissionScheduler
+from verification_cache import VerificationCache
+import api
+import server
+
+CODE = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+
+
+@pytest.fixture
+def cache():
+    c = VerificationCache()
+    with patch.object(server, 'get_verification_cache', return_value=c), \
+         patch.object(api, 'get_verification_cache', return_value=c):
+        yield c
+
+
+@pytest.fixture
+def executor(cache):
+    ex = PooledExecutor("inprocess", LocalSandbox.create, max_size=2)
+    with patch.object(server, 'get_executor', return_value=ex), \
+         patch.object(api, 'get_executor', return_value=ex):
+        yield ex
+
+
+@pytest.fixture
+def client(executor):
+    with TestClient(api.app) as c:
+        yield c
+
+
+def test_verify_single_input_backward_compat(client):
+    res = client.post("/verify", json={"code": CODE, "test_input": "1\n2"})
+    assert res.status_code == 200
+    body = res.json()
+    assert '"Passed"' in body["result"]
+    assert body["results"][0]["output"] == "3"
+    assert body["passed"] == 1 and body["failed"] == 0
+
+
+def test_verify_batch_runs_in_one_execution(client, executor):
+    with patch.object(executor, 'run', wraps=executor.run) as spy:
+        res = client.post("/verify", json={
+            "code": CODE,
+            "test_inputs": ["1\n2", "3\n4", "[1]\n[2]"],
+        })
+    assert spy.call_count == 1
+    body = res.json()
+    assert [r["output"] for r in body["results"]] == ["3", "7", "[1, 2]"]
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+
+
+def test_verify_batch_checks_expected_outputs(client):
+    res = client.post("/verify", json={
+        "code": CODE,
+        "test_inputs": ["1\n2", "3\n4", "5\n5"],
+        "expected": ["3", "8", None],
+    })
+    results = res.json()["results"]
+    assert [r["status"] for r in results] == ["Passed", "Wrong Answer", "Passed"]
+    assert results[1]["expected"] == "8"
+    assert "expected" not in results[2]
+    assert res.json()["failed"] == 1
+
+
+def test_verify_fatal_error_reported_separately(client):
+    res = client.post("/verify", json={"code": "class Solution(:\n", "test_inputs": ["1"]})
+    body = res.json()
+    assert body["results"] == []
+    assert body["error"].startswith("Runtime Error: SyntaxError")
+    assert body["failed"] == 1
+
+
+def test_verify_requires_some_input(client):
+    assert client.post("/verify", json={"code": CODE}).status_code == 422
+    assert client.post("/verify", json={"code": CODE, "test_inputs": []}).status_code == 422
+
+
+def test_verify_rejects_mismatched_expected(client):
+    res = client.post("/verify", json={"code": CODE, "test_inputs": ["1\n2"], "expected": ["3", "4"]})
+    assert res.status_code == 422
+
+
+def test_verify_rejects_with_429_when_queue_full(client):
+    limiter = ConcurrencyLimiter("verify", max_concurrent=1, max_queue=0, retry_after=7)
+    asyncio.run(limiter._sem.acquire())  # occupy the only slot
+    with patch.object(api, 'verify_limiter', limiter):
+        res = client.post("/verify", json={"code": CODE, "test_input": "1\n2"})
+    assert res.status_code == 429
+    assert res.headers["Retry-After"] == "7"
+    assert res.json()["retry_after"] == 7
+
+
+def test_autofix_over_client_share_gets_structured_429(client):
+    scheduler = AdmissionScheduler(rate=0.5, burst=10, costs={"verify": (1, 0), "autofix": (10, 1)})
+    with patch.object(api, 'admission_scheduler', scheduler), \
+         patch.object(api, 'run_autofix', return_value={"verified": False}):
+        headers = {"X-Client-ID": "busy"}
+        assert client.post("/autofix", json={"code": CODE, "test_input": "1"}, headers=headers).status_code == 200
+        res = client.post("/autofix", json={"code": CODE, "test_input": "1"}, headers=headers)
+        # Another client is unaffected
+        other = client.post("/verify", json={"code": CODE, "test_input": "1\n2"}, headers={"X-Client-ID": "calm"})
+    assert res.status_code == 429
+    body = res.json()
+    assert body["reason"] == "client_rate" and body["endpoint"] == "autofix"
+    assert 19 <= body["retry_after"] <= 20
+    assert res.headers["Retry-After"] == str(body["retry_after"])
+    assert other.status_code == 200
+
+
+def test_health_reports_limits(client):
+    with patch.object(api, 'admission_scheduler', AdmissionScheduler()):
+        body = client.get("/health").json()
+    assert body["status"] == "ok"
+    assert set(body["limits"]) == {"verify", "autofix"}
+    assert body["admission"]["enabled"] is True
+
+
+def test_repeat_verify_is_served_from_cache(client, executor, cache):
+    reformatted = "class Solution:\n    # same logic, new comment\n    def add(self, a, b):  \n        return a+b\n"
+    with patch.object(executor, 'run', wraps=executor.run) as spy:
+        first = client.post("/verify", json={"code": CODE, "test_inputs": ["1\n2"]}).json()
+        second = client.post("/verify", json={"code": reformatted, "test_inputs": ["1\n2"]}).json()
+    assert spy.call_count == 1
+    assert first["results"] == second["results"]
+    assert client.get("/health").json()["cache"]["hits"] == 1
+
+
+def test_sandbox_failures_are_not_cached_whatever_their_name(client, executor, cache):
+    async def lost(script, timings=None):
+        return _Execution(error=_Error("SandboxGone", "connection reset"))
+
+    with patch.object(executor, 'run', side_effect=lost):
+        body = client.post("/verify", json={"code": CODE, "test_inputs": ["1\n2"]}).json()
+    assert body["error"].startswith("Runtime Error: SandboxGone")
+    assert body["timings"]["sandbox_error"] == "SandboxGone"
+    assert cache.stats()["entries"] == 0
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_autofix_stream_emits_progress_and_result(client):
+    fixed = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+
+    async def fake_fix(code, error, test_input, on_token=None):
+        await on_token("class Solution:")
+        return fixed
+
+    with patch.object(api.agent, 'generate_tests', return_value=["3\n4"]), \
+         patch.object(api.agent, 'generate_fix', side_effect=fake_fix):
+        with client.stream("POST", "/autofix/stream", json={
+            "code": "class Solution:\n    def add(self, a, b):\n        return a - b\n",
+            "test_input": "1\n2",
+        }) as res:
+            assert res.headers["content-type"].startswith("text/event-stream")
+            events = parse_sse(res.read().decode())
+
+    names = [name for name, _ in events]
+    assert names[0] == "status"
+    assert {"tests", "attempt", "token", "candidate", "verification"} <= set(names)
+    assert names[-1] == "result"
+    assert names.index("token") < names.index("candidate") < names.index("verification")
+    assert dict(events)["tests"]["tests"] == ["1\n2", "3\n4"]
+    assert events[-1][1]["verified"] is True
+    assert events[-1][1]["fixed_code"] == fixed
+    # The slot is given back once the stream ends
+    assert api.autofix_limiter.stats()["active"] == 0
+
+
+def test_autofix_stream_gives_the_slot_back_when_the_client_leaves_before_the_body(executor):
+    limiter = ConcurrencyLimiter("autofix", max_concurrent=1, max_queue=0)
+
+    async def gone(message):
+        raise OSError("client went away")
+
+    async def scenario():
+        req = api.VerificationRequest(code=CODE, test_input="1\n2")
+        response = await api.autofix_stream_endpoint(req)
+        assert limiter.stats()["active"] == 1
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(Exception):
+            await response(scope, None, gone)
+        # Checked before asyncio.run's shutdown finalizes the abandoned slot() generator
+        assert limiter.stats()["active"] == 0
+
+    with patch.object(api, 'autofix_limiter', limiter):
+        asyncio.run(scenario())
+
+
+def test_verify_reports_phase_timings_and_case_metrics(client):
+    body = client.post("/verify", json={"code": CODE, "test_inputs": ["1\n2"], "fail_fast": True}).json()
+    assert {"build_ms", "acquire_ms", "execute_ms", "parse_ms"} <= set(body["timings"])
+    assert "wall_ms" in body["results"][0]
+    assert body["skipped"] == 0
+
+
+def test_verify_against_reference_solution(client, executor):
+    wrong = "class Solution:\n    def add(self, a, b):\n        return a * b\n"
+    with patch.object(executor, 'run', wraps=executor.run) as spy:
+        body = client.post("/verify", json={
+            "code": wrong,
+            "test_inputs": ["2\n2", "1\n2"],
+            "reference_code": CODE,
+        }).json()
+    assert spy.call_count == 1
+    assert [r["status"] for r in body["results"]] == ["Passed", "Wrong Answer"]
+    assert body["results"][1]["expected"] == "3"
+
+
+def test_verify_rejects_unknown_compare_mode(client):
+    res = client.post("/verify", json={"code": CODE, "test_input": "1\n2", "compare": "fuzzy"})
+    assert res.status_code == 422
+
+
+def test_stress_endpoint_reports_minimal_counterexample(client):
+    buggy = "class Solution:\n    def add(self, a: int, b: int) -> int:\n        return a + b if a < 50 else 0\n"
+    body = client.post("/stress", json={
+        "code": buggy, "test_input": "1\n2", "reference_code": CODE, "count": 50,
+    }).json()
+    assert body["supported"] is True
+    assert body["failure"] is not None
+    assert body["minimal_result"]["status"] == "Wrong Answer"
+
+
+def test_stress_rejects_oversized_runs(client):
+    res = client.post("/stress", json={"code": CODE, "test_input": "1\n2", "count": 100000})
+    assert res.status_code == 422
+
+
+def test_autofix_job_submit_poll_and_dedupe(client):
+    release = asyncio.Event()
+
+    async def fake_autofix(req, on_event=None):
+        await on_event("status", {"message": "Reproducing the error..."})
+        await release.wait()
+        return {"verified": True, "fixed_code": req.code}
+
+    with patch.object(api, 'run_autofix', side_effect=fake_autofix):
+        first = client.post("/jobs/autofix", json={"code": CODE, "test_input": "1\n2"})
+        assert first.status_code == 202
+        job_id = first.json()["job_id"]
+        # Same code modulo formatting and same input: merged
+        again = client.post("/jobs/autofix", json={"code": CODE + "\n# retry\n", "test_input": "1\n2", "priority": 3}).json()
+        assert again == {"job_id": job_id, "state": again["state"], "deduplicated": True}
+
+        client.portal.call(release.set)
+        for _ in range(200):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["state"] == "done":
+                break
+            client.portal.call(asyncio.sleep, 0.01)
+    assert job["result"] == {"verified": True, "fixed_code": CODE}
+    assert job["events"][0]["event"] == "status"
+    assert client.get("/health").json()["jobs"]["deduplicated"] >= 1
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/nope").status_code == 404
+    assert client.post("/jobs/nope/cancel").status_code == 404
+
+
+def test_identical_concurrent_verifies_share_one_execution(executor, cache):
+    cache.max_entries = 0  # only single-flight can dedupe here
+    before = server.verify_flights.stats()
+
+    async def scenario():
+        timings = [{}, {}, {}]
+        results = await asyncio.gather(*[
+            server.verify_solution_logic(CODE, ["1\n2"], timings=t) for t in timings
+        ])
+        return results, timings
+
+    with patch.object(executor, 'run', wraps=executor.run) as spy:
+        results, timings = asyncio.run(scenario())
+    assert spy.call_count == 1
+    assert len(set(results)) == 1
+    assert sum(1 for t in timings if t.get("coalesced")) == 2
+    after = server.verify_flights.stats()
+    assert after["coalesced"] - before["coalesced"] == 2
+
+
+def test_metrics_endpoint_exposes_prometheus_text(client):
+    client.post("/verify", json={"code": CODE, "test_inputs": ["1\n2", "[1]\n2"]})
+    client.post("/verify", json={"code": "class Solution(:\n", "test_input": "1"})
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    text = res.text
+    assert "# TYPE sandbox_acquire_seconds histogram" in text
+    assert "verify_execute_seconds_count" in text
+    assert 'verify_cases_total{status="Runtime Error"}' in text
+    assert 'verify_fatal_errors_total{error="SyntaxError"}' in text
+    assert 'queue_depth{queue="verify"} 0' in text
+    assert 'verification_cache_lookups{result="miss"}' in text
+
+
+def test_request_id_is_echoed_and_generated(client):
+    res = client.get("/health", headers={"X-Request-ID": "trace-me"})
+    assert res.headers["X-Request-ID"] == "trace-me"
+    assert len(client.get("/health").headers["X-Request-ID"]) == 16
+
+
+def test_session_reruns_previous_failures_first(client, executor):
+    inputs = ["1\n2", "[1]\n2", "3\n4"]
+    first = client.post("/verify", json={"code": CODE, "test_inputs": inputs, "session_id": "drill-1"}).json()
+    assert [r["status"] for r in first["results"]] == ["Passed", "Runtime Error", "Passed"]
+
+    with patch.object(server, 'verify_solution_logic', wraps=server.verify_solution_logic), \
+         patch.object(api, 'verify_solution_logic', wraps=api.verify_solution_logic) as spy:
+        again = client.post("/verify", json={
+            "code": CODE.replace("a + b", "b + a"), "test_inputs": inputs, "session_id": "drill-1",
+        }).json()
+    assert spy.call_args[0][1] == inputs
+    assert spy.call_args.kwargs["order"] == [1, 0, 2]
+    # Reported in the caller's order; the new version re-checking a known failure is fail_fast
+    assert [r["status"] for r in again["results"]] == ["Skipped", "Runtime Error", "Skipped"]
+    assert [r["index"] for r in again["results"]] == [0, 1, 2]
+    assert json.loads(again["result"])[1]["status"] == "Runtime Error"
+
+    # Unless the request says otherwise
+    full = client.post("/verify", json={
+        "code": CODE.replace("a + b", "a + b + 0"), "test_inputs": inputs, "session_id": "drill-1",
+        "fail_fast": False,
+    }).json()
+    assert [r["status"] for r in full["results"]] == ["Passed", "Runtime Error", "Passed"]
+
+
+def test_session_reordering_does_not_defeat_the_cache(client, executor):
+    inputs = ["1\n2", "[1]\n2", "3\n4"]
+    first = client.post("/verify", json={"code": CODE, "test_inputs": inputs, "session_id": "drill-2"}).json()
+    # Same code again: the failure now runs first, but it is the same verification
+    again = client.post("/verify", json={"code": CODE, "test_inputs": inputs, "session_id": "drill-2"}).json()
+    assert again["timings"].get("cache_hit") is True
+    assert again["results"] == first["results"]
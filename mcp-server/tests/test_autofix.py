@@ -1,6 +1,7 @@
 
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 # Mock the server module since we are testing logic independent of E2B for now, 
 # or we can mock E2B.
@@ -25,7 +26,7 @@ def test_heuristics_complex_code():
     code = "\n".join(["print('line')" for _ in range(20)])
     assert fixer.is_simple_fix(code) == False
 
-@patch('api.requests.post')
+@patch('llm_client.httpx.AsyncClient.post', new_callable=AsyncMock)
 def test_generate_fix_calls_ollama(mock_post):
     fixer = AgentFixer()
     
@@ -38,7 +39,7 @@ def test_generate_fix_calls_ollama(mock_post):
     mock_response.json.return_value = {"response": "```python\nfixed_code\n```"}
     mock_post.return_value = mock_response
     
-    fix = fixer.generate_fix(start_code, error, "input")
+    fix = asyncio.run(fixer.generate_fix(start_code, error, "input"))
     
     assert fix == "fixed_code"
     assert mock_post.called
@@ -49,7 +50,7 @@ def test_verify_fix_success():
         mock_verify.return_value = "Output Logs:\nResult: 6"
         
         fixer = AgentFixer()
-        result, logs = fixer.verify_fix("code", "input")
+        result, logs = asyncio.run(fixer.verify_fix("code", "input"))
         
         assert result == True
         assert "Result: 6" in logs
@@ -63,13 +64,16 @@ def test_agent_workflow_success():
     """
     fixer = AgentFixer()
     
-    with patch.object(fixer, 'generate_fix', return_value="class Solution:\n    val = 1"):
+    with patch.object(fixer, 'generate_fix', return_value="class Solution:\n    val = 1"), \
+         patch.object(fixer, 'generate_tests', return_value=[]):
         with patch.object(fixer, 'verify_fix', return_value=(True, "Success")):
             
-            response = fixer.attempt_fix("bad_code", "error", "input")
+            response = asyncio.run(fixer.attempt_fix("bad_code", "error", "input"))
             
             assert response['fixed_code'] is not None
-            assert response['explanation'] is None
+            # A verified fix comes with a summary of what it passed (attempt_fix has always set one)
+            assert response['explanation'] == \
+                "Fixed after 1 attempts. Passed 1/1 tests (including 0 generated edge cases)."
             assert response['verified'] == True
 
 def test_agent_workflow_failure():
@@ -84,8 +88,32 @@ def test_agent_workflow_failure():
     with patch.object(fixer, 'generate_fix', return_value="bad_fix"):
         with patch.object(fixer, 'verify_fix', return_value=(False, "Runtime Error")):
             
-            response = fixer.attempt_fix("bad_code", "error", "input")
+            response = asyncio.run(fixer.attempt_fix("bad_code", "error", "input"))
             
             # The implementation returns the candidate even if verification fails
             assert response['fixed_code'] == "bad_fix"
             assert response['verified'] == False
+
+def test_generate_fix_streams_tokens():
+    import httpx
+    import json as _json
+
+    def handler(request):
+        body = _json.loads(request.content)
+        assert body["stream"] is True
+        lines = [{"response": "```python\n", "done": False},
+                 {"response": "fixed", "done": False},
+                 {"response": "_code\n```", "done": True}]
+        return httpx.Response(200, text="\n".join(_json.dumps(l) for l in lines))
+
+    real_client = httpx.AsyncClient
+    tokens = []
+
+    async def on_token(text):
+        tokens.append(text)
+
+    with patch('llm_client.httpx.AsyncClient', lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw)):
+        fix = asyncio.run(AgentFixer().generate_fix("code", "error", "input", on_token=on_token))
+
+    assert tokens == ["```python\n", "fixed", "_code\n```"]
+    assert fix == "fixed_code"
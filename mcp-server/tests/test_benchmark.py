@@ -0,0 +1,110 @@
+import asyncio
+import json
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import benchmark
+import harness
+import server
+from executors import PooledExecutor
+from llm_client import OllamaClient
+from verification_cache import VerificationCache
+
+
+def test_percentile_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert benchmark.percentile(values, 50) == 0.05
+    assert benchmark.percentile(values, 99) == 0.099
+    assert benchmark.percentile([], 95) == 0.0
+
+
+def test_fake_sandbox_answers_harness_stub():
+    sandbox = benchmark.FakeSandbox()
+    script = harness.run_script({"code": "x", "inputs": ["1", "2"], "expected": [], "options": {}})
+    frame = harness.read_frame(asyncio.run(sandbox.run_code(script)).logs.stdout)
+    assert [r["status"] for r in frame["results"]] == ["Passed", "Passed"]
+    assert asyncio.run(sandbox.run_code("1 + 1")).logs.stdout == ""
+
+
+def test_fake_ollama_serves_fix_and_tests():
+    async def scenario():
+        async with benchmark.LocalServer(benchmark.fake_ollama_app()) as url:
+            client = OllamaClient(cache_size=0)
+            fix = await client.generate(f"{url}/api/generate", {"model": "m", "prompt": "fix it"})
+            tokens = []
+
+            async def on_token(t):
+                tokens.append(t)
+            streamed = await client.generate(f"{url}/api/generate", {"model": "m", "prompt": "fix it"}, on_token)
+            tests = await client.generate(f"{url}/api/generate", {"model": "m", "prompt": "QA Engineer"})
+            await client.aclose()
+            return fix, streamed, tokens, tests
+
+    fix, streamed, tokens, tests = asyncio.run(scenario())
+    assert fix == streamed == benchmark.FIXED
+    assert len(tokens) > 1
+    assert json.loads(tests) == benchmark.GENERATED_TESTS
+
+
+def test_run_scenario_reports_latency_percentiles():
+    import api
+    executor = PooledExecutor("fake", benchmark.FakeSandbox.factory(0.001), max_size=2)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await benchmark.run_scenario(client, "verify", concurrency=3, batch_size=4, requests=9)
+
+    with patch.object(server, 'get_executor', return_value=executor), \
+         patch.object(api, 'get_executor', return_value=executor), \
+         patch.object(server, 'get_verification_cache', return_value=VerificationCache(max_entries=0)):
+        result = asyncio.run(scenario())
+    assert result["ok"] == 9 and result["errors"] == 0
+    assert result["status_codes"] == {"200": 9}
+    lat = result["latency_ms"]
+    assert 0 < lat["p50"] <= lat["p95"] <= lat["p99"] <= lat["max"]
+
+
+def test_compare_flags_p95_regressions():
+    def run(p95):
+        return {"results": [{"endpoint": "verify", "concurrency": 4, "batch_size": 1, "latency_ms": {"p95": p95}}]}
+
+    assert benchmark.compare(run(100), run(110)) == []
+    regressions = benchmark.compare(run(100), run(150))
+    assert regressions[0]["change"] == 0.5
+
+
+def test_admission_rejections_are_reported_apart_from_errors():
+    import api
+    from admission import AdmissionScheduler
+    executor = PooledExecutor("fake", benchmark.FakeSandbox.factory(0.001), max_size=2)
+    # Each client may send 3 verifies (2 warm-up ones come from their own id)
+    scheduler = AdmissionScheduler(rate=0.001, burst=3.0)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await benchmark.run_scenario(client, "verify", concurrency=2, batch_size=1, requests=10)
+
+    with patch.object(server, 'get_executor', return_value=executor), \
+         patch.object(api, 'get_executor', return_value=executor), \
+         patch.object(api, 'admission_scheduler', scheduler), \
+         patch.object(server, 'get_verification_cache', return_value=VerificationCache(max_entries=0)):
+        result = asyncio.run(scenario())
+    assert result["ok"] == 6 and result["rejected"] == 4
+    assert result["errors"] == 0
+    assert result["requests"] == 10
+
+
+def test_buggy_sample_reaches_the_sandbox_as_a_wrong_answer():
+    import preflight
+    assert preflight.check_submission(benchmark.BUGGY) is None
+    body = benchmark.request_body("autofix", 0, 1, identical=False)
+    out = harness.execute({"code": body["code"], "inputs": [body["test_input"]], "expected": body["expected"],
+                           "options": server.harness_options()})
+    assert out["results"][0]["status"] == "Wrong Answer"
@@ -0,0 +1,72 @@
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from case_history import CaseHistory, CaseHistoryStore, permute, restore
+
+INPUTS = ["1\n2", "3\n4", "5\n6", "7\n8"]
+
+
+def results(statuses):
+    return [{"index": i, "status": s} for i, s in enumerate(statuses)]
+
+
+def test_unknown_history_keeps_order():
+    history = CaseHistory()
+    assert history.order(INPUTS) == [0, 1, 2, 3]
+    assert history.stats()["reordered"] == 0
+
+
+def test_failures_first_then_unseen_then_passed():
+    history = CaseHistory()
+    history.record(INPUTS[:3], None, results(["Passed", "Wrong Answer", "Skipped"]))
+    # 1 failed, 2 was only skipped (unseen), 3 is new, 0 passed
+    assert history.order(INPUTS) == [1, 2, 3, 0]
+
+
+def test_most_recent_failure_goes_first():
+    history = CaseHistory()
+    history.record(INPUTS, None, results(["Runtime Error", "Passed", "Passed", "Passed"]))
+    history.record(INPUTS, None, results(["Skipped", "Passed", "Wrong Answer", "Skipped"]))
+    assert history.order(INPUTS)[:2] == [2, 0]
+
+
+def test_expected_value_is_part_of_the_case():
+    history = CaseHistory()
+    history.record(INPUTS[:1], ["3"], results(["Wrong Answer"]))
+    assert history.order(INPUTS[:2], ["3", None]) == [0, 1]
+    assert history.order(INPUTS[:2], ["4", None]) == [0, 1]
+    assert history.order(INPUTS[1:2] + INPUTS[:1], [None, "3"]) == [1, 0]
+
+
+def test_failing_ignores_failures_of_the_same_code():
+    history = CaseHistory()
+    code = "class Solution:\n    def f(self, a, b):\n        return a\n"
+    history.record(INPUTS[:2], None, results(["Passed", "Wrong Answer"]), code)
+    assert history.failing(INPUTS) == [1]
+    assert history.failing(INPUTS, code=code.replace("return a", "return b")) == [1]
+    # Same code, reformatted: its failures are already known (and cached)
+    assert history.failing(INPUTS, code=code.replace("\n        return", "\n\n        return")) == []
+
+
+def test_restore_maps_back_to_caller_order():
+    perm = [2, 0, 1]
+    assert permute(["a", "b", "c"], perm) == ["c", "a", "b"]
+    ran = [{"index": 0, "status": "Wrong Answer"}, {"index": 1, "status": "Skipped"}, {"index": 2, "status": "Skipped"}]
+    assert restore(ran, perm) == [
+        {"index": 0, "status": "Skipped"}, {"index": 1, "status": "Skipped"}, {"index": 2, "status": "Wrong Answer"},
+    ]
+
+
+def test_store_expires_idle_sessions():
+    now = [0.0]
+    store = CaseHistoryStore(max_sessions=2, ttl_seconds=10, clock=lambda: now[0])
+    first = store.get("a")
+    assert store.get("a") is first
+    now[0] = 11
+    assert store.get("a") is not first
+    store.get("b")
+    store.get("c")
+    assert store.stats()["sessions"] == 2
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import random
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from executors import PooledExecutor, ProcessSandbox
+from verification_cache import VerificationCache
+import api
+import complexity
+import server
+import stress
+
+LINEAR = "class Solution:\n    def total(self, nums):\n        return sum(x * 2 for x in nums)\n"
+QUADRATIC = (
+    "class Solution:\n    def pairs(self, nums):\n        c = 0\n"
+    "        for i in range(len(nums)):\n            for j in range(i + 1, len(nums)):\n"
+    "                if nums[i] + nums[j] == 0:\n                    c += 1\n        return c\n"
+)
+FIB = "class Solution:\n    def fib(self, n):\n        return n if n < 2 else self.fib(n - 1) + self.fib(n - 2)\n"
+SIZES = [64, 128, 256, 512, 1024]
+
+
+@pytest.fixture
+def executor():
+    # A worker process: signal timers, so no trace function skews the timings
+    ex = PooledExecutor("local", lambda: ProcessSandbox.create(timeout=20), max_size=1)
+    with patch.object(server, 'get_executor', return_value=ex), \
+         patch.object(server, 'get_verification_cache', return_value=VerificationCache(max_entries=0)):
+        yield ex
+    asyncio.run(ex.close())
+
+
+def test_geometric_sizes():
+    assert complexity.geometric_sizes(16, 256) == [16, 32, 64, 128, 256]
+    assert complexity.geometric_sizes(1, 4, 1.5) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("model,f", [
+    ("O(1)", lambda n: 5.0),
+    ("O(n)", lambda n: 0.01 * n + 0.5),
+    ("O(n log n)", lambda n: 0.002 * n * n.bit_length() + 0.1),
+    ("O(n^2)", lambda n: 0.0001 * n * n + 0.2),
+])
+def test_classify_synthetic_curves(model, f):
+    sizes = complexity.geometric_sizes(16, 65536)
+    assert complexity.classify(sizes, [f(n) for n in sizes])["complexity"] == model
+
+
+def test_classify_exponential():
+    sizes = [4, 6, 8, 10, 12, 14]
+    assert complexity.classify(sizes, [0.001 * 2 ** n for n in sizes])["complexity"] == "O(2^n)"
+
+
+def test_scale_input_keeps_shape_and_sortedness():
+    specs = stress.infer_arg_specs("class Solution:\n    def f(self, nums: List[int], k: int): pass\n", "[1,2,3]\n2")
+    raw = complexity.scale_input(specs, [[1, 2, 3], 2], 50, random.Random(0))
+    nums, k = stress.parse_sample(raw)
+    assert len(nums) == 50 and nums == sorted(nums) and k == 2
+
+
+def test_scale_input_uses_ints_as_size_without_collections():
+    specs = stress.infer_arg_specs(FIB, "5")
+    assert complexity.scale_input(specs, [5], 20, random.Random(0)) == "20"
+
+
+def test_profile_linear_solution(executor):
+    sizes = complexity.geometric_sizes(512, 32768)
+    report = asyncio.run(complexity.profile(LINEAR, "[1,2,3]", sizes=sizes))
+    assert report["error"] is None
+    # n vs n log n is within timing noise over a few doublings; quadratic is not
+    assert report["complexity"] in ("O(n)", "O(n log n)")
+    assert [t["n"] for t in report["timings"]] == sizes
+
+
+def test_profile_flags_quadratic_solution(executor):
+    report = asyncio.run(complexity.profile(QUADRATIC, "[1,-1,2]", sizes=SIZES, target_size=100000,
+                                            time_limit_ms=1000, max_complexity="O(n log n)"))
+    assert report["complexity"] == "O(n^2)"
+    assert report["too_slow"] is True
+    assert report["tle_risk"] is True
+
+
+def test_profile_stops_at_the_budget(executor):
+    report = asyncio.run(complexity.profile(FIB, "5", sizes=[4, 8, 12, 16, 20, 40, 60], repeats=1,
+                                            budget_seconds=1.0))
+    assert report["sizes_timed_out"] == [40]
+    assert report["max_size_within_budget"] == 20
+    assert report["complexity"] == "O(2^n)"
+
+
+def test_profile_with_generator(executor):
+    generator = "def generate(n):\n    return [list(range(n))]\n"
+    report = asyncio.run(complexity.profile(QUADRATIC, generator=generator, sizes=SIZES))
+    assert report["complexity"] == "O(n^2)"
+
+
+def test_profile_reports_generator_errors(executor):
+    report = asyncio.run(complexity.profile(LINEAR, generator="def make(n):\n    return []\n", sizes=SIZES))
+    assert report["complexity"] is None
+    assert "generate(n)" in report["error"]
+
+
+def test_profile_endpoint(executor):
+    with TestClient(api.app) as client:
+        resp = client.post("/profile", json={"code": LINEAR, "test_input": "[1,2]",
+                                             "sizes": [1024, 2048, 4096, 8192, 16384],
+                                             "max_complexity": "O(n log n)"})
+        assert resp.status_code == 200
+        assert resp.json()["too_slow"] is False
+        assert client.post("/profile", json={"code": LINEAR}).status_code == 422
+        assert client.post("/profile", json={"code": LINEAR, "test_input": "[1]", "budget_seconds": 999}).status_code == 422
+
+
+def test_repeat_profile_runs_again_instead_of_reading_the_cache():
+    ex = PooledExecutor("local", lambda: ProcessSandbox.create(timeout=20), max_size=1)
+    cache = VerificationCache()
+    runs = []
+    execute = server._execute_harness
+
+    async def counted(*args, **kwargs):
+        runs.append(args[1])
+        return await execute(*args, **kwargs)
+
+    async def scenario():
+        try:
+            first = await complexity.profile(LINEAR, "[1,2,3]", sizes=SIZES, repeats=1, measure=False)
+            second = await complexity.profile(LINEAR, "[1,2,3]", sizes=SIZES, repeats=1, measure=False)
+            return first, second
+        finally:
+            await ex.close()
+
+    with patch.object(server, 'get_executor', return_value=ex), \
+         patch.object(server, 'get_verification_cache', return_value=cache), \
+         patch.object(server, '_execute_harness', counted):
+        first, second = asyncio.run(scenario())
+    assert len(runs) == 2
+    assert first["error"] is None and second["error"] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_profile_measures_memory_in_a_separate_run(executor):
+    report = asyncio.run(complexity.profile(LINEAR, "[1,2,3]", sizes=SIZES, repeats=1))
+    assert report["error"] is None
+    assert all("peak_memory_kb" in t and "calls" in t for t in report["timings"])
+    plain = asyncio.run(complexity.profile(LINEAR, "[1,2,3]", sizes=SIZES, repeats=1, measure=False))
+    assert all("peak_memory_kb" not in t for t in plain["timings"])
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from executors import ProcessSandbox, PooledExecutor, build_executor
+import server
+
+
+def run_code(sb, code):
+    return asyncio.run(sb.run_code(code))
+
+
+@pytest.fixture
+def sandbox():
+    sb = ProcessSandbox(cpu_seconds=2, memory_mb=1024, timeout=5)
+    yield sb
+    sb.kill()
+
+
+def test_process_sandbox_runs_code(sandbox):
+    execution = run_code(sandbox, "print(sum(range(10)))")
+    assert execution.error is None
+    assert execution.logs.stdout.strip() == "45"
+
+
+def test_process_sandbox_reports_errors(sandbox):
+    execution = run_code(sandbox, "1 / 0")
+    assert execution.error.name == "ZeroDivisionError"
+    assert "division by zero" in execution.error.value
+
+
+def test_process_sandbox_keeps_interpreter_warm(sandbox):
+    run_code(sandbox, "import os; pid = os.getpid()")
+    execution = run_code(sandbox, "print(os.getpid() == pid)")
+    assert execution.logs.stdout.strip() == "True"
+
+
+def test_process_sandbox_reset_clears_globals(sandbox):
+    run_code(sandbox, "secret = 1")
+    asyncio.run(sandbox.reset())
+    execution = run_code(sandbox, "print('secret' in globals())")
+    assert execution.logs.stdout.strip() == "False"
+
+
+def test_process_sandbox_wall_clock_timeout():
+    sb = ProcessSandbox(cpu_seconds=10, timeout=0.5)
+    execution = run_code(sb, "import time; time.sleep(5)")
+    assert execution.error.name == "TimeoutError"
+    assert sb.alive is False
+
+
+def test_process_sandbox_cpu_limit():
+    sb = ProcessSandbox(cpu_seconds=1, timeout=10)
+    execution = run_code(sb, "while True: pass")
+    assert execution.error.name == "TimeoutError"
+    assert "CPU" in execution.error.value
+    assert sb.alive is False
+
+
+def test_process_sandbox_memory_limit(sandbox):
+    execution = run_code(sandbox, "x = bytearray(2 * 1024 * 1024 * 1024)")
+    assert execution.error.name == "MemoryError"
+
+
+def test_process_sandbox_blocks_network(sandbox):
+    execution = run_code(
+        sandbox,
+        "import socket\n"
+        "socket.create_connection(('example.com', 80), timeout=1)\n",
+    )
+    assert execution.error is not None
+
+
+def test_process_sandbox_does_not_block_event_loop():
+    sb = ProcessSandbox(timeout=5)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await sb.run_code("import time; time.sleep(0.3)")
+        task.cancel()
+        return ticks
+
+    try:
+        assert asyncio.run(scenario()) > 5
+    finally:
+        sb.kill()
+
+
+def test_dead_worker_is_replaced_by_pool():
+    executor = PooledExecutor("local", lambda: ProcessSandbox.create(timeout=0.5), max_size=1)
+
+    async def scenario():
+        first = await executor.run("import time; time.sleep(5)")
+        second = await executor.run("print('ok')")
+        await executor.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.error.name == "TimeoutError"
+    assert second.logs.stdout.strip() == "ok"
+    assert executor.stats()["created"] == 2
+
+
+def test_build_executor_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        build_executor("docker")
+
+
+def test_verify_solution_logic_on_local_backend():
+    executor = build_executor("local")
+    code = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+
+    async def scenario():
+        try:
+            return await server.verify_solution_logic(code, ["1\n2", "[1]\n[2]"])
+        finally:
+            await executor.close()
+
+    with patch.object(server, 'get_executor', return_value=executor):
+        results = json.loads(asyncio.run(scenario()))
+
+    assert [r["output"] for r in results] == ["3", "[1, 2]"]
+    assert all(r["status"] == "Passed" for r in results)
+
+
+
+def test_submission_cannot_tamper_with_harness_for_later_runs():
+    executor = build_executor("local", max_size=1)
+    tamper = (
+        "import _lc_harness\n"
+        "_lc_harness.outputs_match = lambda *args, **kwargs: True\n"
+        "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+    )
+    wrong = "class Solution:\n    def add(self, a, b):\n        return a - b\n"
+
+    async def scenario():
+        try:
+            await server.verify_solution_logic(tamper, ["1\n2"], expected=["0"], executor=executor)
+            return await server.verify_solution_logic(wrong, ["1\n2"], expected=["3"], executor=executor)
+        finally:
+            await executor.close()
+
+    results = json.loads(asyncio.run(scenario()))
+    assert results[0]["status"] == "Wrong Answer"
+    assert executor.stats()["created"] == 1
+
+
+def test_process_sandbox_hides_server_env_and_fds(monkeypatch, tmp_path):
+    monkeypatch.setenv("LC_TEST_SECRET", "hunter2")
+    with open(tmp_path / "server.log", "w") as log:
+        sb = ProcessSandbox(timeout=5)
+        try:
+            execution = run_code(sb, (
+                "import os\n"
+                "print(os.environ.get('LC_TEST_SECRET'), 'PATH' in os.environ)\n"
+                f"try:\n    os.fstat({log.fileno()})\n    print('open')\n"
+                "except OSError:\n    print('closed')\n"
+            ))
+        finally:
+            sb.kill()
+    assert execution.error is None
+    assert execution.logs.stdout.split() == ["None", "True", "closed"]
@@ -0,0 +1,83 @@
+import json
+import sys
+import os
+
+# Add parent directory to path to import fix_memo
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fix_memo import FixMemo, error_signature, fingerprint, memo_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fingerprint_ignores_formatting_and_comments():
+    a = "class Solution:\n    def f(self, x):\n        return x+1\n"
+    b = "class Solution:\n\n    def f(self, x):  # add one\n        return x + 1\n"
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a) != fingerprint(a.replace("+ 1", "+ 2").replace("+1", "+2"))
+
+
+def test_error_signature_is_independent_of_the_input():
+    def case(error, status="Runtime Error"):
+        return json.dumps([{"index": 0, "status": "Passed"}, {"index": 1, "status": status, "error": error}])
+
+    assert error_signature(case("KeyError: 5")) == error_signature(case("KeyError: 17"))
+    assert error_signature(case("KeyError: 5")) == "Runtime Error: KeyError: #"
+    assert error_signature(case(None, "Wrong Answer")) == "Wrong Answer"
+    assert error_signature(json.dumps([{"status": "Passed"}])) == "Passed"
+    fatal = "Runtime Error: NameError: name 'x' is not defined\\nTraceback:\\n  File \"<solution>\", line 3"
+    assert error_signature(fatal) == "Runtime Error: NameError: name 'x' is not defined"
+
+
+def test_memo_round_trip_and_ttl():
+    clock = FakeClock()
+    memo = FixMemo(ttl_seconds=60, clock=clock)
+    key = memo_key("class S: pass", "Runtime Error: X")
+    assert memo.get(key) is None
+    memo.put(key, "fixed", attempts=2, test_count=4)
+    assert memo.get(key) == {"fixed_code": "fixed", "attempts": 2, "test_count": 4, "hits": 1}
+    clock.now += 61
+    assert memo.get(key) is None
+    assert memo.stats() == {"hits": 1, "misses": 2, "stores": 1, "entries": 0}
+
+
+def test_memo_key_includes_the_oracle():
+    plain = memo_key("class S: pass", "Runtime Error: X")
+    assert memo_key("class S: pass", "Runtime Error: X", {}) == plain
+    assert memo_key("class S: pass", "Runtime Error: X", {"expected": "3"}) != plain
+    ref = "class S:\n    def f(self): return 1\n"
+    assert memo_key("class S: pass", "Runtime Error: X", {"reference_code": ref}) == \
+        memo_key("class S: pass", "Runtime Error: X", {"reference_code": ref.replace("return", "return  ")})
+
+
+def test_least_recently_used_entries_are_evicted():
+    clock = FakeClock()
+    memo = FixMemo(max_entries=2, clock=clock)
+    for key in ("a", "b"):
+        memo.put(key, key, 1, 1)
+        clock.now += 1
+    memo.get("a")
+    clock.now += 1
+    memo.put("c", "c", 1, 1)
+    assert memo.get("b") is None
+    assert memo.get("a") is not None and memo.get("c") is not None
+
+
+def test_memo_persists_in_a_file(tmp_path):
+    path = str(tmp_path / "memo.db")
+    memo = FixMemo(path)
+    memo.put("k", "fixed", 1, 3)
+    memo.close()
+    assert FixMemo(path).get("k")["fixed_code"] == "fixed"
+
+
+def test_size_zero_disables_the_memo():
+    memo = FixMemo(max_entries=0)
+    memo.put("k", "fixed", 1, 1)
+    assert memo.get("k") is None
@@ -0,0 +1,255 @@
+import asyncio
+import io
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import harness
+import server
+from executors import PooledExecutor, ProcessSandbox
+from sandbox_pool import LocalSandbox
+from verification_cache import VerificationCache
+
+ADD = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+
+
+def payload(code, inputs, **options):
+    return {"code": code, "inputs": inputs, "expected": [], "options": server.harness_options(**options)}
+
+
+def test_execute_runs_cases():
+    out = harness.execute(payload(ADD, ["1\n2", "[1]\n[2]"]))
+    assert [r["output"] for r in out["results"]] == ["3", "[1, 2]"]
+
+
+def test_user_prints_are_captured_per_case():
+    code = "print('loading')\nclass Solution:\n    def echo(self, x):\n        print('x =', x)\n        return x\n"
+    out = harness.execute(payload(code, ["1", "2"]))
+    assert [r["stdout"] for r in out["results"]] == ["x = 1\n", "x = 2\n"]
+    assert out["stdout"] == "loading\n"
+
+
+def test_user_stdout_is_capped():
+    code = "class Solution:\n    def spam(self, n):\n        print('a' * n)\n        return n\n"
+    options = {**server.harness_options(), "stdout_limit": 10}
+    out = harness.execute({"code": code, "inputs": ["100"], "expected": [], "options": options})
+    assert out["results"][0]["stdout"] == "a" * 10 + "...[truncated]"
+
+
+def test_syntax_error_is_fatal():
+    out = harness.execute(payload("class Solution:\n    def f(self\n", ["1"]))
+    assert out["fatal"]["name"] == "SyntaxError"
+
+
+def test_import_time_error_is_fatal():
+    out = harness.execute(payload("raise ValueError('boom')", ["1"]))
+    assert out["fatal"] == {"name": "ValueError", "value": "boom", "traceback": out["fatal"]["traceback"]}
+
+
+def test_harness_classes_are_not_mistaken_for_solution():
+    out = harness.execute(payload("def helper():\n    return 1\n", ["1"]))
+    assert out["results"][0]["error"] == "No Solution class found"
+
+
+def test_frame_round_trip_ignores_surrounding_output():
+    stream = io.StringIO()
+    stream.write("noise before\n")
+    harness.write_frame(stream, {"results": [{"index": 0}]})
+    stream.write("noise after")
+    assert harness.read_frame(stream.getvalue()) == {"results": [{"index": 0}]}
+    # E2B hands stdout back as a list of chunks
+    text = stream.getvalue()
+    assert harness.read_frame([text[:20], text[20:]]) == {"results": [{"index": 0}]}
+
+
+def test_read_frame_without_frame():
+    assert harness.read_frame("just prints") is None
+    assert harness.read_frame("") is None
+
+
+def test_run_script_passes_code_as_data():
+    script = harness.run_script(payload("print('\"\"\"')", ["1"]))
+    assert script.count("\n") == 2
+    assert script.startswith("import _lc_harness")
+
+
+@pytest.mark.parametrize("backend", ["local", "inprocess"])
+def test_harness_installed_once_per_sandbox(backend):
+    if backend == "local":
+        executor = PooledExecutor("local", lambda: ProcessSandbox.create(timeout=10), max_size=1)
+    else:
+        executor = PooledExecutor("inprocess", LocalSandbox.create, max_size=1)
+    code = "class Solution:\n    def add(self, a, b):\n        print('debug', a)\n        return a + b\n"
+
+    async def scenario():
+        try:
+            first = await server.verify_solution_logic(code, ["1\n2"])
+            second = await server.verify_solution_logic(code, ["3\n4"])
+            return first, second
+        finally:
+            await executor.close()
+
+    runs = []
+    target = LocalSandbox if backend == "inprocess" else ProcessSandbox
+    real_run = target.run_code
+
+    async def counting(self, script):
+        runs.append(script)
+        return await real_run(self, script)
+
+    with patch.object(server, 'get_executor', return_value=executor), \
+         patch.object(server, 'get_verification_cache', return_value=VerificationCache(max_entries=0)), \
+         patch.object(target, 'run_code', counting):
+        first, second = asyncio.run(scenario())
+
+    assert json.loads(first)[0]["output"] == "3"
+    assert json.loads(first)[0]["stdout"] == "debug 1\n"
+    assert json.loads(second)[0]["output"] == "7"
+    loaders = [s for s in runs if "types.ModuleType" in s]
+    assert len(loaders) == 1
+    # Every run after the loader is the short stub
+    assert all(len(s) < 1000 for s in runs if s not in loaders and "_lc_harness" in s)
+
+
+def test_parse_literal_fast_path_and_fallbacks():
+    assert harness.parse_literal("[1,2,3]") == [1, 2, 3]
+    assert harness.parse_literal('["MinStack","push"]') == ["MinStack", "push"]
+    assert harness.parse_literal("[[],[1],[null]]") == [[], [1], [None]]
+    assert harness.parse_literal("(1, 2)") == (1, 2)
+    assert harness.parse_literal("None") is None
+    assert harness.parse_literal("abc") == "abc"
+
+
+def test_parse_cache_hands_out_fresh_copies():
+    line = json.dumps(list(range(1000)))
+    first = harness.parse_line(line)
+    first.reverse()
+    second = harness.parse_line(line)
+    assert second[:3] == [0, 1, 2]
+    assert line in harness._parse_cache
+
+
+def test_mutating_solution_sees_original_input_every_time():
+    code = "class Solution:\n    def pop_all(self, nums):\n        n = len(nums)\n        nums.clear()\n        return n\n"
+    big = json.dumps(list(range(500)))
+    out = harness.execute(payload(code, [big, big]))
+    assert [r["output"] for r in out["results"]] == ["500", "500"]
+
+
+def test_explicit_method_name():
+    code = "class Solution:\n    def a_helper(self, x):\n        return -1\n    def solve(self, x):\n        return x * 2\n"
+    assert harness.execute(payload(code, ["3"]))["results"][0]["output"] == "-1"
+    assert harness.execute(payload(code, ["3"], method_name="solve"))["results"][0]["output"] == "6"
+
+
+def test_unknown_method_name_is_reported():
+    out = harness.execute(payload(ADD, ["1\n2"], method_name="missing"))
+    assert out["results"][0]["status"] == "Runtime Error"
+    assert "missing" in out["results"][0]["error"]
+
+
+def test_default_method_ignores_instance_attributes():
+    code = "class Solution:\n    def __init__(self):\n        self.a = 1\n    def twice(self, x):\n        return 2 * x\n"
+    assert harness.execute(payload(code, ["4"]))["results"][0]["output"] == "8"
+
+
+def test_outputs_match_modes():
+    assert harness.outputs_match([1, 2], [1, 2])
+    assert not harness.outputs_match([2, 1], [1, 2])
+    assert harness.outputs_match([2, 1], [1, 2], "unordered")
+    assert not harness.outputs_match([[2, 1], [3]], [[3], [1, 2]], "unordered")
+    assert harness.outputs_match([[2, 1], [3]], [[3], [1, 2]], "unordered_deep")
+    assert harness.outputs_match(["b", "a"], ["a", "b"], "unordered")
+
+
+def test_outputs_match_float_tolerance():
+    assert not harness.outputs_match(0.30000000000000004, 0.3)
+    assert harness.outputs_match(0.1 + 0.2, 0.3, float_tolerance=1e-9)
+    assert harness.outputs_match([2.000001, 1.0], [1.0, 2.0], "unordered", 1e-5)
+    assert not harness.outputs_match(2.1, 2.0, float_tolerance=1e-5)
+    # Booleans aren't numbers here
+    assert not harness.outputs_match(True, 1.0000001, float_tolerance=1e-3)
+
+
+def test_expected_with_unordered_compare():
+    code = "class Solution:\n    def dedupe(self, nums):\n        return list(set(nums))[::-1]\n"
+    exact = harness.execute({**payload(code, ["[3,1,2,3]"]), "expected": ["[1,2,3]"]})
+    loose = harness.execute({**payload(code, ["[3,1,2,3]"], compare="unordered"), "expected": ["[1,2,3]"]})
+    assert exact["results"][0]["status"] == "Wrong Answer"
+    assert loose["results"][0]["status"] == "Passed"
+
+
+def test_reference_solution_catches_wrong_answer():
+    reference = "class Solution:\n    def total(self, nums):\n        return sum(nums)\n"
+    candidate = "class Solution:\n    def total(self, nums):\n        return sum(nums[1:])\n"
+    out = harness.execute({**payload(candidate, ["[0,1,2]", "[5,1]"]), "reference_code": reference})
+    first, second = out["results"]
+    assert first["status"] == "Passed" and first["expected_source"] == "reference"
+    assert second["status"] == "Wrong Answer"
+    assert second["expected"] == "6" and second["output"] == "1"
+
+
+def test_expected_accepts_json_literals():
+    code = "class Solution:\n    def f(self, x):\n        return None if x < 0 else x > 0\n"
+    out = harness.execute({**payload(code, ["1", "0", "-1", "1"]), "expected": ["true", "false", "null", "false"]})
+    assert [r["status"] for r in out["results"]] == ["Passed", "Passed", "Passed", "Wrong Answer"]
+
+
+def test_explicit_expected_wins_over_reference():
+    reference = "class Solution:\n    def f(self, x):\n        return 0\n"
+    out = harness.execute({**payload(ADD, ["1\n2"]), "expected": ["3"], "reference_code": reference})
+    assert out["results"][0]["status"] == "Passed"
+    assert "expected_source" not in out["results"][0]
+
+
+def test_reference_gets_its_own_copy_of_inputs():
+    reference = "class Solution:\n    def first(self, nums):\n        v = nums[0]\n        nums.clear()\n        return v\n"
+    out = harness.execute({**payload(reference, ["[7,8]"]), "reference_code": reference})
+    assert out["results"][0]["status"] == "Passed"
+
+
+def test_reference_failure_is_reported_not_judged():
+    reference = "class Solution:\n    def f(self, x):\n        raise ValueError('ref broke')\n"
+    out = harness.execute({**payload(ADD, ["1\n2"]), "reference_code": reference})
+    assert out["results"][0]["status"] == "Passed"
+    assert "ref broke" in out["results"][0]["reference_error"]
+
+
+def test_broken_reference_is_fatal():
+    out = harness.execute({**payload(ADD, ["1\n2"]), "reference_code": "def ("})
+    assert out["fatal"]["name"] == "ReferenceSolutionError"
+
+
+def test_prelude_preimports_modules_and_typing_names():
+    code = ("class Solution:\n    def top(self, nums: List[int]) -> int:\n"
+            "        q = collections.deque(nums)\n"
+            "        return heapq.nlargest(1, q)[0]\n")
+    out = harness.execute(payload(code, ["[3,9,4]"], prelude=["collections", "heapq", "typing"]))
+    assert out["results"][0]["output"] == "9"
+
+
+def test_prelude_snapshot_is_copied_per_run():
+    leak = "LEAKED = 1\nclass Solution:\n    def f(self, x):\n        return x\n"
+    probe = "class Solution:\n    def f(self, x):\n        return 'LEAKED' in globals()\n"
+    harness.execute(payload(leak, ["1"], prelude=["math"]))
+    out = harness.execute(payload(probe, ["1"], prelude=["math"]))
+    assert out["results"][0]["output"] == "False"
+
+
+def test_recursion_limit_is_restored_after_run():
+    before = sys.getrecursionlimit()
+    code = "import sys\nsys.setrecursionlimit(54321)\nclass Solution:\n    def f(self, x):\n        return x\n"
+    harness.execute(payload(code, ["1"]))
+    assert sys.getrecursionlimit() == before
+
+
+def test_isolated_run_reports_a_child_that_exits_without_a_result():
+    code = "import os\nos._exit(3)\n"
+    out = harness.isolated(harness.execute, payload(code, ["1"]))
+    assert out["fatal"]["name"] == "WorkerCrashed"
+    assert "exit status 3" in out["fatal"]["value"]
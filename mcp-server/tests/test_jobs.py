@@ -0,0 +1,176 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from jobs import JobQueue, JobStore, JobNotFound, DONE, FAILED, CANCELLED, QUEUED, RUNNING
+from limits import Overloaded
+
+
+async def wait_for_state(queue, job_id, *states):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job["state"] in states:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stuck in {queue.get(job_id)['state']}")
+
+
+def test_job_runs_and_records_events():
+    async def runner(request, on_event):
+        await on_event("status", {"message": "working"})
+        await on_event("token", {"text": "x"})
+        return {"verified": True, "echo": request["code"]}
+
+    async def scenario():
+        queue = JobQueue(JobStore(), runner, workers=1)
+        await queue.start()
+        job, deduplicated = queue.submit({"code": "c"})
+        assert not deduplicated
+        done = await wait_for_state(queue, job["id"], DONE)
+        await queue.stop()
+        return done
+
+    job = asyncio.run(scenario())
+    assert job["result"] == {"verified": True, "echo": "c"}
+    assert [e["event"] for e in job["events"]] == ["status"]
+    assert job["started_at"] is not None and job["finished_at"] is not None
+
+
+def test_higher_priority_runs_first():
+    order = []
+
+    async def runner(request, on_event):
+        order.append(request["name"])
+        return {}
+
+    async def scenario():
+        queue = JobQueue(JobStore(), runner, workers=1)
+        # Submitted before the workers start, so all three are waiting together
+        low, _ = queue.submit({"name": "low"}, priority=0)
+        high, _ = queue.submit({"name": "high"}, priority=5)
+        mid, _ = queue.submit({"name": "mid"}, priority=1)
+        await queue.start()
+        await wait_for_state(queue, low["id"], DONE)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert order == ["high", "mid", "low"]
+
+
+def test_identical_active_submissions_are_merged():
+    release = None
+
+    async def runner(request, on_event):
+        await release.wait()
+        return {"ok": True}
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        queue = JobQueue(JobStore(), runner, workers=1)
+        await queue.start()
+        first, _ = queue.submit({"code": "c"}, dedupe_key="k")
+        second, deduplicated = queue.submit({"code": "c"}, dedupe_key="k")
+        assert deduplicated and second["id"] == first["id"]
+        release.set()
+        await wait_for_state(queue, first["id"], DONE)
+        # Finished jobs don't absorb new submissions
+        third, deduplicated = queue.submit({"code": "c"}, dedupe_key="k")
+        assert not deduplicated and third["id"] != first["id"]
+        await wait_for_state(queue, third["id"], DONE)
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["submitted"] == 2 and stats["deduplicated"] == 1
+
+
+def test_cancel_queued_and_running_jobs():
+    started = None
+
+    async def runner(request, on_event):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def scenario():
+        nonlocal started
+        started = asyncio.Event()
+        queue = JobQueue(JobStore(), runner, workers=1)
+        await queue.start()
+        running, _ = queue.submit({"n": 1})
+        waiting, _ = queue.submit({"n": 2})
+        await started.wait()
+        assert queue.cancel(waiting["id"])["state"] == CANCELLED
+        queue.cancel(running["id"])
+        cancelled = await wait_for_state(queue, running["id"], CANCELLED)
+        await queue.stop()
+        return cancelled, queue.stats()
+
+    job, stats = asyncio.run(scenario())
+    assert job["finished_at"] is not None
+    assert stats["cancelled"] == 2 and stats["running"] == 0
+
+
+def test_runner_errors_fail_the_job():
+    async def runner(request, on_event):
+        raise RuntimeError("ollama down")
+
+    async def scenario():
+        queue = JobQueue(JobStore(), runner, workers=1)
+        await queue.start()
+        job, _ = queue.submit({})
+        failed = await wait_for_state(queue, job["id"], FAILED)
+        await queue.stop()
+        return failed
+
+    assert asyncio.run(scenario())["error"] == "RuntimeError: ollama down"
+
+
+def test_queue_limit_and_unknown_job():
+    async def runner(request, on_event):
+        return {}
+
+    queue = JobQueue(JobStore(), runner, workers=1, max_queued=1)
+    queue.submit({})
+    with pytest.raises(Overloaded) as exc:
+        queue.submit({})
+    assert exc.value.status_code == 429
+    with pytest.raises(JobNotFound):
+        queue.get("missing")
+
+
+def test_jobs_survive_restart(tmp_path):
+    db = str(tmp_path / "jobs.db")
+
+    async def hang(request, on_event):
+        await asyncio.sleep(60)
+
+    async def finish(request, on_event):
+        return {"resumed": request["n"]}
+
+    async def first_life():
+        queue = JobQueue(JobStore(db), hang, workers=1)
+        await queue.start()
+        running, _ = queue.submit({"n": 1})
+        queued, _ = queue.submit({"n": 2})
+        await wait_for_state(queue, running["id"], RUNNING)
+        await queue.stop()
+        queue.store.close()
+        return running["id"], queued["id"]
+
+    async def second_life(ids):
+        queue = JobQueue(JobStore(db), finish, workers=1)
+        assert [queue.get(i)["state"] for i in ids] == [RUNNING, QUEUED]
+        await queue.start()
+        jobs = [await wait_for_state(queue, i, DONE) for i in ids]
+        await queue.stop()
+        return jobs
+
+    ids = asyncio.run(first_life())
+    jobs = asyncio.run(second_life(ids))
+    assert [j["result"] for j in jobs] == [{"resumed": 1}, {"resumed": 2}]
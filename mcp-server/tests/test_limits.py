@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import limits
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from limits import ConcurrencyLimiter, Overloaded
+
+
+def test_slot_allows_up_to_max_concurrent():
+    limiter = ConcurrencyLimiter("t", max_concurrent=2, max_queue=0)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.stats()["active"])
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(job(), job())
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert limiter.stats()["active"] == 0
+
+
+def test_queue_full_raises_429():
+    limiter = ConcurrencyLimiter("t", max_concurrent=1, max_queue=1, retry_after=3)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def holder():
+            async with limiter.slot():
+                await release.wait()
+
+        async def waiter():
+            async with limiter.slot():
+                pass
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(waiter())
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as exc:
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(first, second)
+        return exc.value
+
+    err = asyncio.run(scenario())
+    assert err.status_code == 429
+    assert err.retry_after == 3
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_queue_timeout_raises_503():
+    limiter = ConcurrencyLimiter("t", max_concurrent=1, max_queue=5, queue_timeout=0.05)
+
+    async def scenario():
+        async with limiter.slot():
+            with pytest.raises(Overloaded) as exc:
+                async with limiter.slot():
+                    pass
+        return exc.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_slot_released_on_error():
+    limiter = ConcurrencyLimiter("t", max_concurrent=1, max_queue=0)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("boom")
+        async with limiter.slot():
+            pass
+
+    asyncio.run(scenario())
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm_client import OllamaClient, prompt_key, is_deterministic
+from api import AgentFixer
+
+URL = "http://localhost:11434/api/generate"
+
+
+def mock_ollama(handler):
+    real_client = httpx.AsyncClient
+    return patch('llm_client.httpx.AsyncClient',
+                 lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw))
+
+
+def payload(temperature=0, prompt="fix it"):
+    return {"model": "llama3.1", "prompt": prompt, "stream": False, "options": {"temperature": temperature}}
+
+
+def test_prompt_key_ignores_stream_flag():
+    assert prompt_key(payload()) == prompt_key({**payload(), "stream": True})
+    assert prompt_key(payload()) != prompt_key(payload(prompt="other"))
+
+
+def test_only_temperature_zero_is_deterministic():
+    assert is_deterministic(payload(0))
+    assert not is_deterministic(payload(0.4))
+    assert not is_deterministic({"prompt": "x"})
+
+
+def test_reuses_one_connection_pool():
+    created = []
+    real_client = httpx.AsyncClient
+
+    def factory(**kw):
+        client = real_client(transport=httpx.MockTransport(lambda r: httpx.Response(200, json={"response": "ok"})), **kw)
+        created.append(client)
+        return client
+
+    async def scenario():
+        client = OllamaClient()
+        for i in range(3):
+            await client.generate(URL, payload(0.5, prompt=str(i)))
+        await client.aclose()
+
+    with patch('llm_client.httpx.AsyncClient', factory):
+        asyncio.run(scenario())
+    assert len(created) == 1
+
+
+def test_caches_temperature_zero_calls():
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": '["1"]'})
+
+    async def scenario():
+        client = OllamaClient()
+        first = await client.generate(URL, payload(0))
+        second = await client.generate(URL, payload(0))
+        await client.generate(URL, payload(0.8))
+        await client.generate(URL, payload(0.8))
+        return client, first, second
+
+    with mock_ollama(handler):
+        client, first, second = asyncio.run(scenario())
+
+    assert first == second == '["1"]'
+    assert len(calls) == 3  # one cached call, two sampled ones
+    assert client.stats()["cache_hits"] == 1
+
+
+def test_cache_is_bounded():
+    async def scenario():
+        client = OllamaClient(cache_size=2)
+        for i in range(3):
+            await client.generate(URL, payload(0, prompt=str(i)))
+        return client
+
+    with mock_ollama(lambda r: httpx.Response(200, json={"response": "ok"})):
+        client = asyncio.run(scenario())
+    assert client.stats()["cache_entries"] == 2
+
+
+def test_retries_transient_failures():
+    attempts = []
+
+    def handler(request):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("refused")
+        if len(attempts) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"response": "ok"})
+
+    async def scenario():
+        client = OllamaClient(max_retries=2, backoff_seconds=0)
+        return client, await client.generate(URL, payload(0.5))
+
+    with mock_ollama(handler):
+        client, text = asyncio.run(scenario())
+    assert text == "ok"
+    assert client.stats()["retries"] == 2
+
+
+def test_gives_up_after_max_retries():
+    async def scenario():
+        client = OllamaClient(max_retries=1, backoff_seconds=0)
+        with pytest.raises(httpx.ConnectError):
+            await client.generate(URL, payload(0.5))
+        return client
+
+    def refuse(request):
+        raise httpx.ConnectError("refused")
+
+    with mock_ollama(refuse):
+        client = asyncio.run(scenario())
+    assert client.stats()["requests"] == 2
+    assert client.stats()["errors"] == 1
+
+
+def test_client_error_is_not_retried():
+    attempts = []
+
+    def handler(request):
+        attempts.append(1)
+        return httpx.Response(404)
+
+    async def scenario():
+        return await OllamaClient(backoff_seconds=0).generate(URL, payload(0))
+
+    with mock_ollama(handler):
+        assert asyncio.run(scenario()) is None
+    assert len(attempts) == 1
+
+
+def test_cached_answer_is_replayed_to_stream():
+    tokens = []
+
+    async def on_token(text):
+        tokens.append(text)
+
+    async def scenario():
+        client = OllamaClient()
+        await client.generate(URL, payload(0))
+        return await client.generate(URL, payload(0), on_token=on_token)
+
+    with mock_ollama(lambda r: httpx.Response(200, json={"response": "fixed_code"})):
+        assert asyncio.run(scenario()) == "fixed_code"
+    assert tokens == ["fixed_code"]
+
+
+def test_generate_tests_is_cached_per_prompt():
+    calls = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        calls.append(body)
+        return httpx.Response(200, json={"response": '["[1]", "[2]", "[3]", "[4]"]'})
+
+    fixer = AgentFixer()
+
+    async def scenario():
+        first = await fixer.generate_tests("code", "error")
+        second = await fixer.generate_tests("code", "error")
+        return first, second
+
+    with mock_ollama(handler):
+        first, second = asyncio.run(scenario())
+
+    assert first == second == ["[1]", "[2]", "[3]"]
+    assert len(calls) == 1
+    assert calls[0]["options"]["temperature"] == 0
+
+
+def test_generate_tests_at_a_higher_temperature_is_not_cached(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": '["[1]"]'})
+
+    monkeypatch.setenv("AUTOFIX_TESTS_TEMPERATURE", "0.4")
+    fixer = AgentFixer()
+
+    async def scenario():
+        await fixer.generate_tests("code", "error")
+        await fixer.generate_tests("code", "error")
+
+    with mock_ollama(handler):
+        asyncio.run(scenario())
+    assert len(calls) == 2
+    assert calls[0]["options"]["temperature"] == 0.4
@@ -0,0 +1,91 @@
+import json
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from log_compactor import clip, compact_logs, estimate_tokens, user_frames
+
+TRACEBACK = (
+    "Traceback (most recent call last):\n"
+    '  File "_lc_harness.py", line 300, in run_all\n'
+    "    entry = self.run_case(idx, raw_input_str, parsed_args, reference)\n"
+    '  File "_lc_harness.py", line 380, in call_target\n'
+    "    return getattr(instance, method_name)(*parsed_args)\n"
+    '  File "<solution>", line 3, in solve\n'
+    "    return self.helper(nums)\n"
+    '  File "<solution>", line 5, in helper\n'
+    "    return self.inner(nums)\n"
+    '  File "<solution>", line 7, in inner\n'
+    "    return nums[0]\n"
+    "IndexError: list index out of range\n"
+)
+
+
+def failure(index, raw_input, tb=TRACEBACK, error="list index out of range"):
+    return {"index": index, "input": raw_input, "error": error, "traceback": tb, "status": "Runtime Error",
+            "wall_ms": 0.1, "cpu_ms": 0.1, "peak_memory_kb": 12.0, "calls": 1}
+
+
+def test_clip_keeps_head_and_tail_with_size_marker():
+    text = "a" * 600 + "b" * 400
+    clipped = clip(text, 300)
+    assert clipped.startswith("a" * 200) and clipped.endswith("b" * 100)
+    assert "...[700 chars truncated]..." in clipped
+    assert clip("short", 300) == "short"
+
+
+def test_user_frames_keeps_innermost_user_code():
+    frames = user_frames(TRACEBACK)
+    assert "_lc_harness" not in frames
+    assert 'line 3' not in frames
+    assert frames.splitlines() == [
+        'File "<solution>", line 5, in helper', "return self.inner(nums)",
+        'File "<solution>", line 7, in inner', "return nums[0]",
+        "IndexError: list index out of range",
+    ]
+
+
+def test_identical_failures_are_merged_and_metrics_dropped():
+    logs = json.dumps([failure(i, f"[{i}]") for i in range(5)], indent=2)
+    compact = compact_logs(logs, 1000)
+    lines = compact.splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["index"] == 0 and entry["same_failure_indices"] == [1, 2, 3, 4]
+    assert "wall_ms" not in entry and "calls" not in entry
+
+
+def test_distinct_failures_stay_separate():
+    wrong = {"index": 1, "input": "[1]", "output": "2", "expected": "1", "status": "Wrong Answer"}
+    compact = compact_logs(json.dumps([failure(0, "[]"), wrong]), 1000)
+    assert len(compact.splitlines()) == 2
+
+
+def test_large_inputs_are_truncated_to_fit_the_budget():
+    big = json.dumps(list(range(50000)))
+    logs = json.dumps([failure(0, big), failure(1, big, error="other", tb="ValueError: other\n")], indent=2)
+    compact = compact_logs(logs, 200)
+    assert estimate_tokens(compact) <= 200
+    assert "chars truncated" in compact
+    assert "list index out of range" in compact
+
+
+def test_many_distinct_failures_are_cut_with_a_count():
+    logs = json.dumps([failure(i, "[1]", error=f"error {i}", tb=f"ValueError: error {i}\n") for i in range(200)])
+    compact = compact_logs(logs, 300)
+    assert estimate_tokens(compact) <= 300
+    assert "more distinct failures omitted" in compact
+
+
+def test_fatal_errors_keep_user_frames():
+    logs = f"Runtime Error: IndexError: list index out of range\\nTraceback:\\n{TRACEBACK}"
+    compact = compact_logs(logs, 500)
+    assert compact.startswith("Runtime Error: IndexError")
+    assert "_lc_harness" not in compact
+    assert "return nums[0]" in compact
+
+
+def test_plain_text_is_clipped():
+    assert estimate_tokens(compact_logs("x" * 10000, 50)) <= 50
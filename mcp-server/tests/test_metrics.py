@@ -0,0 +1,39 @@
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import metrics
+
+
+def test_counter_and_gauge_render_with_labels():
+    counter = metrics.Counter("test_events_total", "Events", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind='quote"d')
+    gauge = metrics.Gauge("test_depth", "Depth")
+    gauge.set(3)
+    text = metrics.render()
+    assert "# TYPE test_events_total counter" in text
+    assert 'test_events_total{kind="a"} 1' in text
+    assert 'test_events_total{kind="quote\\"d"} 2' in text
+    assert "test_depth 3" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = metrics.Histogram("test_latency_seconds", "Latency", ("call",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, call="fix")
+    lines = hist.render()
+    assert 'test_latency_seconds_bucket{call="fix",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{call="fix",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{call="fix",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{call="fix"} 3' in lines
+    assert hist.value(call="fix") == (3, 5.55)
+
+
+def test_labels_must_match():
+    counter = metrics.Counter("test_strict_total", "Strict", ("status",))
+    with pytest.raises(ValueError):
+        counter.inc(state="x")
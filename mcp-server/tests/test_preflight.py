@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import preflight
+import server
+from verification_cache import VerificationCache
+
+ADD = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+
+
+def test_valid_code_passes():
+    assert preflight.check(ADD) is None
+
+
+def test_leetcode_style_code_passes():
+    code = ("import heapq\nfrom typing import List\nfrom collections import *\n"
+            "class Solution:\n    def top(self, nums: List[int]) -> int:\n"
+            "        return heapq.nlargest(1, nums)[0] + len(deque())\n")
+    assert preflight.check(code) is None
+
+
+def test_syntax_error_matches_harness_shape():
+    error = preflight.check("class Solution:\n    def f(self)\n        return 1\n")
+    assert error["name"] == "SyntaxError"
+    assert "line 2" in error["traceback"]
+
+
+def test_compiler_only_errors_are_caught():
+    assert preflight.check("return 1\n")["name"] == "SyntaxError"
+
+
+def test_missing_target_class():
+    error = preflight.check("def solve(x):\n    return x\n")
+    assert (error["name"], error["value"]) == ("TargetError", "No Solution class found")
+
+
+def test_missing_method():
+    error = preflight.check(ADD, method_name="sub")
+    assert error["value"] == "Solution has no method 'sub'"
+    assert preflight.check("class Solution:\n    def __init__(self):\n        pass\n")["name"] == "TargetError"
+
+
+def test_inherited_methods_are_left_to_the_harness():
+    code = "class Base:\n    def sub(self, a, b):\n        return a - b\nclass Solution(Base):\n    pass\n"
+    assert preflight.check(code, method_name="sub") is None
+
+
+@pytest.mark.parametrize("line", ["import os", "import os.path", "from subprocess import run",
+                                  "x = __import__('socket')", "import importlib",
+                                  "x = __import__('o' + 's')"])
+def test_disallowed_imports(line):
+    error = preflight.check(f"{line}\n{ADD}")
+    assert error["name"] == "ImportError"
+    assert 'line 1' in error["traceback"]
+
+
+def test_disallowed_imports_are_configurable(monkeypatch):
+    monkeypatch.setenv("VERIFY_DISALLOWED_IMPORTS", "")
+    assert preflight.check(f"import os\n{ADD}") is None
+
+
+def test_undefined_names():
+    code = "class Solution:\n    def f(self, x):\n        return helper(x)\n"
+    error = preflight.check(code)
+    assert (error["name"], error["value"]) == ("NameError", "name 'helper' is not defined")
+    assert preflight.check("class Solution:\n    def f(self, x: List[int]):\n        return x\n")["name"] == "NameError"
+
+
+def test_undefined_name_points_at_the_line_that_reads_it():
+    code = "class Solution:\n    def f(self, x):\n        y = x\n\n        return helper(y)\n"
+    assert 'line 5\n    return helper(y)' in preflight.check(code)["traceback"]
+    # A local of the same name elsewhere doesn't count
+    code = "def g():\n    x = 1\n    return x\nclass Solution:\n    def f(self, v):\n        return v\nprint(x)\n"
+    assert 'line 7' in preflight.check(code)["traceback"]
+
+
+def test_names_bound_anywhere_are_defined():
+    code = ("def setup():\n    global CACHE\n    CACHE = {}\n"
+            "class Solution:\n    def top(self, x):\n        y = [v for v in x if v]\n"
+            "        try:\n            return CACHE, y, print\n        except KeyError as e:\n            raise e\n")
+    assert preflight.check(code) is None
+
+
+def test_prelude_names_are_defined():
+    code = "class Solution:\n    def f(self, nums: List[int]):\n        return collections.Counter(nums)\n"
+    assert preflight.check(code, prelude=["collections", "typing"]) is None
+
+
+def test_reference_errors_are_reported_as_reference():
+    error = preflight.check_submission(ADD, reference_code="class Solution:\n    def add(self, a, b)\n")
+    assert error["name"] == "ReferenceSolutionError"
+    assert error["value"].startswith("SyntaxError")
+
+
+def test_rejected_code_never_leases_a_sandbox(monkeypatch):
+    class NoExecutor:
+        def install(self, *args):
+            raise AssertionError("sandbox used")
+
+    timings = {}
+    with patch.object(server, 'get_executor', return_value=NoExecutor()), \
+         patch.object(server, 'get_verification_cache', return_value=VerificationCache()):
+        logs = asyncio.run(server.verify_solution_logic("import subprocess\n" + ADD, ["1\n2"], timings=timings))
+    assert logs.startswith("Runtime Error: ImportError: import of 'subprocess' is not allowed")
+    assert timings == {"preflight": "rejected"}
+
+    monkeypatch.setenv("VERIFY_PREFLIGHT", "0")
+    assert server.preflight_error("import subprocess\n" + ADD) is None
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sandbox_pool import SandboxPool, LocalSandbox, PoolExhausted
+from executors import PooledExecutor
+import server
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(**kwargs):
+    created = []
+
+    async def factory():
+        sb = LocalSandbox()
+        created.append(sb)
+        return sb
+
+    return SandboxPool(factory, **kwargs), created
+
+
+def test_lease_reuses_warm_sandbox():
+    async def scenario():
+        pool, created = make_pool(max_size=2)
+        async with pool.lease() as first:
+            pass
+        async with pool.lease() as second:
+            pass
+        return first, second, created
+
+    first, second, created = asyncio.run(scenario())
+    assert first is second
+    assert len(created) == 1
+
+
+def test_globals_do_not_leak_between_leases():
+    async def scenario():
+        pool, _ = make_pool(max_size=1)
+        async with pool.lease() as sb:
+            await sb.run_code("secret = 42")
+        async with pool.lease() as sb:
+            return await sb.run_code("print('secret' in globals())")
+
+    execution = asyncio.run(scenario())
+    assert execution.logs.stdout.strip() == "False"
+
+
+def test_warm_creates_min_size():
+    pool, created = make_pool(min_size=2, max_size=3)
+    asyncio.run(pool.warm())
+    assert len(created) == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_recycles_after_max_uses():
+    async def scenario():
+        pool, created = make_pool(max_size=1, max_uses=2)
+        for _ in range(3):
+            async with pool.lease():
+                pass
+        return pool, created
+
+    pool, created = asyncio.run(scenario())
+    assert len(created) == 2
+    assert created[0].alive is False
+    assert pool.stats()["recycled"] == 1
+
+
+def test_idle_eviction_respects_min_size():
+    clock = FakeClock()
+
+    async def scenario():
+        pool, _ = make_pool(min_size=1, max_size=3, max_idle_seconds=10, clock=clock)
+        async with pool.lease():
+            async with pool.lease():
+                pass
+        assert pool.stats()["idle"] == 2
+        clock.now = 11
+        await pool.reap()
+        return pool
+
+    stats = asyncio.run(scenario()).stats()
+    assert stats["size"] == 1
+    assert stats["evicted"] == 1
+
+
+def test_sandboxes_past_max_age_are_dropped_even_below_min_size():
+    clock = FakeClock()
+
+    async def scenario():
+        pool, created = make_pool(min_size=1, max_size=2, max_age_seconds=100, clock=clock)
+        await pool.warm()
+        clock.now = 100
+        await pool.reap()
+        after_reap = pool.stats()
+        async with pool.lease() as sandbox:
+            clock.now = 250
+        return after_reap, pool.stats(), created, sandbox
+
+    after_reap, stats, created, sandbox = asyncio.run(scenario())
+    assert after_reap["size"] == 0 and after_reap["expired"] == 1
+    # Leased fresh, but it got too old during the lease: not put back
+    assert sandbox is created[1]
+    assert stats["expired"] == 2 and stats["idle"] == 0
+
+
+def test_unhealthy_sandbox_is_replaced():
+    clock = FakeClock()
+
+    async def scenario():
+        pool, created = make_pool(max_size=1, health_check_after=5, clock=clock)
+        async with pool.lease():
+            pass
+        created[0].alive = False  # simulate expiry on the provider side
+        clock.now = 6
+        async with pool.lease() as sb:
+            assert sb is created[1]
+        return pool
+
+    assert asyncio.run(scenario()).stats()["unhealthy"] == 1
+
+
+def test_exception_inside_lease_discards_sandbox():
+    async def scenario():
+        pool, created = make_pool(max_size=1)
+        with pytest.raises(ValueError):
+            async with pool.lease():
+                raise ValueError("network hiccup")
+        return pool, created
+
+    pool, created = asyncio.run(scenario())
+    assert created[0].alive is False
+    assert pool.stats()["size"] == 0
+
+
+def test_exhausted_pool_times_out():
+    async def scenario():
+        pool, _ = make_pool(max_size=1, acquire_timeout=0.05)
+        async with pool.lease():
+            with pytest.raises(PoolExhausted):
+                async with pool.lease():
+                    pass
+
+    asyncio.run(scenario())
+
+
+def test_waiter_gets_released_sandbox():
+    async def scenario():
+        pool, created = make_pool(max_size=1, acquire_timeout=2)
+        leased = []
+
+        async def worker():
+            async with pool.lease() as sb:
+                leased.append(sb)
+
+        async with pool.lease():
+            task = asyncio.create_task(worker())
+            await asyncio.sleep(0.01)
+            assert leased == []
+        await task
+        return leased, created
+
+    leased, created = asyncio.run(scenario())
+    assert leased == [created[0]]
+
+
+def test_invalid_sizes_rejected():
+    with pytest.raises(ValueError):
+        SandboxPool(LocalSandbox.create, max_size=0)
+    with pytest.raises(ValueError):
+        SandboxPool(LocalSandbox.create, min_size=3, max_size=2)
+
+
+def test_verify_solution_logic_with_inprocess_backend():
+    executor = PooledExecutor("inprocess", LocalSandbox.create, max_size=1)
+    code = "class Solution:\n    def twoSum(self, nums, target):\n        return [0, 1]\n"
+
+    async def scenario():
+        first = await server.verify_solution_logic(code, ["[2,7]\n9"])
+        # Second call reuses the sandbox; the previous Solution must not linger
+        second = await server.verify_solution_logic(code, ["[3,3]\n6"])
+        return json.loads(first), json.loads(second)
+
+    with patch.object(server, 'get_executor', return_value=executor):
+        results, again = asyncio.run(scenario())
+
+    assert results[0]["status"] == "Passed"
+    assert results[0]["output"] == "[0, 1]"
+    assert again[0]["status"] == "Passed"
+    assert executor.pool.stats()["created"] == 1
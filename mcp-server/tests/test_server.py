@@ -0,0 +1,147 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from executors import PooledExecutor, ProcessSandbox
+from sandbox_pool import LocalSandbox
+from verification_cache import VerificationCache
+import server
+
+ADD = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+SPIN = (
+    "class Solution:\n"
+    "    def run(self, n):\n"
+    "        if n < 0:\n"
+    "            while True:\n"
+    "                try:\n"
+    "                    pass\n"
+    "                except Exception:\n"
+    "                    pass\n"
+    "        return n\n"
+)
+
+
+@pytest.fixture(params=["local", "inprocess"])
+def executor(request):
+    # local runs the harness on a worker's main thread (signal timers),
+    # inprocess on a helper thread (trace-function fallback)
+    if request.param == "local":
+        ex = PooledExecutor("local", lambda: ProcessSandbox.create(timeout=20), max_size=1)
+    else:
+        ex = PooledExecutor("inprocess", LocalSandbox.create, max_size=1)
+    with patch.object(server, 'get_executor', return_value=ex), \
+         patch.object(server, 'get_verification_cache', return_value=VerificationCache(max_entries=0)):
+        yield ex
+    asyncio.run(ex.close())
+
+
+def verify(code, inputs, **options):
+    return json.loads(asyncio.run(server.verify_solution_logic(code, inputs, **options)))
+
+
+def test_harness_options_defaults(monkeypatch):
+    monkeypatch.setenv("VERIFY_CASE_TIMEOUT", "3")
+    monkeypatch.setenv("VERIFY_DEADLINE", "0")
+    opts = server.harness_options()
+    assert opts["case_timeout"] == 3
+    assert opts["deadline"] is None
+    assert opts["max_failures"] is None
+    assert server.harness_options(fail_fast=True)["max_failures"] == 1
+
+
+def test_runs_every_case_by_default(executor):
+    results = verify(ADD, ["1\n2", "[1]\n2", "3\n4"])
+    assert [r["status"] for r in results] == ["Passed", "Runtime Error", "Passed"]
+
+
+def test_fail_fast_skips_remaining_cases(executor):
+    results = verify(ADD, ["1\n2", "[1]\n2", "3\n4", "5\n6"], fail_fast=True)
+    assert [r["status"] for r in results] == ["Passed", "Runtime Error", "Skipped", "Skipped"]
+    assert results[2]["reason"] == "fail_fast"
+
+
+def test_max_failures(executor):
+    results = verify(ADD, ["[1]\n2", "[1]\n2", "1\n2"], expected=None, max_failures=2)
+    assert [r["status"] for r in results] == ["Runtime Error", "Runtime Error", "Skipped"]
+    assert results[2]["reason"] == "max_failures"
+
+
+def test_case_timeout_cuts_infinite_loop(executor):
+    results = verify(SPIN, ["-1", "2"], case_timeout=0.3)
+    assert results[0]["status"] == "Time Limit Exceeded"
+    assert results[0]["reason"] == "wall_timeout"
+    assert results[1]["status"] == "Passed"
+
+
+def test_case_cpu_timeout(executor):
+    results = verify(SPIN, ["-1"], case_timeout=5, case_cpu_timeout=0.3)
+    assert results[0]["status"] == "Time Limit Exceeded"
+    assert results[0]["reason"] == "cpu_timeout"
+
+
+def test_deadline_bounds_whole_run(executor):
+    results = verify(SPIN, ["-1", "-1", "1"], case_timeout=5, deadline=0.5)
+    assert results[0]["reason"] == "deadline"
+    assert [r["status"] for r in results[1:]] == ["Skipped", "Skipped"]
+    assert all(r["reason"] == "deadline" for r in results[1:])
+
+
+def test_cases_report_metrics(executor):
+    fib = (
+        "class Solution:\n"
+        "    def fib(self, n):\n"
+        "        return n if n < 2 else self.fib(n - 1) + self.fib(n - 2)\n"
+    )
+    results = verify(fib, ["10"], measure=True)
+    assert results[0]["output"] == "55"
+    assert results[0]["calls"] == 177
+    assert results[0]["wall_ms"] >= 0 and results[0]["cpu_ms"] >= 0
+    assert "peak_memory_kb" in results[0]
+
+
+def test_peak_memory_tracks_allocations(executor):
+    code = "class Solution:\n    def grow(self, n):\n        return len([0] * n)\n"
+    small, big = verify(code, ["10", "1000000"], measure=True)
+    assert big["peak_memory_kb"] > 1000 > small["peak_memory_kb"]
+
+
+def test_design_problem_counts_method_calls(executor):
+    code = (
+        "class MinStack:\n"
+        "    def __init__(self):\n"
+        "        self.items = []\n"
+        "    def push(self, x):\n"
+        "        self.items.append(x)\n"
+        "    def top(self):\n"
+        "        return self.items[-1]\n"
+    )
+    results = verify(code, ['["MinStack","push","push","top"]\n[[],[1],[2],[]]'], measure=True)
+    assert results[0]["output"] == "[None, None, None, 2]"
+    assert results[0]["calls"] == 3
+
+
+def test_measure_is_off_by_default(executor):
+    results = verify(ADD, ["1\n2"])
+    assert "wall_ms" in results[0]
+    assert "peak_memory_kb" not in results[0] and "calls" not in results[0]
+
+
+def test_phase_timings(executor):
+    timings = {}
+    asyncio.run(server.verify_solution_logic(ADD, ["1\n2"], timings=timings))
+    assert set(timings) == {"build_ms", "acquire_ms", "execute_ms"}
+
+
+def test_data_path_defaults_to_a_file_in_the_data_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.delenv("JOBS_DB", raising=False)
+    assert server.data_path("JOBS_DB", "jobs.db") == str(tmp_path / "data" / "jobs.db")
+    assert (tmp_path / "data").is_dir()
+    monkeypatch.setenv("JOBS_DB", ":memory:")
+    assert server.data_path("JOBS_DB", "jobs.db") == ":memory:"
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from executors import PooledExecutor
+from sandbox_pool import LocalSandbox
+from sessions import SessionManager, SessionNotFound
+from verification_cache import VerificationCache
+from limits import Overloaded
+import api
+import server
+
+# LeetCode-style: no imports, typing names and collections used directly
+DRILL = ("class Solution:\n    def window(self, nums: List[int], k: int) -> List[int]:\n"
+         "        q = collections.deque()\n        out = []\n"
+         "        for i, n in enumerate(nums):\n"
+         "            while q and nums[q[-1]] <= n:\n                q.pop()\n"
+         "            q.append(i)\n"
+         "            if q[0] <= i - k:\n                q.popleft()\n"
+         "            if i >= k - 1:\n                out.append(nums[q[0]])\n"
+         "        return out\n")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def executor_factory():
+    return PooledExecutor("inprocess", LocalSandbox.create, max_size=1, min_size=1)
+
+
+def manager(**kwargs):
+    return SessionManager(executor_factory, server._harness_loader, **kwargs)
+
+
+@pytest.fixture
+def cache():
+    c = VerificationCache()
+    with patch.object(server, 'get_verification_cache', return_value=c):
+        yield c
+
+
+def test_create_warms_the_pinned_sandbox():
+    async def scenario():
+        sessions = manager()
+        session = await sessions.create(prelude=["heapq"])
+        stats = session.executor.stats()
+        await sessions.close_all()
+        return session, stats
+
+    session, stats = asyncio.run(scenario())
+    assert session.prelude == ["heapq"]
+    assert stats["created"] == 1
+
+
+def test_session_runs_use_the_prelude(cache):
+    async def scenario():
+        sessions = manager()
+        session = await sessions.get((await sessions.create()).id)
+        logs = await server.verify_solution_logic(DRILL, ["[1,3,-1,-3,5]\n3"], executor=session.executor,
+                                                  prelude=session.prelude)
+        await sessions.close_all()
+        return json.loads(logs)
+
+    results = asyncio.run(scenario())
+    assert results[0]["status"] == "Passed"
+    assert results[0]["output"] == "[3, 3, 5]"
+
+
+def test_invalid_prelude_is_rejected():
+    async def scenario():
+        sessions = manager()
+        with pytest.raises(ValueError):
+            await sessions.create(prelude=["os; import shutil"])
+        with pytest.raises(ValueError):
+            await sessions.create(prelude=["no_such_module_here"])
+        return sessions.stats()
+
+    assert asyncio.run(scenario())["open"] == 0
+
+
+def test_idle_sessions_expire():
+    clock = Clock()
+
+    async def scenario():
+        sessions = manager(ttl_seconds=10, clock=clock)
+        session = await sessions.create()
+        clock.now = 5
+        await sessions.get(session.id)  # touch restarts the TTL
+        clock.now = 14
+        await sessions.get(session.id)
+        clock.now = 30
+        with pytest.raises(SessionNotFound):
+            await sessions.get(session.id)
+        return sessions.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["expired"] == 1
+    assert stats["open"] == 0
+
+
+def test_reap_expires_sessions_without_a_request():
+    clock = Clock()
+
+    async def scenario():
+        sessions = manager(ttl_seconds=10, clock=clock)
+        session = await sessions.create()
+        clock.now = 30
+        await sessions.reap()
+        return sessions.stats(), session.executor.stats()
+
+    stats, executor_stats = asyncio.run(scenario())
+    assert stats["expired"] == 1 and stats["open"] == 0
+    assert executor_stats["size"] == 0
+
+
+def test_periodic_reaper_runs_until_cancelled():
+    reaps = []
+
+    class Executor:
+        async def reap(self):
+            reaps.append("pool")
+
+    async def scenario():
+        task = asyncio.create_task(api.reap_periodically(0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return task
+
+    with patch.object(api, 'get_executor', return_value=Executor()):
+        task = asyncio.run(scenario())
+    assert task.cancelled()
+    assert len(reaps) >= 2
+
+
+def test_too_many_sessions_is_overloaded():
+    async def scenario():
+        sessions = manager(max_sessions=1)
+        await sessions.create()
+        with pytest.raises(Overloaded) as exc:
+            await sessions.create()
+        await sessions.close_all()
+        return exc.value
+
+    assert asyncio.run(scenario()).status_code == 429
+
+
+@pytest.fixture
+def client(cache):
+    ex = PooledExecutor("inprocess", LocalSandbox.create, max_size=2)
+    with patch.object(server, 'get_executor', return_value=ex), \
+         patch.object(api, 'get_executor', return_value=ex), \
+         patch.object(api, 'drill_sessions', manager()):
+        with TestClient(api.app) as c:
+            yield c
+
+
+def test_session_endpoints(client):
+    created = client.post("/sessions", json={"prelude": ["collections", "typing"]})
+    assert created.status_code == 201
+    session_id = created.json()["session_id"]
+
+    resp = client.post(f"/sessions/{session_id}/verify",
+                       json={"code": DRILL, "test_inputs": ["[1,3,-1,-3,5]\n3", "[1]\n1"],
+                             "expected": ["[3, 3, 5]", "[2]"]})
+    body = resp.json()
+    assert resp.status_code == 200
+    assert (body["passed"], body["failed"]) == (1, 1)
+
+    assert client.get(f"/sessions/{session_id}").json()["runs"] == 1
+    assert client.delete(f"/sessions/{session_id}").json()["closed"] is True
+    assert client.post(f"/sessions/{session_id}/verify", json={"code": DRILL, "test_input": "[1]\n1"}).status_code == 404
+    assert client.get("/health").json()["sessions"]["closed"] == 1
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        joined = []
+        results = await asyncio.gather(*[
+            flights.do("k", work, on_join=lambda: joined.append(1)) for _ in range(5)
+        ])
+        return results, joined
+
+    results, joined = asyncio.run(scenario())
+    assert results == ["result"] * 5
+    assert len(calls) == 1 and len(joined) == 4
+    assert flights.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flights = SingleFlight()
+
+    async def scenario():
+        a, b = await asyncio.gather(flights.do("a", lambda: asyncio.sleep(0, "a")),
+                                    flights.do("b", lambda: asyncio.sleep(0, "b")))
+        again = await flights.do("a", lambda: asyncio.sleep(0, "a2"))
+        return a, b, again
+
+    assert asyncio.run(scenario()) == ("a", "b", "a2")
+    assert flights.stats()["executions"] == 3
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("sandbox died")
+
+    async def scenario():
+        return await asyncio.gather(flights.do("k", boom), flights.do("k", boom), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_leaving_caller_does_not_cancel_shared_work():
+    flights = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+    assert finished == [1]
+
+
+def test_work_is_cancelled_when_everyone_leaves():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        caller = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert cancelled == [1]
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from executors import PooledExecutor
+from sandbox_pool import LocalSandbox
+from verification_cache import VerificationCache
+import server
+import stress
+
+MAX_SUB = (
+    "class Solution:\n"
+    "    def maxSubArray(self, nums: list[int]) -> int:\n"
+    "        if not nums:\n"
+    "            return 0\n"
+    "        best = cur = nums[0]\n"
+    "        for x in nums[1:]:\n"
+    "            cur = max(x, cur + x)\n"
+    "            best = max(best, cur)\n"
+    "        return best\n"
+)
+# Forgets that every number can be negative
+BUGGY_MAX_SUB = (
+    "class Solution:\n"
+    "    def maxSubArray(self, nums: list[int]) -> int:\n"
+    "        best = cur = 0\n"
+    "        for x in nums:\n"
+    "            cur = max(0, cur + x)\n"
+    "            best = max(best, cur)\n"
+    "        return best\n"
+)
+
+
+@pytest.fixture
+def executor():
+    ex = PooledExecutor("inprocess", LocalSandbox.create, max_size=1)
+    with patch.object(server, 'get_executor', return_value=ex), \
+         patch.object(server, 'get_verification_cache', return_value=VerificationCache(max_entries=0)):
+        yield ex
+    asyncio.run(ex.close())
+
+
+def test_infers_specs_from_annotations_and_sample():
+    code = "class Solution:\n    def twoSum(self, nums: List[int], target: int) -> List[int]:\n        pass\n"
+    specs = stress.infer_arg_specs(code, "[2,7,11,15]\n9")
+    assert [s.kind for s in specs] == ["list", "int"]
+    assert specs[0].elem.kind == "int"
+
+
+def test_infers_specs_from_sample_alone():
+    specs = stress.infer_arg_specs("class Solution:\n    def f(self, s, grid):\n        pass\n", '"abc"\n[[1,0],[0,1]]')
+    assert [s.kind for s in specs] == ["str", "list"]
+    assert specs[1].elem.kind == "list"
+    assert set(specs[0].alphabet) >= set("abc")
+
+
+def test_generated_cases_are_deterministic_and_unique():
+    specs = stress.infer_arg_specs(MAX_SUB, "[-2,1,-3,4]")
+    first = stress.generate_cases(specs, count=50, seed=3, max_size=20)
+    assert first == stress.generate_cases(specs, count=50, seed=3, max_size=20)
+    assert len(first) == len(set(first)) == 50
+    # Boundary cases come first
+    assert first[0] == "[]"
+
+
+def test_shrink_candidates_are_smaller():
+    for candidate in stress.shrink_candidates([[5, 3, 9], 7]):
+        assert len(json.dumps(candidate)) <= len(json.dumps([[5, 3, 9], 7]))
+    assert stress.shrink_candidates([[], 0]) == []
+
+
+def test_design_inputs_are_not_supported():
+    report = asyncio.run(stress.run_stress("class MinStack:\n    pass\n", '["MinStack","push"]\n[[],[1]]'))
+    assert report["supported"] is False
+
+
+def test_differential_run_finds_and_shrinks_counterexample(executor):
+    report = asyncio.run(stress.run_stress(BUGGY_MAX_SUB, "[-2,1,-3,4,-1,2,1,-5,4]",
+                                           reference_code=MAX_SUB, count=60, max_size=30))
+    assert report["failure"] is not None
+    # All-negative single element is as small as it gets
+    minimal = json.loads(report["minimal_input"])
+    assert len(minimal) == 1 and minimal[0] < 0
+    assert report["minimal_result"]["status"] == "Wrong Answer"
+
+
+def test_correct_solution_has_no_counterexample(executor):
+    report = asyncio.run(stress.run_stress(MAX_SUB, "[1,2]", reference_code=MAX_SUB, count=40, max_size=30))
+    assert report["failure"] is None and report["cases_run"] == 40
+
+
+def test_crashes_count_without_oracle(executor):
+    code = "class Solution:\n    def share(self, n: int) -> int:\n        return 100 // n\n"
+    report = asyncio.run(stress.run_stress(code, "7", count=20))
+    assert report["minimal_input"] == "0"
+    assert report["minimal_result"]["status"] == "Runtime Error"
+
+
+def test_cases_cut_by_the_deadline_are_not_counterexamples():
+    cut = {"status": "Time Limit Exceeded", "reason": "deadline"}
+    assert not stress.is_failure(cut, has_oracle=True)
+    assert stress.is_failure({"status": "Time Limit Exceeded", "reason": "wall_timeout"}, has_oracle=False)
+
+
+def test_batch_deadline_leaves_room_for_every_case(monkeypatch):
+    monkeypatch.setenv("VERIFY_DEADLINE", "0")
+    assert stress.batch_deadline(50, 2.0, has_reference=True) == 200.0
+    monkeypatch.setenv("VERIFY_DEADLINE", "25")
+    assert stress.batch_deadline(5, 2.0, has_reference=False) == 10.0
+    assert stress.batch_deadline(50, 2.0, has_reference=False) == 25.0
+
+
+def test_unfinished_cases_are_reported_not_failed(executor, monkeypatch):
+    monkeypatch.setenv("VERIFY_DEADLINE", "0.3")
+    code = "import time\nclass Solution:\n    def nap(self, n: int) -> int:\n        time.sleep(0.05)\n        return n\n"
+    report = asyncio.run(stress.run_stress(code, "7", count=20))
+    assert report["failure"] is None
+    assert report["cases_unfinished"] > 0
+    assert report["cases_run"] + report["cases_unfinished"] == 20
@@ -0,0 +1,47 @@
+import asyncio
+import io
+import json
+import logging
+import sys
+import os
+
+# Add parent directory to path to import server modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tracing
+
+
+def capture():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(tracing.JsonFormatter())
+    tracing.logger.addHandler(handler)
+    tracing.logger.setLevel(logging.DEBUG)
+    return stream, handler
+
+
+def test_log_lines_are_json_with_request_id():
+    stream, handler = capture()
+    try:
+        with tracing.bind("abc123"):
+            tracing.log_event("verify.executed", cases=3)
+        tracing.log_event("outside")
+    finally:
+        tracing.logger.removeHandler(handler)
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["event"] == "verify.executed"
+    assert first["request_id"] == "abc123" and first["cases"] == 3
+    assert second["request_id"] is None
+
+
+def test_request_id_follows_spawned_tasks():
+    async def child():
+        await asyncio.sleep(0)
+        return tracing.request_id.get()
+
+    async def scenario():
+        with tracing.bind("parent"):
+            task = asyncio.create_task(child())
+        return await task
+
+    assert asyncio.run(scenario()) == "parent"
@@ -0,0 +1,132 @@
+import sys
+import os
+
+# Add parent directory to path to import verification_cache
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from verification_cache import (
+    VerificationCache, cache_key, normalize_code, is_deterministic, is_cacheable_result,
+)
+
+RESULT = '[{"index": 0, "input": "1", "output": "2", "status": "Passed"}]'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_whitespace_and_comments():
+    a = "class Solution:\n    def f(self, x):\n        return x + 1\n"
+    b = "class Solution:   # comment\n\n    def f(self,x):\n        return x+1"
+    assert normalize_code(a) == normalize_code(b)
+    assert cache_key(a, ["1"]) == cache_key(b, ["1"])
+
+
+def test_key_depends_on_inputs_and_expected():
+    code = "x = 1"
+    assert cache_key(code, ["1"]) != cache_key(code, ["2"])
+    assert cache_key(code, ["1"]) != cache_key(code, ["1"], ["1"])
+
+
+def test_unparseable_code_still_gets_a_key():
+    assert cache_key("def (", ["1"]) != cache_key("def  (", ["1"])
+
+
+def test_nondeterministic_code_detected():
+    assert is_deterministic("class Solution:\n    def f(self): return 1")
+    assert not is_deterministic("import random\nx = random.random()")
+    assert not is_deterministic("from time import time")
+    assert not is_deterministic("x = id(object())")
+
+
+def test_timeouts_and_crashes_are_not_cacheable():
+    assert is_cacheable_result(RESULT)
+    assert is_cacheable_result("Runtime Error: SyntaxError: invalid syntax")
+    assert not is_cacheable_result("Runtime Error: TimeoutError: Execution exceeded 30s")
+    assert not is_cacheable_result("Runtime Error: WorkerCrashed: worker exited")
+    assert not is_cacheable_result("")
+
+
+def test_cacheability_looks_at_statuses_not_text():
+    # Code that prints or returns a marker is still cached
+    assert is_cacheable_result('[{"index": 0, "output": "TimeoutError", "stdout": "WorkerCrashed", '
+                               '"status": "Passed"}]')
+    assert is_cacheable_result("Runtime Error: ValueError: Time Limit Exceeded\\nTraceback:\\n")
+    assert not is_cacheable_result('[{"index": 0, "status": "Passed"}, {"index": 1, "status": "Time Limit Exceeded"}]')
+    assert not is_cacheable_result('[{"index": 0, "status": "Skipped", "reason": "deadline"}]')
+    assert not is_cacheable_result('[{"index": 0, "status": "Runtime Error", "traceback": "...\\nMemoryError: \\n"}]')
+    # Neither per-case results nor a fatal error: nothing to vouch for
+    assert not is_cacheable_result("Sandbox unavailable")
+
+
+def test_hit_and_miss_counters():
+    cache = VerificationCache()
+    assert cache.get("k") is None
+    cache.put("k", RESULT)
+    assert cache.get("k") == RESULT
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_put_skips_nondeterministic_code():
+    cache = VerificationCache()
+    assert cache.put("k", RESULT, code="import random") is False
+    assert cache.get("k") is None
+    assert cache.stats()["skipped"] == 1
+
+
+def test_lru_eviction():
+    cache = VerificationCache(max_entries=2)
+    cache.put("a", RESULT)
+    cache.put("b", RESULT)
+    cache.get("a")  # a is now most recent
+    cache.put("c", RESULT)
+    assert cache.get("b") is None
+    assert cache.get("a") == RESULT
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = VerificationCache(ttl_seconds=10, clock=clock)
+    cache.put("k", RESULT)
+    clock.now += 11
+    assert cache.get("k") is None
+
+
+def test_disabled_cache():
+    cache = VerificationCache(max_entries=0)
+    assert cache.put("k", RESULT) is False
+    assert cache.get("k") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "cache.db")
+    first = VerificationCache(db_path=db)
+    first.put("k", RESULT)
+    first.close()
+
+    second = VerificationCache(db_path=db)
+    assert second.get("k") == RESULT
+    assert second.stats()["disk_hits"] == 1
+    # Promoted to memory on the way out
+    assert second.get("k") == RESULT
+    assert second.stats()["memory_hits"] == 1
+    second.close()
+
+
+def test_sqlite_tier_respects_ttl(tmp_path):
+    clock = FakeClock()
+    db = str(tmp_path / "cache.db")
+    first = VerificationCache(db_path=db, ttl_seconds=10, clock=clock)
+    first.put("k", RESULT)
+    first.close()
+
+    clock.now += 11
+    second = VerificationCache(db_path=db, ttl_seconds=10, clock=clock)
+    assert second.get("k") is None
+    second.close()
@@ -0,0 +1,67 @@
+"""
+Request IDs and structured JSON logs.
+
+Every HTTP request (and every background job) gets an id in a contextvar,
+so it follows the work through awaits and into tasks spawned from it.
+`log_event` writes one JSON object per line with that id attached, which is
+enough to pull a single slow /autofix out of the log end to end:
+
+    {"ts": "...", "level": "INFO", "event": "autofix.attempt", "request_id": "9b1e...", "attempt": 2}
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+LOGGER_NAME = "leetcode_sandbox"
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextlib.contextmanager
+def bind(rid: str = None):
+    """Run the enclosed block (and tasks it creates) under `rid`."""
+    token = request_id.set(rid or new_request_id())
+    try:
+        yield request_id.get()
+    finally:
+        request_id.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "event": record.getMessage(),
+            "request_id": getattr(record, "request_id", None) or request_id.get(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = None, stream=None):
+    """Install the JSON handler once (LOG_LEVEL, default INFO)."""
+    if any(isinstance(h.formatter, JsonFormatter) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, exc_info=None, **fields):
+    logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
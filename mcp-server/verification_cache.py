@@ -0,0 +1,201 @@
+"""
+Content-addressed cache for verification results.
+
+Users re-run the same drill, and the extension re-verifies the same
+(code, inputs) pairs over and over. The cache key hashes the AST dump of the
+code (so whitespace and comments don't matter) together with the inputs and
+expected outputs.
+
+Two tiers:
+- in-memory LRU with a TTL (always on unless max_entries == 0)
+- optional on-disk SQLite tier (VERIFY_CACHE_DB) that survives restarts
+
+Only deterministic results are stored: code that imports clocks/randomness or
+calls id()/hash() is skipped, and so are runs that timed out or crashed the
+worker, since re-running them may well give a different answer.
+"""
+import ast
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Modules whose use makes a run's output depend on more than (code, input)
+NONDETERMINISTIC_MODULES = {"random", "time", "datetime", "secrets", "uuid", "os", "threading", "multiprocessing"}
+NONDETERMINISTIC_CALLS = {"id", "hash", "input", "open"}
+
+# Errors that say more about the executor (or the clock) than about the code
+UNCACHEABLE_ERRORS = {"TimeoutError", "WorkerCrashed", "MemoryError", "PoolExhausted", "HarnessError"}
+# Fatal results look like "Runtime Error: <name>: <value>..." (server._fatal)
+FATAL_PATTERN = re.compile(r"Runtime Error: ([\w.]+): ")
+
+
+def normalize_code(code: str) -> str:
+    """AST dump of the code; falls back to the raw text if it doesn't parse."""
+    try:
+        return ast.dump(ast.parse(code))
+    except (SyntaxError, ValueError):
+        return code
+
+
+def cache_key(code: str, test_inputs: list, expected: list = None, **options) -> str:
+    payload = json.dumps(
+        [normalize_code(code), list(test_inputs), list(expected or []), options],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(code: str) -> bool:
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        # A syntax error is as deterministic as it gets
+        return True
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] in NONDETERMINISTIC_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if (node.module or "").split(".")[0] in NONDETERMINISTIC_MODULES:
+                return False
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in NONDETERMINISTIC_CALLS:
+                return False
+    return True
+
+
+def _case_is_cacheable(case: dict) -> bool:
+    if case.get("status") == "Time Limit Exceeded" or case.get("reason") == "deadline":
+        return False
+    # The exception name is on the traceback's last line ("MemoryError: ...")
+    last_line = (case.get("traceback") or "").rstrip().rsplit("\n", 1)[-1]
+    return last_line.split(":", 1)[0] not in UNCACHEABLE_ERRORS
+
+
+def is_cacheable_result(result: str) -> bool:
+    """
+    Whether a verify_solution_logic result would come out the same on a
+    re-run: per-case results without timeouts or deadline skips, or a fatal
+    error the code caused. Anything in neither shape isn't stored.
+    """
+    if not isinstance(result, str) or not result.strip():
+        return False
+    try:
+        cases = json.loads(result)
+    except ValueError:
+        fatal = FATAL_PATTERN.match(result)
+        return fatal is not None and fatal.group(1) not in UNCACHEABLE_ERRORS
+    if not isinstance(cases, list):
+        return False
+    return all(isinstance(case, dict) and _case_is_cacheable(case) for case in cases)
+
+
+class VerificationCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0,
+                 db_path: str = None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "stores": 0, "skipped": 0}
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS verification_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        now = self._clock()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                stored_at, value = hit
+                if now - stored_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM verification_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, stored_at = row
+                    if now - stored_at < self.ttl_seconds:
+                        self._remember(key, stored_at, value)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM verification_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: str, code: str = None) -> bool:
+        """Store `value` if it is safe to replay. Returns whether it was stored."""
+        if not self.enabled:
+            return False
+        if not is_cacheable_result(value) or (code is not None and not is_deterministic(code)):
+            with self._lock:
+                self._stats["skipped"] += 1
+            return False
+
+        now = self._clock()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO verification_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, value, now),
+                )
+                self._db.commit()
+            self._stats["stores"] += 1
+        return True
+
+    def _remember(self, key: str, stored_at: float, value: str):
+        """Caller holds the lock."""
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM verification_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._memory),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
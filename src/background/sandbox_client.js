@@ -16,6 +16,8 @@
     const DEFAULT_BASE_URL = 'http://localhost:8000';
     const TIMEOUT_MS = 30000; // 30 second timeout for sandbox execution
     const MODULE_NAME = '[SandboxClient]';
+    const MAX_ADMISSION_RETRIES = 2; // Re-sends after a 429 from the server's fair-share scheduler
+    const MAX_RETRY_WAIT_MS = 10000; // Longer waits are returned to the caller instead
 
     /**
      * Get the base URL for the sandbox server.
@@ -63,6 +65,70 @@
         }
     }
 
+    /**
+     * Seconds the server asked us to wait (429/503 `retry_after` field or Retry-After header), or null.
+     */
+    async function retryAfterSeconds(response) {
+        const header = response.headers && response.headers.get ? response.headers.get('Retry-After') : null;
+        if (header && !Number.isNaN(Number(header))) {
+            return Number(header);
+        }
+        try {
+            const data = await response.json();
+            return typeof data.retry_after === 'number' ? data.retry_after : null;
+        } catch (e) {
+            return null;
+        }
+    }
+
+    function sleep(ms, signal = null) {
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(resolve, ms);
+            if (signal) {
+                signal.addEventListener('abort', () => {
+                    clearTimeout(timer);
+                    const error = new Error('aborted');
+                    error.name = 'AbortError';
+                    reject(error);
+                }, { once: true });
+            }
+        });
+    }
+
+    /**
+     * fetch() that honors the server's admission control: a 429 with a short
+     * enough retry_after is waited out and re-sent (up to MAX_ADMISSION_RETRIES).
+     * The last response is returned either way; a 429 one carries `retryAfter`.
+     */
+    async function fetchAdmitted(url, init) {
+        for (let attempt = 0; ; attempt++) {
+            const response = await fetch(url, init);
+            if (response.status !== 429) {
+                return response;
+            }
+            const retryAfter = await retryAfterSeconds(response);
+            if (attempt >= MAX_ADMISSION_RETRIES || retryAfter === null || retryAfter * 1000 > MAX_RETRY_WAIT_MS) {
+                response.retryAfter = retryAfter;
+                return response;
+            }
+            await debugLog('ADMISSION', `Rate limited, retrying in ${retryAfter}s`, { url, attempt });
+            await sleep(retryAfter * 1000, init && init.signal);
+        }
+    }
+
+    /**
+     * Summarize an array of per-case test results.
+     */
+    function summarizeResults(results) {
+        return {
+            parsed: true,
+            results,
+            allPassed: results.every(r => r.status === 'Passed'),
+            passedCount: results.filter(r => r.status === 'Passed').length,
+            failedCount: results.filter(r => r.status !== 'Passed').length
+        };
+    }
+
     /**
      * Parse the result string from the server into structured format.
      */
@@ -71,13 +137,7 @@
             // Server returns JSON string of array of test results
             const results = JSON.parse(resultString);
             if (Array.isArray(results)) {
-                return {
-                    parsed: true,
-                    results,
-                    allPassed: results.every(r => r.status === 'Passed'),
-                    passedCount: results.filter(r => r.status === 'Passed').length,
-                    failedCount: results.filter(r => r.status !== 'Passed').length
-                };
+                return summarizeResults(results);
             }
         } catch (e) {
             // Not JSON - likely a fatal error string
@@ -106,7 +166,7 @@
             const controller = new AbortController();
             const timeoutId = setTimeout(() => controller.abort(), TIMEOUT_MS);
 
-            const response = await fetch(`${baseUrl}/verify`, {
+            const response = await fetchAdmitted(`${baseUrl}/verify`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ code, test_input: testInput }),
@@ -119,6 +179,7 @@
                 return {
                     success: false,
                     error: `Server error: ${response.status} ${response.statusText}`,
+                    retryAfter: response.retryAfter || null,
                     results: []
                 };
             }
@@ -152,27 +213,32 @@
 
     /**
      * Verify code against multiple test inputs.
+     * All inputs run in a single sandbox execution on the server.
      * 
      * @param {string} code - The Python code to verify
      * @param {string[]} testInputs - Array of test input strings
+     * @param {Array<string|null>} [expected] - Optional expected output per input (null = unchecked)
+     * @param {object} [options]
+     * @param {string} [options.sessionId] - Run in this drill session's warm sandbox (see openSession)
      * @returns {Promise<object>} { success, results, passedCount, failedCount }
      */
-    async function verifyBatch(code, testInputs) {
+    async function verifyBatch(code, testInputs, expected = null, { sessionId = null } = {}) {
         const baseUrl = await getBaseUrl();
 
         try {
             const controller = new AbortController();
             const timeoutId = setTimeout(() => controller.abort(), TIMEOUT_MS);
 
-            // Send all inputs as a JSON string in test_input field
-            // The server will parse and run each
-            const response = await fetch(`${baseUrl}/verify`, {
+            const body = { code, test_inputs: testInputs };
+            if (expected) {
+                body.expected = expected;
+            }
+
+            const path = sessionId ? `/sessions/${sessionId}/verify` : '/verify';
+            const response = await fetchAdmitted(`${baseUrl}${path}`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    code,
-                    test_input: JSON.stringify(testInputs)
-                }),
+                body: JSON.stringify(body),
                 signal: controller.signal
             });
 
@@ -182,6 +248,8 @@
                 return {
                     success: false,
                     error: `Server error: ${response.status} ${response.statusText}`,
+                    sessionExpired: Boolean(sessionId) && response.status === 404,
+                    retryAfter: response.retryAfter || null,
                     results: [],
                     passedCount: 0,
                     failedCount: testInputs.length
@@ -189,7 +257,10 @@
             }
 
             const data = await response.json();
-            const parsed = parseResult(data.result);
+            // Prefer the structured per-case results; fall back to the raw string
+            const parsed = Array.isArray(data.results) && !data.error
+                ? summarizeResults(data.results)
+                : parseResult(data.result);
 
             return {
                 success: parsed.allPassed,
@@ -219,6 +290,252 @@
         }
     }
 
+    /**
+     * Parse one Server-Sent Events block ("event: x\ndata: {...}") into { event, data }.
+     * Comment-only blocks (keep-alives) return null.
+     */
+    function parseSseBlock(block) {
+        let event = 'message';
+        const dataLines = [];
+        for (const line of block.split('\n')) {
+            if (line.startsWith(':')) continue;
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+        }
+        if (dataLines.length === 0) return null;
+        try {
+            return { event, data: JSON.parse(dataLines.join('\n')) };
+        } catch (e) {
+            return { event, data: dataLines.join('\n') };
+        }
+    }
+
+    /**
+     * Run the auto-fix agent loop with streamed progress.
+     * There is no fixed timeout: progress arrives as it happens, and aborting
+     * `signal` closes the stream, which cancels the loop on the server.
+     *
+     * @param {string} code - The buggy Python code
+     * @param {string} testInput - The failing test input
+     * @param {object} [options]
+     * @param {function} [options.onEvent] - Called with (event, data) for each progress event
+     * @param {AbortSignal} [options.signal] - Abort to cancel the loop
+     * @returns {Promise<object>} The final /autofix result, or { verified: false, error }
+     */
+    async function autofixStream(code, testInput, { onEvent = null, signal = null } = {}) {
+        const baseUrl = await getBaseUrl();
+
+        try {
+            const response = await fetchAdmitted(`${baseUrl}/autofix/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+                body: JSON.stringify({ code, test_input: testInput }),
+                signal
+            });
+
+            if (!response.ok) {
+                return {
+                    verified: false,
+                    error: `Server error: ${response.status} ${response.statusText}`,
+                    retryAfter: response.retryAfter || null
+                };
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let result = null;
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const parsed = parseSseBlock(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+                    if (!parsed) continue;
+
+                    await debugLog('AUTOFIX_STREAM', `Event: ${parsed.event}`);
+                    if (onEvent) onEvent(parsed.event, parsed.data);
+                    if (parsed.event === 'result') result = parsed.data;
+                    if (parsed.event === 'error') {
+                        return { verified: false, error: parsed.data.detail || 'Auto-fix failed' };
+                    }
+                }
+            }
+
+            return result || { verified: false, error: 'Stream ended without a result' };
+
+        } catch (e) {
+            if (e.name === 'AbortError') {
+                return { verified: false, error: 'Auto-fix cancelled' };
+            }
+            errorLog('AUTOFIX_STREAM', 'Streaming auto-fix failed', e);
+            return { verified: false, error: e.message };
+        }
+    }
+
+    /**
+     * Queue an auto-fix job on the server and return its id straight away.
+     * Identical in-flight submissions are merged server-side.
+     *
+     * @param {string} code - The buggy Python code
+     * @param {string} testInput - The failing test input
+     * @param {object} [options]
+     * @param {number} [options.priority] - Higher runs first (default 0)
+     * @returns {Promise<object>} { jobId, state, deduplicated } or { error }
+     */
+    async function submitAutofixJob(code, testInput, { priority = 0 } = {}) {
+        const baseUrl = await getBaseUrl();
+
+        try {
+            const response = await fetchAdmitted(`${baseUrl}/jobs/autofix`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ code, test_input: testInput, priority })
+            });
+
+            if (!response.ok) {
+                return {
+                    error: `Server error: ${response.status} ${response.statusText}`,
+                    retryAfter: response.retryAfter || null
+                };
+            }
+
+            const data = await response.json();
+            await debugLog('AUTOFIX_JOB', `Submitted job ${data.job_id}`, data);
+            return { jobId: data.job_id, state: data.state, deduplicated: data.deduplicated };
+
+        } catch (e) {
+            errorLog('AUTOFIX_JOB', 'Job submission failed', e);
+            return { error: e.message };
+        }
+    }
+
+    /**
+     * Fetch a job's state, progress events and (once done) its /autofix result.
+     *
+     * @param {string} jobId
+     * @param {object} [options]
+     * @param {boolean} [options.cancel] - Cancel the job instead of just reading it
+     * @returns {Promise<object>} The job record, or { error }
+     */
+    async function getJob(jobId, { cancel = false } = {}) {
+        const baseUrl = await getBaseUrl();
+        const path = cancel ? `/jobs/${jobId}/cancel` : `/jobs/${jobId}`;
+
+        try {
+            const response = await fetch(`${baseUrl}${path}`, { method: cancel ? 'POST' : 'GET' });
+            if (!response.ok) {
+                return { error: `Server error: ${response.status} ${response.statusText}` };
+            }
+            return await response.json();
+
+        } catch (e) {
+            return { error: e.message };
+        }
+    }
+
+    /**
+     * Cancel a queued or running job.
+     *
+     * @param {string} jobId
+     * @returns {Promise<object>} The job record, or { error }
+     */
+    async function cancelJob(jobId) {
+        return getJob(jobId, { cancel: true });
+    }
+
+    /**
+     * Estimate the solution's time complexity by timing it at growing input sizes.
+     *
+     * @param {string} code - The Python solution
+     * @param {string} testInput - Sample input; its list/string arguments are scaled
+     * @param {object} [options] - Passed through: generator, sizes, budget_seconds,
+     *     target_size, time_limit_ms, max_complexity (e.g. 'O(n log n)')
+     * @returns {Promise<object>} { complexity, exponent, timings, tooSlow, tleRisk, error }
+     */
+    async function profile(code, testInput, options = {}) {
+        const baseUrl = await getBaseUrl();
+
+        try {
+            const response = await fetchAdmitted(`${baseUrl}/profile`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ code, test_input: testInput, ...options })
+            });
+            if (!response.ok) {
+                return {
+                    complexity: null,
+                    error: `Server error: ${response.status} ${response.statusText}`,
+                    retryAfter: response.retryAfter || null
+                };
+            }
+            const data = await response.json();
+            return {
+                complexity: data.complexity,
+                exponent: data.exponent,
+                timings: data.timings || [],
+                tooSlow: Boolean(data.too_slow),
+                tleRisk: Boolean(data.tle_risk),
+                error: data.error || null
+            };
+
+        } catch (e) {
+            errorLog('PROFILE', 'Profiling failed', e);
+            return { complexity: null, error: e.message };
+        }
+    }
+
+    /**
+     * Open a drill session: a sandbox pinned to it with the usual modules
+     * (collections, heapq, bisect, typing, ...) already imported. Pass the
+     * id to verifyBatch; the session closes itself after its TTL idle.
+     *
+     * @param {object} [options]
+     * @param {number} [options.ttlSeconds] - Idle lifetime (server default when omitted)
+     * @returns {Promise<object>} { sessionId, ttlSeconds, prelude } or { error }
+     */
+    async function openSession({ ttlSeconds = null } = {}) {
+        const baseUrl = await getBaseUrl();
+
+        try {
+            const response = await fetch(`${baseUrl}/sessions`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(ttlSeconds ? { ttl_seconds: ttlSeconds } : {})
+            });
+            if (!response.ok) {
+                return { error: `Server error: ${response.status} ${response.statusText}` };
+            }
+            const data = await response.json();
+            return { sessionId: data.session_id, ttlSeconds: data.ttl_seconds, prelude: data.prelude };
+
+        } catch (e) {
+            errorLog('SESSION', 'Opening a session failed', e);
+            return { error: e.message };
+        }
+    }
+
+    /**
+     * Close a drill session and release its sandbox.
+     *
+     * @param {string} sessionId
+     * @returns {Promise<boolean>} Whether the server closed it
+     */
+    async function closeSession(sessionId) {
+        const baseUrl = await getBaseUrl();
+
+        try {
+            const response = await fetch(`${baseUrl}/sessions/${sessionId}`, { method: 'DELETE' });
+            return response.ok;
+        } catch (e) {
+            return false;
+        }
+    }
+
     /**
      * Check if the sandbox server is running.
      * 
@@ -252,6 +569,13 @@
     return {
         verify,
         verifyBatch,
+        autofixStream,
+        submitAutofixJob,
+        getJob,
+        cancelJob,
+        profile,
+        openSession,
+        closeSession,
         isServerRunning,
         getBaseUrl,
         DEFAULT_BASE_URL
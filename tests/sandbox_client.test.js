@@ -124,6 +124,212 @@ describe('SandboxClient', () => {
             expect(result.passedCount).toBe(1);
             expect(result.failedCount).toBe(1);
         });
+
+        it('should send inputs as a real list with optional expected outputs', async () => {
+            mockFetch.mockResolvedValueOnce({
+                ok: true,
+                json: async () => ({
+                    result: '[]',
+                    results: [
+                        { index: 0, input: '[1]', output: '1', expected: '1', status: 'Passed' },
+                        { index: 1, input: '[2]', output: '3', expected: '2', status: 'Wrong Answer' }
+                    ],
+                    error: null
+                })
+            });
+
+            const result = await SandboxClient.verifyBatch('def sol(): pass', ['[1]', '[2]'], ['1', '2']);
+
+            const [, options] = mockFetch.mock.calls[0];
+            expect(JSON.parse(options.body)).toEqual({
+                code: 'def sol(): pass',
+                test_inputs: ['[1]', '[2]'],
+                expected: ['1', '2']
+            });
+            expect(result.success).toBe(false);
+            expect(result.results).toHaveLength(2);
+            expect(result.failedCount).toBe(1);
+        });
+    });
+
+    describe('autofixStream', () => {
+        beforeAll(() => {
+            // jsdom does not ship the Encoding API
+            const util = require('util');
+            global.TextEncoder = global.TextEncoder || util.TextEncoder;
+            global.TextDecoder = global.TextDecoder || util.TextDecoder;
+        });
+
+        function streamOf(chunks) {
+            const encoder = new TextEncoder();
+            let i = 0;
+            return {
+                getReader: () => ({
+                    read: async () => i < chunks.length
+                        ? { value: encoder.encode(chunks[i++]), done: false }
+                        : { value: undefined, done: true }
+                })
+            };
+        }
+
+        it('should forward progress events and resolve with the final result', async () => {
+            mockFetch.mockResolvedValueOnce({
+                ok: true,
+                body: streamOf([
+                    'event: status\ndata: {"message": "Reproducing"}\n\n: keep-alive\n\n',
+                    'event: token\ndata: {"attempt": 1, "te',
+                    'xt": "class"}\n\nevent: result\ndata: {"verified": true, "fixed_code": "x"}\n\n'
+                ])
+            });
+            const onEvent = jest.fn();
+
+            const result = await SandboxClient.autofixStream('code', '[1]', { onEvent });
+
+            expect(mockFetch).toHaveBeenCalledWith(
+                'http://localhost:8000/autofix/stream',
+                expect.objectContaining({ method: 'POST' })
+            );
+            expect(onEvent.mock.calls.map(c => c[0])).toEqual(['status', 'token', 'result']);
+            expect(onEvent.mock.calls[1][1]).toEqual({ attempt: 1, text: 'class' });
+            expect(result).toEqual({ verified: true, fixed_code: 'x' });
+        });
+
+        it('should report cancellation when aborted', async () => {
+            const abortError = new Error('aborted');
+            abortError.name = 'AbortError';
+            mockFetch.mockRejectedValueOnce(abortError);
+
+            const result = await SandboxClient.autofixStream('code', '[1]');
+
+            expect(result.verified).toBe(false);
+            expect(result.error).toBe('Auto-fix cancelled');
+        });
+
+        it('should surface server error events', async () => {
+            mockFetch.mockResolvedValueOnce({
+                ok: true,
+                body: streamOf(['event: error\ndata: {"detail": "LLM down"}\n\n'])
+            });
+
+            const result = await SandboxClient.autofixStream('code', '[1]');
+
+            expect(result).toEqual({ verified: false, error: 'LLM down' });
+        });
+    });
+
+    describe('autofix jobs', () => {
+        it('should submit a job and return its id', async () => {
+            mockFetch.mockResolvedValueOnce({
+                ok: true,
+                json: async () => ({ job_id: 'abc', state: 'queued', deduplicated: false })
+            });
+
+            const result = await SandboxClient.submitAutofixJob('code', '[1]', { priority: 2 });
+
+            expect(mockFetch).toHaveBeenCalledWith(
+                'http://localhost:8000/jobs/autofix',
+                expect.objectContaining({ method: 'POST' })
+            );
+            const body = JSON.parse(mockFetch.mock.calls[0][1].body);
+            expect(body).toEqual({ code: 'code', test_input: '[1]', priority: 2 });
+            expect(result).toEqual({ jobId: 'abc', state: 'queued', deduplicated: false });
+        });
+
+        it('should poll and cancel jobs', async () => {
+            mockFetch
+                .mockResolvedValueOnce({ ok: true, json: async () => ({ id: 'abc', state: 'running' }) })
+                .mockResolvedValueOnce({ ok: true, json: async () => ({ id: 'abc', state: 'cancelled' }) });
+
+            expect((await SandboxClient.getJob('abc')).state).toBe('running');
+            expect((await SandboxClient.cancelJob('abc')).state).toBe('cancelled');
+            expect(mockFetch.mock.calls[1][0]).toBe('http://localhost:8000/jobs/abc/cancel');
+            expect(mockFetch.mock.calls[1][1].method).toBe('POST');
+        });
+
+        it('should report unknown jobs', async () => {
+            mockFetch.mockResolvedValueOnce({ ok: false, status: 404, statusText: 'Not Found' });
+
+            const result = await SandboxClient.getJob('missing');
+
+            expect(result.error).toBe('Server error: 404 Not Found');
+        });
+    });
+
+    describe('profile', () => {
+        it('should post the solution and report the fitted class', async () => {
+            mockFetch.mockResolvedValueOnce({
+                ok: true,
+                json: async () => ({ complexity: 'O(n^2)', exponent: 2.0, timings: [], too_slow: true, error: null })
+            });
+
+            const result = await SandboxClient.profile('code', '[1,2]', { max_complexity: 'O(n)' });
+
+            expect(mockFetch.mock.calls[0][0]).toBe('http://localhost:8000/profile');
+            expect(JSON.parse(mockFetch.mock.calls[0][1].body).max_complexity).toBe('O(n)');
+            expect(result.complexity).toBe('O(n^2)');
+            expect(result.tooSlow).toBe(true);
+        });
+    });
+
+    describe('drill sessions', () => {
+        it('should open a session and verify in it', async () => {
+            mockFetch
+                .mockResolvedValueOnce({ ok: true, json: async () => ({ session_id: 's1', ttl_seconds: 900, prelude: ['heapq'] }) })
+                .mockResolvedValueOnce({ ok: true, json: async () => ({ results: [{ index: 0, status: 'Passed', output: '3' }], error: null }) });
+
+            const session = await SandboxClient.openSession();
+            const result = await SandboxClient.verifyBatch('code', ['1\n2'], null, { sessionId: session.sessionId });
+
+            expect(session.sessionId).toBe('s1');
+            expect(mockFetch.mock.calls[1][0]).toBe('http://localhost:8000/sessions/s1/verify');
+            expect(result.success).toBe(true);
+        });
+
+        it('should flag an expired session', async () => {
+            mockFetch.mockResolvedValueOnce({ ok: false, status: 404, statusText: 'Not Found' });
+
+            const result = await SandboxClient.verifyBatch('code', ['1'], null, { sessionId: 'gone' });
+
+            expect(result.sessionExpired).toBe(true);
+        });
+
+        it('should close a session', async () => {
+            mockFetch.mockResolvedValueOnce({ ok: true });
+
+            expect(await SandboxClient.closeSession('s1')).toBe(true);
+            expect(mockFetch.mock.calls[0][1].method).toBe('DELETE');
+        });
+    });
+
+    describe('admission control', () => {
+        const rateLimited = (retryAfter) => ({
+            ok: false,
+            status: 429,
+            statusText: 'Too Many Requests',
+            headers: { get: () => null },
+            json: async () => ({ detail: 'verify: client rate limit exceeded', retry_after: retryAfter, reason: 'client_rate' })
+        });
+
+        it('should wait out a short retry_after and resend', async () => {
+            mockFetch
+                .mockResolvedValueOnce(rateLimited(0.01))
+                .mockResolvedValueOnce({ ok: true, json: async () => ({ results: [{ index: 0, status: 'Passed' }], error: null }) });
+
+            const result = await SandboxClient.verifyBatch('code', ['[1]']);
+
+            expect(mockFetch).toHaveBeenCalledTimes(2);
+            expect(result.success).toBe(true);
+        });
+
+        it('should return a long retry_after to the caller instead of waiting', async () => {
+            mockFetch.mockResolvedValueOnce(rateLimited(60));
+
+            const result = await SandboxClient.submitAutofixJob('code', '[1]');
+
+            expect(mockFetch).toHaveBeenCalledTimes(1);
+            expect(result.retryAfter).toBe(60);
+            expect(result.error).toContain('429');
+        });
     });
 
     describe('isServerRunning', () => {